@@ -0,0 +1,182 @@
+"""
+Agent Benchmark - measures the test agent's own overhead against mock_target.py
+Reports max requests/sec, CPU per request and memory per in-flight request for
+each load engine, so generator-side regressions show up before they skew
+the latencies we report about the real app
+
+    python agent_benchmark.py                   # run and print
+    python agent_benchmark.py --save-baseline   # record this machine's numbers
+    python agent_benchmark.py --check           # exit 1 if worse than the baseline
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from result_sink import ResultSink
+
+HERE = Path(__file__).parent
+BASELINE_FILE = Path(os.getenv("TEST_AGENT_BENCHMARK_BASELINE", HERE / "benchmark-baseline.json"))
+TOLERANCE = float(os.getenv("TEST_AGENT_BENCHMARK_TOLERANCE", "0.25"))  # 25% worse = regression
+
+# engine -> (requests for throughput/CPU, requests held in flight for memory)
+WORKLOADS = {
+    "async": (5000, 1000),
+    "threads": (1000, 100)
+}
+HOLD_MS = 1000  # Server-side delay that keeps the memory run's requests in flight
+
+# metric -> True when higher is better
+METRICS = {
+    "max_rps": True,
+    "cpu_us_per_request": False,
+    "kb_per_in_flight": False
+}
+
+
+def load_agent():
+    """Import ai-test-agent.py (hyphenated file name) as a module"""
+    spec = importlib.util.spec_from_file_location("ai_test_agent", HERE / "ai-test-agent.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock(app_port, agent_port):
+    """Zero-latency mock in its own process, so its CPU isn't charged to the agent"""
+    process = subprocess.Popen(
+        [sys.executable, str(HERE / "mock_target.py"), "--latency", "const:0",
+         "--app-port", str(app_port), "--agent-port", str(agent_port)],
+        stdout=subprocess.DEVNULL
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", app_port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("Mock target did not start")
+
+
+def benchmark_engine(agent, engine, base_url):
+    """Throughput, CPU and memory for one engine"""
+    count, in_flight = WORKLOADS[engine]
+    test = {
+        "name": f"Benchmark ({engine})",
+        "endpoint": f"{base_url}/api/estimate",
+        "method": "POST",
+        "payload": {"industry": "education", "size": 50000}
+    }
+
+    agent.engine = engine
+    agent._run_concurrent(test, min(count, 100), ResultSink())  # Warm up pools and imports
+
+    sink = ResultSink()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    agent._run_concurrent(test, count, sink)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    if sink.successes != count:
+        raise RuntimeError(f"{engine}: only {sink.successes}/{count} requests succeeded")
+
+    held = dict(test, headers={"X-Mock-Latency": f"const:{HOLD_MS}"})
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    agent._run_concurrent(held, in_flight, ResultSink())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "requests": count,
+        "max_rps": count / wall,
+        "cpu_us_per_request": cpu / count * 1e6,
+        "in_flight": in_flight,
+        "kb_per_in_flight": (peak - baseline) / in_flight / 1024
+    }
+
+
+def run_benchmarks(engines):
+    app_port, agent_port = free_port(), free_port()
+    mock = start_mock(app_port, agent_port)
+    try:
+        agent = load_agent().TestAgent()
+        return {engine: benchmark_engine(agent, engine, f"http://127.0.0.1:{app_port}") for engine in engines}
+    finally:
+        mock.terminate()
+        mock.wait()
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Metrics worse than the baseline by more than `tolerance` -> list of messages"""
+    regressions = []
+    for engine, metrics in results.items():
+        for metric, higher_is_better in METRICS.items():
+            before = baseline.get(engine, {}).get(metric)
+            if not before:
+                continue
+            change = (metrics[metric] - before) / before
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{engine} {metric}: {before:.1f} -> {metrics[metric]:.1f} ({change:+.0%})")
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'Engine':<10}{'Requests':>10}{'Max RPS':>12}{'CPU/req':>12}{'Mem/in-flight':>16}")
+    for engine, m in results.items():
+        print(
+            f"{engine:<10}{m['requests']:>10}{m['max_rps']:>12.0f}"
+            f"{m['cpu_us_per_request']:>10.0f}µs{m['kb_per_in_flight']:>14.1f}KB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the test agent's own overhead")
+    parser.add_argument("--engine", choices=list(WORKLOADS), action="append", help="engine(s) to benchmark")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {BASELINE_FILE.name}")
+    parser.add_argument("--check", action="store_true", help="fail if worse than the saved baseline")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    print("⏱️ Benchmarking test agent overhead against mock_target.py...")
+    results = run_benchmarks(args.engine or list(WORKLOADS))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Baseline saved to {BASELINE_FILE}")
+
+    if args.check:
+        if not BASELINE_FILE.exists():
+            print(f"\n⚠️ No baseline at {BASELINE_FILE} - run with --save-baseline first")
+            return 1
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            print("\n🚨 Generator-side regressions:")
+            for line in regressions:
+                print(f"- {line}")
+            return 1
+        print(f"\n✅ Within {TOLERANCE:.0%} of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
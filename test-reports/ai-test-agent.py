@@ -13,44 +13,273 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-import openai
+import argparse
 import json
-import requests
+import itertools
+import threading
 import time
 import os
+from functools import partial
 from datetime import datetime
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv(Path(__file__).parent.parent / '.env')
+from urllib.parse import urlsplit
+
+# Load environment variables from .env file - before the modules below read their TEST_AGENT_* settings
+ENV_FILE = Path(__file__).parent.parent / '.env'
+if ENV_FILE.exists():
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
+
+import fuzzer
+import load_profile
+import regression
+import resource_sampler
+import target_health
+import traffic_replay
+from capacity import CapacitySearch
+from fix_suggestions import FixSuggester
+from fix_watcher import RETEST_TRIALS, FixWatcher, confirmed, issue_id_of
+from issue_index import IssueIndex, fingerprint
+from latency_histogram import LatencyHistogram
+from live_metrics import METRICS, LiveExport
+from phase_timing import PHASES, PhaseStats, recording
+from result_sink import ResultSink, log_path_for
+from run_history import FULL_RUN, RunHistory
+from scheduler import TestScheduler
+from stream_metrics import MAX_BODY_BYTES, READ_CHUNK_BYTES, StreamTimer, drains, is_event_stream
+from target_health import base_url
 
 # Configuration
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 BASE_URL = "http://localhost:3000"
 SUPER_AGENT_URL = "http://localhost:9500"
 ISSUES_DIR = Path(__file__).parent / "issues"
 FIXES_DIR = Path(__file__).parent / "fixes"
 FINAL_DIR = Path(__file__).parent / "final"
 
-openai.api_key = OPENAI_API_KEY
+# Load generation engine for stress tests: "async" (asyncio/aiohttp) or "threads"
+# TEST_AGENT_WORKERS / TEST_AGENT_REMOTE_WORKERS spread the async engine across processes/hosts
+LOAD_ENGINE = os.getenv("TEST_AGENT_ENGINE", "async")
+
+# Run all suites as one dependency graph (TEST_AGENT_PARALLEL=0 for the old serial order)
+PARALLEL = os.getenv("TEST_AGENT_PARALLEL", "1") != "0"
+
+# Tests allowed in flight per target host when running as a graph
+TARGET_BUDGETS = {
+    BASE_URL: 4,
+    SUPER_AGENT_URL: 2
+}
+
+# suite -> (test definitions, executor, issue category)
+SUITES = {
+    "stress_tests": ("_stress_tests", "_execute_stress_test", "STRESS_TEST"),
+    "penetration_tests": ("_penetration_tests", "_execute_security_test", "SECURITY"),
+    "ux_tests": ("_ux_tests", "_execute_ux_test", "UX"),
+    "admin_tests": ("_admin_tests", "_execute_admin_test", "ADMIN")
+}
+
+# Tags every test gets on top of its own "tags": suite ("stress"), service and kind of load
+SERVICE_TAGS = {BASE_URL: "app", SUPER_AGENT_URL: "super_agent"}
+LOAD_TAGS = {
+    "concurrent": "concurrent",
+    "rate_per_sec": "rate",
+    "rapid_fire": "rate",
+    "stages": "profile",
+    "replay": "replay",
+    "steps": "workflow"
+}
 
 
 class TestAgent:
-    def __init__(self):
+    def __init__(self, engine=LOAD_ENGINE, llm_backend=None):
+        self.engine = engine
+        self._async_engine = None
+        self._coordinator = None
+        self._http = None  # One keep-alive session per target host, built on first use
+        self.run_id = int(time.time())  # Stress logs stream to runs/{run_id}/
         self.issues = []
         self.fixes = []
+        self.retests = []  # Every fix retested: issue, verdict, details
+        self.suggester = FixSuggester(llm_backend) if llm_backend else FixSuggester()
+        self._awaiting_suggestion = []  # (issue, cache key) written once resolved
+        self.issue_index = IssueIndex()  # failure fingerprint -> existing issue
+        self._issues_by_id = {}
         self.test_results = {
             "stress_tests": [],
             "penetration_tests": [],
             "ux_tests": [],
             "admin_tests": []
         }
+        self.endpoint_histograms = {}  # "METHOD /path" -> LatencyHistogram
+        self.endpoint_phases = {}  # "METHOD /path" -> PhaseStats
+        self.capacity_results = []
+        self.fuzz_results = []
+        self._resource_targets = None  # name -> PIDs (TEST_AGENT_SAMPLE_PORTS / _PIDS), found on first use
+        self.history = RunHistory()  # Per-run histograms/throughput for baseline comparison
+        self.regressions = None
+        self.breaker = target_health.CircuitBreaker()  # Per-host fail-fast once a target stops answering
+        self.target_health = None  # base URL -> preflight probe, filled before the first test
+        self.run_deadline_at = target_health.deadline_after(target_health.RUN_DEADLINE_S)
+        self._unavailable_reported = set()
+        self.selected = None  # Test names picked by select(); None = every test
+        self.mode = "run"  # CLI command - runs are only compared with runs of the same command and tests
+        self.report_file = None
+        self._lock = threading.RLock()  # Guards shared state when tests run in parallel
+
+    @property
+    def http(self):
+        """Sync keep-alive pool (http_pool), built on first use
+
+        Runs that only drive the async engine never import requests.
+        """
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    from http_pool import SessionPool
+                    self._http = SessionPool()
+        return self._http
+
+    def run_all(self, parallel=PARALLEL):
+        """Run every suite - as one dependency graph when parallel, else suite by suite"""
+        if not parallel:
+            self.run_stress_tests()
+            self.run_penetration_tests()
+            self.run_ux_tests()
+            self.run_admin_tests()
+            return
+
+        self.preflight()
+        print("\n⚡ Running all suites as a dependency graph...")
+        scheduler = TestScheduler(budgets=TARGET_BUDGETS)
+        order = []
+        for suite in SUITES:
+            for test in self._selected(suite):
+                order.append((suite, test["name"]))
+                scheduler.add(
+                    test["name"],
+                    partial(self._run_test, suite, test),
+                    target=self._target_of(test),
+                    after=test.get("after", ()),
+                    exclusive=suite == "stress_tests" or "rate_per_sec" in test  # Load gets its host to itself
+                )
+
+        results = scheduler.run()
+        for suite, name in order:  # Report in declaration order, not completion order
+            self.test_results[suite].append(results[name])
+
+    def _run_test(self, suite, test):
+        """Execute one test under its deadline and open an issue if it failed
+
+        A test whose host is down (circuit open) or that starts after the run
+        deadline is skipped instead - no requests, no issue.
+        """
+        _, executor, category = SUITES[suite]
+        self.preflight()
+        target = self._target_of(test)
+        reason = self._skip_reason(target)
+        if reason is not None:
+            print(f"⏭️ {test['name']}: {reason}")
+            endpoint = test.get("endpoint") or test["steps"][0]["endpoint"]
+            return {"name": test["name"], "endpoint": endpoint, "passed": False, "skipped": True,
+                    "error": reason, "details": reason}
+
+        result = getattr(self, executor)(self._with_deadline(test))
+
+        if not result["passed"] and not self.breaker.available(target):
+            # The host went down mid-test - one AVAILABILITY issue covers it, not one per test
+            result.update(skipped=True, error=target_health.UNAVAILABLE)
+        elif not result["passed"]:
+            with self._lock:
+                self._create_issue(category, result, retest=(suite, test))
+        return result
+
+    def select(self, suites=None, names=None, tags=None, targets=None):
+        """Limit run_all() and the run_*_tests() methods to matching tests -> [(suite, test)]
+
+        Filters combine with AND, the values of one filter with OR. Names and
+        targets match case-insensitive substrings ("rate limit", "9500"); tests
+        a chosen test runs "after" are pulled in as well.
+        """
+        everything = [(suite, test) for suite in SUITES for test in getattr(self, SUITES[suite][0])()]
+
+        def matches(suite, test):
+            name, target = test["name"].lower(), self._target_of(test)
+            return (
+                (not suites or suite in suites)
+                and (not names or any(n.lower() in name for n in names))
+                and (not tags or not self.test_tags(suite, test).isdisjoint(tags))
+                and (not targets or any(t.lower() in target or t == SERVICE_TAGS.get(target) for t in targets))
+            )
+
+        chosen = {test["name"] for suite, test in everything if matches(suite, test)}
+        after = {test["name"]: test.get("after", ()) for _, test in everything}
+        pending = list(chosen)
+        while pending:
+            for dependency in after.get(pending.pop(), ()):
+                if dependency not in chosen:
+                    chosen.add(dependency)
+                    pending.append(dependency)
+        self.selected = chosen
+        return [(suite, test) for suite, test in everything if test["name"] in chosen]
+
+    def test_tags(self, suite, test):
+        """Tags a test can be picked by: its own "tags", its suite, its service and its kind of load"""
+        tags = set(test.get("tags", ()))
+        tags.add(suite[:-len("_tests")])
+        tags.add(SERVICE_TAGS.get(self._target_of(test), "other"))
+        tags.update(tag for key, tag in LOAD_TAGS.items() if key in test)
+        return tags
+
+    def _selected(self, suite):
+        """A suite's test definitions, narrowed to what select() picked"""
+        definitions = getattr(self, SUITES[suite][0])()
+        if self.selected is None:
+            return definitions
+        return [test for test in definitions if test["name"] in self.selected]
+
+    def _with_deadline(self, test):
+        """Copy of a test carrying its deadline (its own "deadline_s" or its schedule plus the default,
+        capped by the run's)"""
+        deadline_s = target_health.deadline_for(test)
+        return {**test, "deadline_at": target_health.deadline_after(deadline_s, self.run_deadline_at)}
+
+    def preflight(self):
+        """Probe every target host once before the first test; unreachable hosts start with an open circuit"""
+        with self._lock:
+            if self.target_health is not None:
+                return self.target_health
+            targets = {self._target_of(test) for suite in SUITES for test in self._selected(suite)}
+            print(f"\n🩺 Preflight: probing {len(targets)} targets ({target_health.HEALTH_PATH})...")
+            self.target_health = target_health.preflight(targets)
+            for target, probe in self.target_health.items():
+                if probe["up"]:
+                    print(f"   ✅ {target} answered HTTP {probe['status_code']} in {probe['latency_ms']:.0f}ms")
+                else:
+                    print(f"   ⛔ {target} unreachable: {probe['error']}")
+                    self.breaker.trip(target, probe["error"])
+            return self.target_health
+
+    def _skip_reason(self, target):
+        """Why a test against `target` shouldn't start now, or None"""
+        if self.run_deadline_at is not None and time.time() >= self.run_deadline_at:
+            return "skipped: run deadline reached"
+        if not self.breaker.available(target):
+            return target_health.UNAVAILABLE
+        return None
+
+    def _target_of(self, test):
+        """Host a test talks to (first step for multi-step workflows)"""
+        endpoint = test.get("endpoint") or test["steps"][0]["endpoint"]
+        return base_url(endpoint)
 
     def run_stress_tests(self):
         """Stress test - concurrent requests, large payloads, rate limiting"""
         print("\n🔥 Running Stress Tests...")
 
+        for test in self._selected("stress_tests"):
+            self.test_results["stress_tests"].append(self._run_test("stress_tests", test))
+
+    def _stress_tests(self):
+        """Stress test definitions"""
         tests = [
             {
                 "name": "Concurrent AI Assistant Requests",
@@ -74,23 +303,41 @@ class TestAgent:
                 "name": "Rate Limit Test - 50 requests/min",
                 "endpoint": f"{BASE_URL}/api/estimate",
                 "method": "POST",
-                "rapid_fire": 50,
+                "rate_per_sec": 100,  # Open-loop: 50 requests in 0.5s regardless of latency
+                "duration_s": 0.5,
+                "payload": {"industry": "education", "size": 50000}
+            },
+            {
+                "name": "Traffic Spike - Estimate API",
+                "endpoint": f"{BASE_URL}/api/estimate",
+                "method": "POST",
+                "stages": [
+                    {"duration_s": 5, "rate_per_sec": 20},                  # Ramp up 0 -> 20/s
+                    {"duration_s": 2, "rate_per_sec": 100, "ramp": "step"},  # Morning spike
+                    {"duration_s": 5, "rate_per_sec": 20, "ramp": "step"}    # Recovery
+                ],
                 "payload": {"industry": "education", "size": 50000}
             }
         ]
-
-        for test in tests:
-            result = self._execute_stress_test(test)
-            self.test_results["stress_tests"].append(result)
-
-            if not result["passed"]:
-                self._create_issue("STRESS_TEST", result)
+        if traffic_replay.REPLAY_LOG:
+            tests.append({
+                "name": "Traffic Replay",
+                "endpoint": BASE_URL,  # Scheduled and health-checked against the app; requests go where they were captured
+                "replay": traffic_replay.REPLAY_LOG,
+                "speed": traffic_replay.REPLAY_SPEED
+            })
+        return tests
 
     def run_penetration_tests(self):
         """Security tests - SQL injection, XSS, auth bypass, etc."""
         print("\n🛡️ Running Penetration Tests...")
 
-        tests = [
+        for test in self._selected("penetration_tests"):
+            self.test_results["penetration_tests"].append(self._run_test("penetration_tests", test))
+
+    def _penetration_tests(self):
+        """Penetration test definitions"""
+        return [
             {
                 "name": "SQL Injection - Login Form",
                 "endpoint": f"{BASE_URL}/api/auth/[...nextauth]",
@@ -121,26 +368,49 @@ class TestAgent:
             }
         ]
 
-        for test in tests:
-            result = self._execute_security_test(test)
-            self.test_results["penetration_tests"].append(result)
-
-            if not result["passed"]:
-                self._create_issue("SECURITY", result)
-
     def run_ux_tests(self):
         """User Experience tests - populate data, test workflows"""
         print("\n🎨 Running UX Tests (Data Population)...")
 
+        for test in self._selected("ux_tests"):
+            self.test_results["ux_tests"].append(self._run_test("ux_tests", test))
+
+    def _ux_tests(self):
+        """UX test definitions"""
+        # Each virtual user carries its assessment ID from start to answer / generate
+        assessment_steps = [
+            {
+                "action": "Start AI Assessment",
+                "endpoint": f"{BASE_URL}/api/ai-assessment/start",
+                "payload": {"schoolType": "elementary", "user_id": "ux-user-{user}"},
+                "extract": {"assessment_id": "assessmentId"}
+            },
+            {
+                "action": "Answer 5 questions",
+                "endpoint": f"{BASE_URL}/api/ai-assessment/answer",
+                "payload": {"assessmentId": "{assessment_id}", "answer": "3 buildings, 40 existing cameras"},
+                "repeat": 5
+            },
+            {
+                "action": "Generate proposal",
+                "endpoint": f"{BASE_URL}/api/ai-assessment/generate",
+                "payload": {"assessmentId": "{assessment_id}"}
+            }
+        ]
+
         # Create realistic user sessions in Supabase
-        tests = [
+        return [
             {
                 "name": "AI Assessment Workflow - Elementary School",
-                "steps": [
-                    {"action": "Start AI Assessment", "endpoint": f"{BASE_URL}/api/ai-assessment/start"},
-                    {"action": "Answer 5 questions", "endpoint": f"{BASE_URL}/api/ai-assessment/answer"},
-                    {"action": "Generate proposal", "endpoint": f"{BASE_URL}/api/ai-assessment/generate"}
-                ]
+                "steps": assessment_steps
+            },
+            {
+                "name": "AI Assessment Workflow - 25 Concurrent Users",
+                "steps": assessment_steps,
+                "virtual_users": 25,
+                "ramp_s": 5,
+                "think_s": [0.2, 1.0],
+                "min_completion": 0.95  # Share of journeys that must finish every step
             },
             {
                 "name": "Super Agent - A&E Spec Matching",
@@ -159,18 +429,16 @@ class TestAgent:
             }
         ]
 
-        for test in tests:
-            result = self._execute_ux_test(test)
-            self.test_results["ux_tests"].append(result)
-
-            if not result["passed"]:
-                self._create_issue("UX", result)
-
     def run_admin_tests(self):
         """Admin panel tests - authentication, permissions, CRUD operations"""
         print("\n👑 Running Admin Panel Tests...")
 
-        tests = [
+        for test in self._selected("admin_tests"):
+            self.test_results["admin_tests"].append(self._run_test("admin_tests", test))
+
+    def _admin_tests(self):
+        """Admin panel test definitions"""
+        return [
             {
                 "name": "Super Admin Login",
                 "endpoint": f"{BASE_URL}/api/auth/signin",
@@ -180,86 +448,607 @@ class TestAgent:
                 "name": "User Creation - Manager Role",
                 "endpoint": f"{BASE_URL}/api/admin/users",
                 "method": "POST",
-                "payload": {"email": "test-manager@design-rite.com", "role": "manager"}
+                "payload": {"email": "test-manager@design-rite.com", "role": "manager"},
+                "after": ["Super Admin Login"]  # Mutates shared state - needs the admin session
             },
             {
                 "name": "Rate Limit Override - Super Admin",
                 "endpoint": f"{BASE_URL}/api/estimate",
                 "method": "POST",
-                "repeat": 100,  # Should not be rate limited
+                "rate_per_sec": 100,  # Open-loop burst of 100 in 1s - none of it should be rate limited
+                "duration_s": 1,
+                "payload": {"industry": "education", "size": 50000},
                 "auth": "super_admin"
             },
             {
                 "name": "Activity Logs - View All Users",
                 "endpoint": f"{BASE_URL}/api/admin/activity-logs",
-                "method": "GET"
+                "method": "GET",
+                "after": ["User Creation - Manager Role"]  # Should list the user just created
             }
         ]
 
-        for test in tests:
-            result = self._execute_admin_test(test)
-            self.test_results["admin_tests"].append(result)
+    def run_capacity_search(self):
+        """Find each endpoint's max sustainable RPS under its SLO (saved to final/capacity-*.json)"""
+        print("\n📈 Running Capacity Search...")
+
+        self.preflight()
+        for test in self._capacity_tests():
+            reason = self._skip_reason(base_url(test["endpoint"]))
+            if reason is not None:
+                print(f"⏭️ {test['name']}: {reason}")
+                continue
+            self.capacity_results.append(self._search_capacity({**test, "deadline_at": self.run_deadline_at}))
+
+        artifact = FINAL_DIR / f"capacity-{int(time.time())}.json"
+        with open(artifact, 'w', encoding='utf-8') as f:
+            json.dump({
+                "run_id": self.run_id,
+                "generated": datetime.now().isoformat(),
+                "endpoints": self.capacity_results
+            }, f, indent=2)
+        print(f"✅ Capacity results saved to {artifact}")
+        return self.capacity_results
+
+    def _capacity_tests(self):
+        """Capacity search definitions - SLO plus where the rate search starts and stops"""
+        return [
+            {
+                "name": "Estimate API",
+                "endpoint": f"{BASE_URL}/api/estimate",
+                "method": "POST",
+                "payload": {"industry": "education", "size": 50000},
+                "slo": {"p99_ms": 500, "error_rate": 0.01},
+                "start_rps": 10,
+                "max_rps": 5000
+            },
+            {
+                "name": "AI Assistant",
+                "endpoint": f"{BASE_URL}/api/ai-assistant",
+                "method": "POST",
+                "payload": {"message": "Generate a security proposal", "conversationId": "capacity-test"},
+                "slo": {"p99_ms": 5000, "error_rate": 0.01},
+                "start_rps": 1,
+                "max_rps": 500
+            },
+            {
+                "name": "Super Agent Orchestrate",
+                "endpoint": f"{SUPER_AGENT_URL}/orchestrate",
+                "method": "POST",
+                "payload": {"prompt": "Compare IP camera specs", "user_id": "capacity-test", "max_iterations": 1},
+                "headers": {"X-API-Key": "super-agent-dev-key-12345"},
+                "slo": {"p99_ms": 10000, "error_rate": 0.01},
+                "start_rps": 1,
+                "max_rps": 200
+            }
+        ]
 
-            if not result["passed"]:
-                self._create_issue("ADMIN", result)
+    def _search_capacity(self, test):
+        """Exponential-then-binary rate search for one endpoint"""
+        probe_s = test.get("probe_s", 5)
+
+        def probe(rate):
+            count = max(1, int(rate * probe_s))
+            sink = ResultSink(log_path_for(self.run_id, f"capacity {test['name']} {rate:.1f}rps"))
+            start = time.perf_counter()
+            self._run_open_loop(test, rate, count, sink)
+            elapsed = time.perf_counter() - start
+            sink.close()
+            s = sink.histogram.summary()
+            print(f"   {test['name']}: {rate:.1f} req/s -> p99 {s['p99_ms']:.0f}ms, "
+                  f"{sink.failures}/{sink.requests} errors")
+            return {
+                "requests": sink.requests,
+                "achieved_rps": sink.successes / elapsed if elapsed else 0.0,
+                "error_rate": sink.failures / sink.requests if sink.requests else 1.0,
+                "p50_ms": s["p50_ms"],
+                "p99_ms": s["p99_ms"],
+                "max_ms": s["max_ms"]
+            }
+
+        search = CapacitySearch(
+            probe,
+            slo=test.get("slo"),
+            start_rps=test.get("start_rps", 1),
+            max_rps=test.get("max_rps", 10000),
+            max_probes=test.get("max_probes", 12)
+        )
+        result = search.run()
+        print(f"📈 {test['name']}: max sustainable {result['max_sustainable_rps']:.1f} req/s")
+        return {"name": test["name"], "endpoint": test["endpoint"], "probe_s": probe_s, **result}
+
+    def run_fuzz_tests(self):
+        """Fire thousands of mutated payloads per attack vector and report distinct anomalous responses"""
+        print("\n🧪 Running Security Fuzzing...")
+
+        self.preflight()
+        for target in self._fuzz_tests():
+            reason = self._skip_reason(base_url(target["endpoint"]))
+            if reason is not None:
+                print(f"⏭️ Fuzz - {target['name']}: {reason}")
+                continue
+            result = self._fuzz_target(target)
+            self.fuzz_results.append(result)
+            for cluster in result["anomalies"]:
+                vectors = ", ".join(sorted(cluster["vectors"]))
+                self._create_issue("SECURITY", {
+                    "name": f"Fuzz - {target['name']}",
+                    "endpoint": target["endpoint"],
+                    "status_code": cluster["status"],
+                    "error": f"{cluster['count']} {vectors} payloads -> {cluster['anomaly']} (HTTP {cluster['status']})",
+                    "details": json.dumps({
+                        "examples": cluster["examples"],
+                        "vectors": cluster["vectors"],
+                        "max_latency_ms": round(cluster["max_latency_ms"], 1),
+                        "sample_response": cluster["sample"]
+                    }, indent=2, default=str)
+                }, retest=("fuzz", {
+                    "target": dict(target, vectors=sorted(cluster["vectors"])),
+                    "anomaly": cluster["anomaly"],
+                    "status": cluster["status"]
+                }))
+        return self.fuzz_results
+
+    def _fuzz_tests(self):
+        """Fuzz targets - request template, fields the payload goes into, and attack vectors
+
+        "reject": True means a 2xx is itself suspicious (e.g. a login accepting an injection).
+        """
+        return [
+            {
+                "name": "Login Form",
+                "endpoint": f"{BASE_URL}/api/auth/[...nextauth]",
+                "payload": {"username": "fuzz-user", "password": "fuzz-password"},
+                "fields": ["username", "password"],
+                "vectors": ["sqli", "nosql"],
+                "reject": True
+            },
+            {
+                "name": "AI Assistant Input",
+                "endpoint": f"{BASE_URL}/api/ai-assistant",
+                "payload": {"message": "Generate a security proposal", "conversationId": "fuzz-test"},
+                "fields": ["message"],
+                "vectors": ["xss", "ssti", "cmd"],
+                "reject": False
+            },
+            {
+                "name": "Estimate API",
+                "endpoint": f"{BASE_URL}/api/estimate",
+                "payload": {"industry": "education", "size": 50000},
+                "fields": ["industry", "size"],
+                "vectors": ["sqli", "nosql", "boundary"],
+                "reject": False
+            },
+            {
+                "name": "Super Agent Orchestrate",
+                "endpoint": f"{SUPER_AGENT_URL}/orchestrate",
+                "payload": {"prompt": "Compare IP camera specs", "user_id": "fuzz-test", "max_iterations": 1},
+                "headers": {"X-API-Key": "super-agent-dev-key-12345"},
+                "fields": ["prompt"],
+                "vectors": ["ssti", "cmd", "prompt"],
+                "reject": False
+            }
+        ]
+
+    def _fuzz_target(self, target):
+        """Benign baseline, then every mutation of every vector, clustered by response signature"""
+        test = {key: target[key] for key in ("endpoint", "payload", "headers") if key in target}
+        test.update(
+            name=f"Fuzz - {target['name']}", method="POST", max_in_flight=fuzzer.CONCURRENCY,
+            body_bytes=fuzzer.BODY_BYTES, deadline_at=self.run_deadline_at
+        )
+
+        baseline = self._fuzz_send([test] * fuzzer.BASELINE_REQUESTS)
+        latencies = sorted(r.get("latency_ms") or 0.0 for r in baseline)
+        slow_ms = max(fuzzer.SLOW_MIN_MS, fuzzer.SLOW_FACTOR * latencies[len(latencies) // 2])
+        clusters = fuzzer.ResponseClusters(
+            reject=target["reject"],
+            baseline_statuses={r.get("status_code") or "no response" for r in baseline},
+            slow_ms=slow_ms
+        )
+
+        def generate():
+            for vector in target["vectors"]:
+                for i, payload in enumerate(fuzzer.mutations(vector)):
+                    field = target["fields"][i % len(target["fields"])]  # The other fields keep benign values
+                    yield vector, field, payload, {**test, "payload": {**test["payload"], field: payload}}
+
+        cases = generate()
+        start = time.perf_counter()
+        histogram = LatencyHistogram()
+        while True:
+            batch = list(itertools.islice(cases, fuzzer.BATCH_SIZE))
+            if not batch:
+                break
+            results = self._fuzz_send([request for _, _, _, request in batch])
+            for (vector, field, payload, _), result in zip(batch, results):
+                clusters.add(vector, payload, result, field)
+                if result.get("latency_ms") is not None:
+                    histogram.record(result["latency_ms"])
+        elapsed = time.perf_counter() - start
+
+        anomalies = clusters.anomalies()
+        print(f"🧪 {target['name']}: {clusters.requests:,} payloads in {elapsed:.1f}s, "
+              f"{len(clusters.clusters)} response clusters, {len(anomalies)} anomalous")
+        return {
+            "name": target["name"],
+            "endpoint": target["endpoint"],
+            "vectors": target["vectors"],
+            "requests": clusters.requests,
+            "duration_s": elapsed,
+            "rps": clusters.requests / elapsed if elapsed else 0.0,
+            "baseline_statuses": sorted(map(str, clusters.baseline_statuses)),
+            "slow_ms": slow_ms,
+            "clusters": len(clusters.clusters),
+            "latency": histogram.summary(),
+            "anomalies": anomalies
+        }
+
+    def _fuzz_send(self, tests):
+        """One request per test dict, results in order (async engine, else threads)"""
+        engine = self._get_async_engine() if self.engine == "async" else None
+        if engine is not None:
+            return engine.run_batch(tests)
+
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(max_workers=fuzzer.CONCURRENCY) as executor:
+            return list(executor.map(self._make_request, tests))
 
     def _execute_stress_test(self, test):
         """Execute a stress test"""
+        sink = ResultSink(log_path_for(self.run_id, test["name"]), time_series="stages" in test)
+        sampler = self._start_sampler()
+        replay = None
         try:
             start_time = time.time()
 
-            if "concurrent" in test:
+            if "stages" in test:
+                # Staged load profile - ramp / soak / spike, with a per-second time series
+                self._run_profile(test, sink)
+                passed = sink.successes >= sink.requests * 0.8 and sink.requests > 0
+
+            elif "concurrent" in test:
                 # Concurrent requests test
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor(max_workers=test["concurrent"]) as executor:
-                    futures = [
-                        executor.submit(self._make_request, test)
-                        for _ in range(test["concurrent"])
-                    ]
-                    results = [f.result() for f in futures]
-
-                success_count = sum(1 for r in results if r.get("success", False))
-                passed = success_count == test["concurrent"]
-
-            elif "rapid_fire" in test:
-                # Rapid fire test
-                results = []
-                for _ in range(test["rapid_fire"]):
-                    result = self._make_request(test)
-                    results.append(result)
-                    time.sleep(0.01)  # 10ms between requests = 100/sec
-
-                success_count = sum(1 for r in results if r.get("success", False))
-                passed = success_count >= test["rapid_fire"] * 0.8  # 80% success rate acceptable
+                self._run_concurrent(test, test["concurrent"], sink)
+                passed = sink.successes == test["concurrent"]
+
+            elif "rate_per_sec" in test or "rapid_fire" in test:
+                # Open-loop rate test - fixed timetable, latency from intended send time
+                rate = test.get("rate_per_sec", 100)  # rapid_fire default: 10ms apart = 100/sec
+                if "rapid_fire" in test:
+                    count = test["rapid_fire"]
+                elif test.get("duration_s", 0) <= 0:
+                    raise ValueError("A rate_per_sec test needs a positive duration_s (or rapid_fire: a request count)")
+                else:
+                    count = max(1, int(rate * test["duration_s"]))
+                self._run_open_loop(test, rate, count, sink)
+                passed = sink.successes >= count * 0.8  # 80% success rate acceptable
+
+            elif "replay" in test:
+                # Captured traffic at its original inter-arrival timing (or `speed` times faster)
+                replay, endpoints = self._run_replay(test, sink)
+                passed = sink.successes >= sink.requests * 0.8 and sink.requests > 0
 
             else:
                 # Single request test
-                result = self._make_request(test)
-                passed = result.get("success", False)
-                results = [result]
+                sink.add(self._make_request(test))
+                passed = sink.successes == 1
 
             duration = time.time() - start_time
+            sink.close()
+            samples = sampler.stop() if sampler is not None else None
+            if replay is None:
+                histogram = self._record_latencies(test, [], sink.histogram, sink.phases)
+            else:
+                histogram = sink.histogram  # Latencies are recorded under each replayed endpoint instead
+                for request, endpoint_sink in endpoints.values():
+                    self._record_latencies(request, [], endpoint_sink.histogram, endpoint_sink.phases)
 
-            return {
+            result = {
                 "name": test["name"],
+                "endpoint": test["endpoint"],
                 "passed": passed,
                 "duration_ms": duration * 1000,
-                "details": f"Success: {success_count}/{len(results)}" if "success_count" in locals() else "Completed",
-                "results": results
+                "details": f"Success: {sink.successes}/{sink.requests}",
+                "latency": histogram.summary(),
+                "histogram": histogram,
+                **sink.summary()
             }
+            if sink.halted is not None:
+                # Stopped early - the unsent rest is one note here, not a failed request each
+                halt = sink.halted
+                unsent = f", {halt['unsent']} requests unsent" if halt.get("unsent") is not None else ""
+                left = f", {halt['remaining_s']:.1f}s of schedule left" if halt.get("remaining_s") is not None else ""
+                result.update(passed=False, error=halt["reason"])
+                result["details"] += f" (stopped early: {halt['reason']}{unsent}{left})"
+            if samples is not None:
+                result["resources"] = self._resource_usage(test, samples, start_time, sink.series)
+            if replay is not None:
+                result["details"] += f" across {len(endpoints)} endpoints at {replay.speed:g}x"
+                result["replay"] = replay.summary()
+                result["endpoints"] = {
+                    key: {
+                        "requests": endpoint_sink.requests,
+                        "successes": endpoint_sink.successes,
+                        "status_codes": endpoint_sink.status_codes,
+                        "latency": endpoint_sink.histogram.summary()
+                    }
+                    for key, (_, endpoint_sink) in sorted(endpoints.items())
+                }
+            if sink.series is not None:
+                result["stages"] = test["stages"]
+                result["time_series"] = sink.series
+                result["time_series_file"] = self._save_time_series(test, sink.series, result.get("resources"))
+            return result
 
         except Exception as e:
+            sink.close()
+            if sampler is not None:
+                sampler.stop()
             return {
                 "name": test["name"],
+                "endpoint": test["endpoint"],
                 "passed": False,
                 "error": str(e),
                 "duration_ms": 0
             }
 
+    def _run_concurrent(self, test, count, sink):
+        """Fire `count` copies of a request at once, streaming results into `sink`"""
+        engine = self._get_async_engine() if self.engine == "async" else None
+
+        if engine is None:
+            import concurrent.futures
+            with concurrent.futures.ThreadPoolExecutor(max_workers=count) as executor:
+                for _ in range(count):
+                    executor.submit(self._make_request, test).add_done_callback(lambda f: sink.add(f.result()))
+            return
+
+        if self._coordinator is not None:
+            self._coordinator.run(test, count, sink, self.run_id)
+        else:
+            engine.run(test, count, on_result=sink.add)
+
+    def _run_open_loop(self, test, rate_per_sec, count, sink):
+        """Fire `count` requests at a constant arrival rate, streaming results into `sink`"""
+        engine = self._get_async_engine() if self.engine == "async" else None
+
+        if engine is not None:
+            if self._coordinator is not None:
+                self._coordinator.run_open_loop(test, rate_per_sec, count, sink, self.run_id)
+            else:
+                engine.run_open_loop(test, rate_per_sec, count, on_result=sink.add, on_halt=sink.halt)
+            return
+
+        import concurrent.futures
+
+        interval = 1.0 / rate_per_sec
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(count, 256)) as executor:
+            start = time.perf_counter()
+            for i in range(count):
+                intended = start + i * interval
+                delay = intended - time.perf_counter()
+                reason = target_health.halt_reason(test, self.breaker, delay)
+                if reason is not None:
+                    sink.halt(target_health.halted(reason, unsent=count - i, remaining_s=(count - i) * interval))
+                    break
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._scheduled_request, test, intended, sink.add)
+
+    def _run_replay(self, test, sink):
+        """Replay a test's captured traffic log into `sink`
+
+        Returns the ReplayLog (read counters) and "METHOD /path (host)" -> (first request, ResultSink) -
+        a capture can hit the same path on both services. Replays always run in this
+        process: the log is read once, in order.
+        """
+        log = traffic_replay.ReplayLog(
+            test["replay"], {"app": BASE_URL, "super_agent": SUPER_AGENT_URL}, speed=test.get("speed", 1.0), base=test
+        )
+        endpoints = {}
+        lock = threading.Lock()
+
+        def record(request, result):
+            sink.add(result)
+            key = f"{self._endpoint_key(request)} ({urlsplit(request['endpoint']).netloc})"
+            with lock:
+                if key not in endpoints:
+                    endpoints[key] = (request, ResultSink())
+            endpoints[key][1].add(result)
+
+        print(f"   ▶️ Replaying {test['replay']} at {log.speed:g}x")
+        engine = self._get_async_engine() if self.engine == "async" else None
+        if engine is not None:
+            engine.run_replay(log, on_result=record, on_halt=sink.halt)
+            return log, endpoints
+
+        import concurrent.futures
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=256) as executor:
+            start = time.perf_counter()
+            for offset, request in log:
+                intended = start + offset
+                delay = intended - time.perf_counter()
+                reason = target_health.halt_reason(request, self.breaker, delay)
+                if reason is not None:
+                    sink.halt(target_health.halted(reason))  # The rest of the log is never read
+                    break
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._scheduled_request, request, intended, partial(record, request))
+        return log, endpoints
+
+    def _run_profile(self, test, sink):
+        """Run a test's load-profile stages, streaming results into `sink`"""
+        stages = test["stages"]
+        load_profile.validate(stages)
+        engine = self._get_async_engine() if self.engine == "async" else None
+
+        if engine is not None:
+            if self._coordinator is not None:
+                self._coordinator.run_profile(test, stages, sink, self.run_id)
+            else:
+                sink.series.origin = time.time()
+                engine.run_profile(test, stages, on_result=sink.add, on_halt=sink.halt)
+            return
+
+        import concurrent.futures
+
+        state = {"users": 0, "halted": None}
+        users = {}
+        sink.series.origin = time.time()
+        start = time.perf_counter()
+        stop = start + load_profile.duration(stages)
+
+        def user(index):
+            while index < state["users"] and time.perf_counter() < stop and not halt(0.0):
+                sink.add(self._make_request(test))
+
+        def halt(delay):
+            """Stop the profile (once) if the deadline or an open breaker says so"""
+            if state["halted"] is None:
+                reason = target_health.halt_reason(test, self.breaker, delay)
+                if reason is not None:
+                    state["halted"] = reason
+                    state["users"] = 0
+                    sink.halt(target_health.halted(reason, remaining_s=max(0.0, stop - time.perf_counter())))
+            return state["halted"] is not None
+
+        workers = max(1, min(1024, int(load_profile.peak(stages, "concurrency")) + 256))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            for segment in load_profile.segments(stages):
+                if segment.kind == "rate_per_sec":
+                    state["users"] = 0
+                    for offset in load_profile.arrivals(segment):
+                        intended = start + offset
+                        delay = intended - time.perf_counter()
+                        if halt(delay):
+                            break
+                        if delay > 0:
+                            time.sleep(delay)
+                        executor.submit(self._scheduled_request, test, intended, sink.add)
+                    if state["halted"]:
+                        break
+                    continue
+
+                end = start + segment.end
+                while time.perf_counter() < end and not halt(0.0):
+                    state["users"] = int(round(load_profile.value_at(segment, time.perf_counter() - start)))
+                    for index in range(state["users"]):
+                        if index not in users or users[index].done():
+                            users[index] = executor.submit(user, index)
+                    time.sleep(min(0.1, max(0.0, end - time.perf_counter())))
+
+            delay = stop - time.perf_counter()
+            if delay > 0 and not state["halted"] and target_health.halt_reason(test, self.breaker, delay) is None:
+                time.sleep(delay)
+            state["users"] = 0
+
+    def _scheduled_request(self, test, intended, deliver):
+        """Thread-engine send for a timetable slot - latency charged from the intended send time"""
+        sent = time.perf_counter()
+        result = self._make_request(test)
+        if not result.get("skipped"):
+            result["latency_ms"] = (time.perf_counter() - intended) * 1000
+            result["schedule_lag_ms"] = (sent - intended) * 1000
+        deliver(result)
+
+    def _series_rows(self, stages, series, max_rows=None):
+        """Time series rows, each with the profile's target load mid-window"""
+        rows = series.rows(max_rows)
+        for row in rows:
+            row["target_kind"], row["target"] = load_profile.target_at(stages, row["t"] + row["seconds"] / 2)
+        return rows
+
+    def _save_time_series(self, test, series, resources=None):
+        """Per-second rows as compact columns -> runs/{run_id}/{test}.series.json
+
+        Target resource samples go alongside, on the same t axis (seconds since the origin).
+        """
+        rows = self._series_rows(test["stages"], series)
+        columns = list(rows[0]) if rows else []
+        data = {"columns": columns, "rows": [[row[c] for c in columns] for row in rows]}
+        if resources:
+            data["resources"] = {
+                name: {
+                    "columns": ["t"] + list(resource_sampler.Sample._fields[1:]),
+                    "rows": [[round(s.ts - series.origin, 3), *s[1:]] for s in usage["samples"]]
+                }
+                for name, usage in resources.items()
+            }
+        path = log_path_for(self.run_id, test["name"]).with_suffix(".series.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        return str(path)
+
+    def _start_sampler(self):
+        """Sample the target processes during a stress test (None when none are configured)"""
+        with self._lock:
+            if self._resource_targets is None:
+                self._resource_targets = resource_sampler.resolve_targets()
+        if not self._resource_targets:
+            return None
+        return resource_sampler.ResourceSampler(self._resource_targets).start()
+
+    def _resource_usage(self, test, samples, start_time, series=None):
+        """Per-target summary and leak check; constant-load (soak) stages are the leak windows"""
+        windows = []
+        if series is not None:
+            for i, segment in enumerate(load_profile.segments(test["stages"])):
+                if segment.start_value == segment.end_value:
+                    windows.append((series.origin + segment.start, series.origin + segment.end, f"in stage {i + 1}"))
+        if not windows:
+            windows = [(start_time, time.time(), "under load")]
+
+        return {
+            name: {
+                "pids": self._resource_targets[name],
+                **resource_sampler.summarize(target_samples),
+                "leaks": resource_sampler.find_leaks(target_samples, windows),
+                "samples": target_samples
+            }
+            for name, target_samples in samples.items()
+        }
+
+    def _get_async_engine(self):
+        """Lazily build the asyncio engine, falling back to threads if aiohttp is missing"""
+        with self._lock:
+            if self._async_engine is None:
+                try:
+                    from load_engine import AsyncLoadEngine
+                except ImportError:
+                    print("⚠️ aiohttp not installed - falling back to thread engine (pip install aiohttp)")
+                    self.engine = "threads"
+                    return None
+                self._async_engine = AsyncLoadEngine(breaker=self.breaker)
+
+                from distributed import DistributedCoordinator
+                coordinator = DistributedCoordinator()
+                if coordinator.worker_count > 1 or coordinator.remote_workers:
+                    print(f"🛰️ Distributing load across {coordinator.worker_count} workers")
+                    self._coordinator = coordinator
+            return self._async_engine
+
+    def start_workers(self):
+        """Start distributed load workers (TEST_AGENT_WORKERS / _REMOTE_WORKERS) up front
+
+        Called for every command (stress tests also run under capacity and
+        monitor), so local workers are forked before the progress line,
+        /metrics or the scheduler start a thread - see DistributedCoordinator.start().
+        """
+        if self.engine != "async" or not (os.getenv("TEST_AGENT_WORKERS") or os.getenv("TEST_AGENT_REMOTE_WORKERS")):
+            return
+        self._get_async_engine()
+        if self._coordinator is not None:
+            self._coordinator.start()
+
     def _execute_security_test(self, test):
         """Execute a security/penetration test"""
         try:
             result = self._make_request(test)
+            self._record_latencies(test, [result])
 
             # Security tests check for proper error handling
             if "expect_redirect" in test:
@@ -272,14 +1061,17 @@ class TestAgent:
 
             return {
                 "name": test["name"],
+                "endpoint": test["endpoint"],
                 "passed": passed,
                 "status_code": result.get("status_code"),
+                "latency_ms": result.get("latency_ms"),
                 "details": result.get("error", "Security test passed - malicious input rejected")
             }
 
         except Exception as e:
             return {
                 "name": test["name"],
+                "endpoint": test.get("endpoint"),
                 "passed": False,
                 "error": str(e)
             }
@@ -288,82 +1080,250 @@ class TestAgent:
         """Execute a UX test"""
         try:
             if "steps" in test:
-                # Multi-step workflow
-                all_passed = True
-                for step in test["steps"]:
-                    result = self._make_request(step)
-                    if not result.get("success", False):
-                        all_passed = False
-                        break
-
-                return {
+                # Multi-step workflow - virtual users carrying state from step to step
+                stats = self._run_virtual_users(test)
+                funnel = stats.summary()
+                histogram = stats.histogram()
+                worst = max(range(len(test["steps"])), key=lambda i: stats.reached[i] - stats.completed[i])
+                dropped = stats.reached[worst] - stats.completed[worst]
+                result = {
                     "name": test["name"],
-                    "passed": all_passed,
-                    "details": f"Completed {len(test['steps'])} steps"
+                    "endpoint": test["steps"][worst]["endpoint"],  # Step losing the most users
+                    "status_code": (stats.failure_samples[worst] or {}).get("status_code"),
+                    "passed": funnel["journeys"] > 0 and funnel["completion_rate"] >= test.get("min_completion", 1.0),
+                    "details": (
+                        f"{funnel['completed']}/{funnel['journeys']} journeys completed all "
+                        f"{len(test['steps'])} steps ({test.get('virtual_users', 1)} users)"
+                    ),
+                    "latency": histogram.summary(),
+                    "histogram": histogram,
+                    "funnel": funnel
                 }
+                if dropped:
+                    sample = stats.failure_samples[worst] or {}
+                    reason = sample.get("error") or (f"HTTP {sample['status_code']}" if "status_code" in sample else None)
+                    result["error"] = (
+                        f"{dropped} of {funnel['journeys']} journeys dropped at '{stats.labels[worst]}'"
+                        + (f": {reason}" if reason else "")
+                    )
+                return result
             else:
                 # Single request
                 result = self._make_request(test)
+                self._record_latencies(test, [result])
                 return {
                     "name": test["name"],
+                    "endpoint": test["endpoint"],
                     "passed": result.get("success", False),
+                    "status_code": result.get("status_code"),
+                    "latency_ms": result.get("latency_ms"),
                     "details": result.get("data", "")
                 }
 
         except Exception as e:
             return {
                 "name": test["name"],
+                "endpoint": test.get("endpoint"),
                 "passed": False,
                 "error": str(e)
             }
 
+    def _run_virtual_users(self, test):
+        """Run a workflow as test["virtual_users"] concurrent users (default 1) -> WorkflowStats"""
+        from virtual_users import VirtualUser, WorkflowStats, drive
+
+        users = test.get("virtual_users", 1)
+        stats = WorkflowStats(test["steps"])
+        journeys = [VirtualUser(i, test, stats, seed=test.get("seed")).journey() for i in range(users)]
+        ramp_s = test.get("ramp_s", 0.0)
+
+        engine = self._get_async_engine() if self.engine == "async" else None
+        if engine is not None:
+            engine.run_users(journeys, test["steps"], ramp_s)
+        else:
+            import concurrent.futures
+
+            from http_pool import SessionPool
+
+            def user(index, journey):
+                time.sleep(ramp_s * index / users)
+                http = SessionPool()  # Own cookie jar and connections per user
+                try:
+                    drive(journey, partial(self._make_request, http=http))
+                finally:
+                    http.close()
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(users, 1024)) as executor:
+                list(executor.map(user, range(users), journeys))
+
+        for step, histogram, phases in zip(test["steps"], stats.histograms, stats.phases):
+            self._record_latencies(step, [], histogram, phases)
+        return stats
+
     def _execute_admin_test(self, test):
-        """Execute an admin panel test"""
+        """Execute an admin panel test (a "rate_per_sec" one as a burst that must never be limited)"""
+        if "rate_per_sec" in test:
+            return self._execute_unlimited_burst(test)
         try:
             result = self._make_request(test)
+            self._record_latencies(test, [result])
 
             return {
                 "name": test["name"],
+                "endpoint": test["endpoint"],
                 "passed": result.get("success", False),
                 "status_code": result.get("status_code"),
+                "latency_ms": result.get("latency_ms"),
                 "details": result.get("data", "")
             }
 
         except Exception as e:
             return {
                 "name": test["name"],
+                "endpoint": test.get("endpoint"),
                 "passed": False,
                 "error": str(e)
             }
 
-    def _make_request(self, test):
-        """Make HTTP request"""
+    def _execute_unlimited_burst(self, test):
+        """Open-loop rate test that passes only if every request got through - no 429s, no errors"""
+        result = self._execute_stress_test(test)
+        if "requests" not in result:
+            return result  # Never ran (bad definition) - already a failure with its error
+        limited = result["status_codes"].get("429", 0)
+        result["passed"] = result["passed"] and result["successes"] == result["requests"]
+        result["details"] += f", {limited} rate limited (429)"
+        return result
+
+    def _make_request(self, test, http=None):
+        """Make HTTP request
+
+        The body is streamed: only the first MAX_BODY_BYTES are kept, the rest is
+        discarded as it arrives (or, outside load tests, never read - see
+        stream_metrics.drains) while StreamTimer records TTFB and, for SSE or
+        chunked replies, first-token time, chunk gaps and token throughput.
+        The timed connection pool splits each request into phases (DNS, connect,
+        TLS, send, server, transfer). Live metrics count it in flight until it returns.
+        While the host's circuit is open it fails instantly without being sent.
+        """
+        target = base_url(test["endpoint"])
+        if not self.breaker.allow(target):
+            return target_health.skipped(target_health.UNAVAILABLE)
+        with METRICS.shard(test) as live:
+            result = live.record(self._send_request(test, http or self.http))
+        self.breaker.record(target, result)
+        return result
+
+    def _send_request(self, test, http):
+        """Send one request through `http` (a SessionPool) and stream its body into a result record"""
+        import requests  # Already loaded by http_pool
+
+        timeout = target_health.request_timeout(test)  # (connect, read), cut short by the test's deadline
+        if timeout is None:
+            return target_health.skipped(target_health.DEADLINE_EXCEEDED)
+        start = time.perf_counter()
         try:
             method = test.get("method", "POST")
             endpoint = test.get("endpoint")
             payload = test.get("payload", {})
             headers = test.get("headers", {})
 
-            if method == "GET":
-                response = requests.get(endpoint, headers=headers, timeout=30)
-            else:
-                response = requests.post(endpoint, json=payload, headers=headers, timeout=30)
+            cold = test.get("cold_connections", False)
 
+            with recording() as phases:
+                if method in ("GET", "HEAD"):
+                    response = http.request(method, endpoint, cold=cold, headers=headers, timeout=timeout, stream=True)
+                else:
+                    response = http.request(
+                        method, endpoint, cold=cold, json=payload, headers=headers, timeout=timeout, stream=True
+                    )
+
+            with response:
+                timer = StreamTimer(
+                    start,
+                    keep_bytes=test.get("body_bytes", MAX_BODY_BYTES),
+                    sse=is_event_stream(response.headers.get("Content-Type")),
+                    timed=test.get("stream", False) or response.headers.get("Transfer-Encoding") == "chunked"
+                )
+                timer.headers()
+                drain = drains(test, timer.sse)
+                for chunk in response.iter_content(READ_CHUNK_BYTES):
+                    timer.feed(chunk)
+                    if timer.satisfied and not drain:
+                        break  # Rest is never downloaded - the connection is closed, not reused
+
+            done = time.perf_counter()
+            phases.add("transfer", done - timer.headers_at)
             return {
                 "success": response.status_code in [200, 201],
                 "status_code": response.status_code,
-                "data": response.text[:500]  # First 500 chars
+                "data": timer.text(response.encoding),
+                "latency_ms": (done - start) * 1000,
+                "phases": phases.phases,
+                **timer.fields()
             }
 
         except requests.exceptions.RequestException as e:
             return {
                 "success": False,
-                "error": str(e)
+                "error": str(e),
+                "latency_ms": (time.perf_counter() - start) * 1000
             }
+        except Exception as e:  # Same as the async engine: one failed request, not a failed test
+            return {
+                "success": False,
+                "error": f"{type(e).__name__}: {e}",
+                "latency_ms": (time.perf_counter() - start) * 1000
+            }
+
+    def _record_latencies(self, test, results, histogram=None, phases=None):
+        """Fold per-request latencies into a per-test histogram and the per-endpoint histograms
+
+        Stress tests hand in the histogram and phase stats their ResultSink already built.
+        """
+        if histogram is None:
+            histogram = LatencyHistogram()
+            for result in results:
+                if result.get("latency_ms") is not None:
+                    histogram.record(result["latency_ms"])
+        if phases is None:
+            phases = PhaseStats()
+            for result in results:
+                if result.get("phases") and result.get("latency_ms") is not None:
+                    phases.record(result["latency_ms"], result["phases"])
+
+        key = self._endpoint_key(test)
+        with self._lock:
+            self.endpoint_histograms.setdefault(key, LatencyHistogram()).merge(histogram)
+            self.endpoint_phases.setdefault(key, PhaseStats()).merge(phases)
+        return histogram
+
+    def _endpoint_key(self, test):
+        """Group requests by method and path, e.g. 'POST /api/estimate'"""
+        return f"{test.get('method', 'POST')} {urlsplit(test['endpoint']).path}"
+
+    def _create_issue(self, category, test_result, retest=None):
+        """Write issue report for Claude Code to fix
+
+        A failure whose fingerprint is already indexed updates that issue instead
+        of creating a new file. Cached fix suggestions are filled in immediately;
+        the rest are queued and fetched concurrently by resolve_fix_suggestions().
+        `retest` - (kind, definition) of the test that reproduces it - is kept in
+        the issue index so monitor_fixes() can rerun it from any process.
+        """
+        fp = fingerprint(category, test_result)
+        entry = self.issue_index.get(fp)
+        if entry is not None and self._load_issue(entry["issue_id"]) is not None:
+            self._update_recurring_issue(fp, entry["issue_id"], test_result)
+            if retest is not None:
+                self.issue_index.register_test(entry["issue_id"], *retest)
+            return
 
-    def _create_issue(self, category, test_result):
-        """Write issue report for Claude Code to fix"""
         issue_id = f"{category}_{len(self.issues) + 1}_{int(time.time())}"
+        entry = self.issue_index.add(fp, issue_id)
+        if retest is not None:
+            self.issue_index.register_test(issue_id, *retest)
+        key, suggestion = self.suggester.lookup(category, test_result)
 
         issue = {
             "id": issue_id,
@@ -374,82 +1334,348 @@ class TestAgent:
             "error": test_result.get("error", "Test failed"),
             "details": test_result.get("details", ""),
             "timestamp": datetime.now().isoformat(),
-            "suggested_fix": self._generate_fix_suggestion(category, test_result)
+            "fingerprint": fp,
+            "occurrences": entry["count"],
+            "first_seen": entry["first_seen"],
+            "last_seen": entry["last_seen"],
+            "suggested_fix": suggestion
         }
 
-        # Write to issues folder
-        issue_file = ISSUES_DIR / f"{issue_id}.json"
-        with open(issue_file, 'w', encoding='utf-8') as f:
-            json.dump(issue, f, indent=2, ensure_ascii=False)
+        if suggestion is None:
+            self._awaiting_suggestion.append((issue, key))
+        else:
+            self._write_issue(issue)
 
         print(f"🚨 Issue Created: {issue_id} - {test_result['name']}")
         self.issues.append(issue)
+        self._issues_by_id[issue_id] = issue
 
-    def _generate_fix_suggestion(self, category, test_result):
-        """Use GPT-4 to generate fix suggestion"""
-        try:
-            prompt = f"""
-You are a senior security engineer. A {category} test failed with the following details:
-
-Test: {test_result['name']}
-Error: {test_result.get('error', 'N/A')}
-Details: {test_result.get('details', 'N/A')}
-
-Provide a specific, actionable fix suggestion including:
-1. Root cause analysis
-2. Specific file(s) to modify
-3. Code changes needed
-4. Security best practices to implement
-
-Be concise but detailed.
-"""
-
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=500
-            )
+    def _load_issue(self, issue_id):
+        """Issue from this run, or from its file in issues/ (None if gone)"""
+        issue = self._issues_by_id.get(issue_id)
+        if issue is not None:
+            return issue
 
-            return response.choices[0].message.content
-
-        except Exception as e:
-            return f"Failed to generate fix suggestion: {str(e)}"
-
-    def monitor_fixes(self):
-        """Monitor test-reports/fixes/ for Claude's solutions"""
-        print("\n👀 Monitoring for fixes from Claude Code...")
-
-        for issue in self.issues:
-            fix_file = FIXES_DIR / f"{issue['id']}_FIXED.json"
-
-            if fix_file.exists():
-                print(f"✅ Fix found for {issue['id']} - Retesting...")
+        issue_file = ISSUES_DIR / f"{issue_id}.json"
+        if not issue_file.exists():
+            return None
+        with open(issue_file, 'r', encoding='utf-8') as f:
+            issue = json.load(f)
+        self.issues.append(issue)  # Recurring issues are monitored like new ones
+        self._issues_by_id[issue_id] = issue
+        return issue
+
+    def _update_recurring_issue(self, fp, issue_id, test_result):
+        """Bump occurrence count / last seen on the existing issue file"""
+        entry = self.issue_index.touch(fp)
+        issue = self._issues_by_id[issue_id]
+        issue["occurrences"] = entry["count"]
+        issue["first_seen"] = issue.get("first_seen", entry["first_seen"])
+        issue["last_seen"] = entry["last_seen"]
+        issue["error"] = test_result.get("error", "Test failed")
+        issue["details"] = test_result.get("details", "")
+        if issue.get("status") == "FIXED":
+            issue["status"] = "REOPENED"
+
+        if issue.get("suggested_fix") is not None:  # Still awaiting GPT-4 otherwise
+            self._write_issue(issue)
+        print(f"🔁 Recurring Issue: {issue_id} - {test_result['name']} (seen {entry['count']} times)")
+
+    def _write_issue(self, issue):
+        """Write to issues folder"""
+        issue_file = ISSUES_DIR / f"{issue['id']}.json"
+        with open(issue_file, 'w', encoding='utf-8') as f:
+            json.dump(issue, f, indent=2, ensure_ascii=False)
 
-                with open(fix_file, 'r') as f:
+    def resolve_fix_suggestions(self):
+        """Fetch uncached GPT-4 suggestions in one concurrent batch and write those issues"""
+        if not self._awaiting_suggestion:
+            return
+
+        print(f"\n🧠 Generating {len(self._awaiting_suggestion)} fix suggestions...")
+        suggestions = self.suggester.resolve()
+        for issue, key in self._awaiting_suggestion:
+            issue["suggested_fix"] = suggestions.get(key, "Failed to generate fix suggestion")
+            self._write_issue(issue)
+        self._awaiting_suggestion = []
+
+    def monitor_fixes(self, follow=True):
+        """Retest each issue as soon as Claude writes fixes/{issue_id}_FIXED.json
+
+        Fix files already waiting are handled first; with `follow` the watcher
+        then blocks on fixes/ (inotify, or polling where that's unavailable)
+        until interrupted. Only the test registered for each issue is rerun -
+        stress tests several times - and fixes landing together are retested
+        in parallel under the usual per-host budgets.
+        """
+        watcher = FixWatcher(FIXES_DIR)
+        print(f"\n👀 Monitoring {FIXES_DIR} for fixes from Claude Code ({watcher.mode})...")
+        try:
+            for paths in watcher.batches(follow=follow):
+                self._retest_fixes(paths)
+                self.resolve_fix_suggestions()
+        except KeyboardInterrupt:
+            print("👋 Stopped monitoring fixes")
+        finally:
+            watcher.close()
+        return self.retests
+
+    def _retest_fixes(self, paths):
+        """Retest the issues behind a batch of fix files, in parallel"""
+        scheduler = TestScheduler(budgets=TARGET_BUDGETS)
+        pending = {}
+        for path in paths:
+            issue_id = issue_id_of(path)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
                     fix_data = json.load(f)
+                fix_mtime = path.stat().st_mtime_ns
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Can't read {path.name} yet ({e}) - waiting for the next write")
+                continue
+            issue = self._load_issue(issue_id)
+            if issue is None:
+                print(f"⚠️ {path.name}: no issue {issue_id} in {ISSUES_DIR}")
+                continue
+            if issue.get("retest", {}).get("fix_mtime") == fix_mtime:
+                continue  # This version of the fix was already retested
+            if issue_id in pending:
+                continue
+
+            kind, definition = self.issue_index.test_for(issue_id) or (None, None)
+            print(f"🔧 Fix found for {issue_id} - retesting {issue['test_name']}...")
+            pending[issue_id] = (issue, fix_data, fix_mtime)
+            scheduler.add(
+                issue_id,
+                partial(self._retest_issue, issue, fix_data),
+                target=self._retest_target(kind, definition),
+                exclusive=kind in ("stress_tests", "fuzz")  # Load-generating retests get their host to themselves
+            )
 
-                # Retest the original test
-                retest_result = self._retest_issue(issue, fix_data)
-
-                if retest_result["passed"]:
-                    print(f"✅ Fix confirmed for {issue['id']}")
-                    self.fixes.append({
-                        "issue_id": issue['id'],
-                        "status": "FIXED",
-                        "fix_data": fix_data,
-                        "retest_passed": True
-                    })
-                else:
-                    print(f"❌ Fix failed for {issue['id']} - Needs rework")
-                    self._create_issue("FIX_FAILED", retest_result)
+        if not pending:
+            return
+        start = time.perf_counter()
+        results = scheduler.run()
+        for issue_id, (issue, fix_data, fix_mtime) in pending.items():
+            self._record_retest(issue, fix_data, fix_mtime, results[issue_id])
+        print(f"🔧 Retested {len(pending)} issues in {time.perf_counter() - start:.1f}s")
+
+    def _retest_target(self, kind, definition):
+        """Host a registered retest talks to (None if nothing is registered)"""
+        if kind in SUITES:
+            return self._target_of(definition)
+        if kind == "fuzz":
+            return base_url(definition["target"]["endpoint"])
+        if kind == "target":
+            return definition["endpoint"]
+        return None
 
     def _retest_issue(self, issue, fix_data):
-        """Retest a fixed issue"""
-        # TODO: Implement retesting logic based on original test
-        return {"passed": True, "details": "Retesting not yet implemented"}
+        """Rerun the test registered for an issue -> result with passed True / False / None (can't retest)"""
+        registered = self.issue_index.test_for(issue["id"])
+        if registered is None:
+            return {"name": issue["test_name"], "passed": None,
+                    "details": "No test registered for this issue - verify the fix by hand"}
+
+        kind, definition = registered
+        if kind in SUITES:
+            return self._retest_test(kind, definition)
+        if kind == "fuzz":
+            return self._retest_fuzz(definition)
+        if kind == "target":
+            probe = target_health.probe(definition["endpoint"])
+            if probe["up"]:
+                self.breaker.record(definition["endpoint"], probe)
+            return {
+                "name": issue["test_name"],
+                "endpoint": definition["endpoint"],
+                "passed": probe["up"],
+                "status_code": probe.get("status_code"),
+                "error": probe.get("error"),
+                "details": f"{target_health.HEALTH_PATH} probe: " + (
+                    f"HTTP {probe['status_code']} in {probe['latency_ms']:.0f}ms" if probe["up"] else "no response"
+                )
+            }
+        return {"name": issue["test_name"], "passed": None, "details": f"Don't know how to retest '{kind}' issues"}
+
+    def _retest_test(self, suite, test):
+        """Run one suite test again - stress tests RETEST_TRIALS times, confirmed by their pass rate"""
+        _, executor, _ = SUITES[suite]
+        trials = RETEST_TRIALS if suite == "stress_tests" else 1
+        results = []
+        for trial in range(trials):
+            name = f"{test['name']} - retest {trial + 1}" if trials > 1 else test["name"]
+            results.append(getattr(self, executor)(self._with_deadline({**test, "name": name})))
+
+        passes = sum(1 for r in results if r["passed"])
+        failed = next((r for r in results if not r["passed"]), None)
+        result = {
+            "name": test["name"],
+            "endpoint": test.get("endpoint") or test["steps"][0]["endpoint"],
+            "passed": confirmed(passes, trials),
+            "trials": trials,
+            "passes": passes,
+            "status_code": (failed or results[-1]).get("status_code"),
+            "details": f"{passes}/{trials} trials passed"
+        }
+        if failed is not None:
+            result["error"] = failed.get("error") or failed.get("details", "Test failed")
+        requests_sent = sum(r.get("requests", 0) for r in results)
+        if requests_sent:
+            histogram = LatencyHistogram()
+            for r in results:
+                if r.get("histogram") is not None:
+                    histogram.merge(r["histogram"])
+            failures = sum(r.get("failures", 0) for r in results)
+            result["details"] += (
+                f", {failures}/{requests_sent} requests failed, "
+                f"p99 {histogram.summary()['p99_ms']:.0f}ms across trials"
+            )
+        return result
+
+    def _retest_fuzz(self, definition):
+        """Fuzz the issue's vectors again; fixed when the original anomaly no longer shows up"""
+        target = definition["target"]
+        run = self._fuzz_target(target)
+        same = [
+            c for c in run["anomalies"]
+            if c["anomaly"] == definition["anomaly"] and c["status"] == definition["status"]
+        ]
+        result = {
+            "name": f"Fuzz - {target['name']}",
+            "endpoint": target["endpoint"],
+            "passed": not same,
+            "status_code": definition["status"],
+            "details": (
+                f"{run['requests']:,} {', '.join(target['vectors'])} payloads, "
+                f"{sum(c['count'] for c in same)} still -> {definition['anomaly']} (HTTP {definition['status']})"
+            )
+        }
+        if same:
+            result["error"] = f"{same[0]['count']} payloads still -> {definition['anomaly']} (HTTP {definition['status']})"
+        return result
+
+    def _record_retest(self, issue, fix_data, fix_mtime, result):
+        """Update the issue with the retest verdict; a failed fix opens a FIX_FAILED issue"""
+        verdict = {True: "FIXED", False: "FIX_FAILED", None: "FIX_UNVERIFIED"}[result["passed"]]
+        issue["status"] = verdict
+        issue["retest"] = {
+            "fix_mtime": fix_mtime,
+            "timestamp": datetime.now().isoformat(),
+            "passed": result["passed"],
+            "details": result.get("details", ""),
+            "error": result.get("error")
+        }
+        self.retests.append({"issue_id": issue["id"], "test_name": result["name"], "status": verdict,
+                             "details": result.get("details", "")})
+
+        if result["passed"]:
+            print(f"✅ Fix confirmed for {issue['id']} ({result.get('details', '')})")
+            self.fixes.append({
+                "issue_id": issue['id'],
+                "status": "FIXED",
+                "fix_data": fix_data,
+                "retest_passed": True
+            })
+        elif result["passed"] is None:
+            print(f"❔ Fix for {issue['id']} not verified: {result['details']}")
+        else:
+            print(f"❌ Fix failed for {issue['id']} - Needs rework ({result.get('details', '')})")
+            with self._lock:
+                self._create_issue("FIX_FAILED", {
+                    **result,
+                    "details": f"Fix for {issue['id']} did not hold: {result.get('details', '')}\n\n"
+                               f"Changes made: {fix_data.get('changes_made', '-')}"
+                }, retest=self.issue_index.test_for(issue["id"]))  # Its fix is checked the same way
+        if issue.get("suggested_fix") is not None:
+            self._write_issue(issue)
+
+    def report_unavailable_targets(self):
+        """One AVAILABILITY issue per host whose circuit opened, instead of one per skipped test"""
+        for target, b in self.breaker.stats().items():
+            if not b["trips"] or target in self._unavailable_reported:
+                continue
+            self._unavailable_reported.add(target)
+            skipped = [
+                test["name"] for tests in self.test_results.values() for test in tests
+                if test.get("skipped") and test.get("error") == target_health.UNAVAILABLE
+                and base_url(test.get("endpoint") or "") == target
+            ]
+            with self._lock:
+                self._create_issue("AVAILABILITY", {
+                    "name": f"Target Unavailable - {target}",
+                    "endpoint": target,
+                    "passed": False,
+                    "error": f"No response from {target}: {b['reason']}",
+                    "details": (
+                        f"Circuit opened {b['trips']} time(s), {b['rejected']} requests failed fast. "
+                        f"Skipped tests: {', '.join(skipped) or 'none'}"
+                    )
+                }, retest=("target", {"endpoint": target}))
+
+    def _history_selection(self):
+        """What this run covered, as stored in the run history: "all", "tests:<names>" or the command"""
+        if self.mode != "run":
+            return self.mode
+        if self.selected is None:
+            return FULL_RUN
+        return "tests:" + ",".join(sorted(self.selected))
+
+    def check_regressions(self):
+        """Store this run in the history and compare it with the baseline run
+
+        Each endpoint's latency distribution is tested against the baseline's
+        (Mann-Whitney U); a significant, material slowdown opens a PERFORMANCE issue.
+        """
+        selection = self._history_selection()
+        try:
+            baseline_id = self.history.baseline(self.run_id, selection)
+        except ValueError as e:
+            print(f"⚠️ {e}")
+            baseline_id = None
+        measured = [test for test in self.test_results["stress_tests"] if not test.get("skipped")]
+        self.history.record(self.run_id, self.endpoint_histograms, measured, selection)
+        self.regressions = {"baseline": baseline_id, "endpoints": {}, "throughput": {}}
+        if baseline_id is None:
+            return self.regressions
+
+        print(f"\n📈 Comparing with baseline run {baseline_id}...")
+        before = self.history.histograms(baseline_id)
+        for endpoint, histogram in sorted(self.endpoint_histograms.items()):
+            if endpoint in before and histogram.total_count:
+                self.regressions["endpoints"][endpoint] = regression.compare(before[endpoint], histogram)
+
+        before_rps = self.history.throughput(baseline_id)
+        for test_name, rps in sorted(self.history.throughput(self.run_id).items()):
+            if before_rps.get(test_name):
+                self.regressions["throughput"][test_name] = (before_rps[test_name], rps)
+
+        for endpoint, r in self.regressions["endpoints"].items():
+            if r["verdict"] != "regression":
+                continue
+            with self._lock:
+                self._create_issue("PERFORMANCE", {
+                    "name": f"Latency Regression - {endpoint}",
+                    "endpoint": endpoint,
+                    "passed": False,
+                    "error": (
+                        f"p50 {r['baseline_p50_ms']:.0f}ms -> {r['current_p50_ms']:.0f}ms, "
+                        f"p99 {r['baseline_p99_ms']:.0f}ms -> {r['current_p99_ms']:.0f}ms "
+                        f"(Mann-Whitney p={r['p_value']:.2g})"
+                    ),
+                    "details": (
+                        f"Run {self.run_id} vs baseline run {baseline_id}: "
+                        f"{r['current_requests']} vs {r['baseline_requests']} requests"
+                    )
+                })
+        return self.regressions
 
     def generate_final_report(self):
         """Generate final test report"""
+        if self.regressions is None:
+            self.check_regressions()
+        self.report_unavailable_targets()
+        self.resolve_fix_suggestions()
         print("\n📊 Generating Final Report...")
 
         total_tests = sum(len(v) for v in self.test_results.values())
@@ -457,6 +1683,11 @@ Be concise but detailed.
             sum(1 for test in tests if test.get("passed", False))
             for tests in self.test_results.values()
         )
+        total_skipped = sum(
+            sum(1 for test in tests if test.get("skipped", False))
+            for tests in self.test_results.values()
+        )
+        total_run = total_tests - total_skipped
 
         report = f"""
 # AI Agent Testing Report
@@ -466,8 +1697,9 @@ Be concise but detailed.
 ## Summary
 - **Total Tests:** {total_tests}
 - **Passed:** {total_passed}
-- **Failed:** {total_tests - total_passed}
-- **Success Rate:** {(total_passed / total_tests * 100):.1f}%
+- **Failed:** {total_run - total_passed}
+- **Skipped:** {total_skipped}
+- **Success Rate:** {(total_passed / total_run * 100 if total_run else 0.0):.1f}%
 
 ## Test Categories
 
@@ -483,14 +1715,62 @@ Be concise but detailed.
 ### Admin Tests ({len(self.test_results['admin_tests'])} tests)
 {self._format_test_results(self.test_results['admin_tests'])}
 
+## Workflow Funnels
+{self._format_funnels(self.test_results['ux_tests'])}
+
+## Connection Pool
+{self._format_pool_stats()}
+
+## Target Availability
+{self._format_availability()}
+
+## Capacity
+{self._format_capacity(self.capacity_results)}
+
+## Security Fuzzing
+{self._format_fuzzing(self.fuzz_results)}
+
+## Performance vs Baseline
+{self._format_regressions(self.regressions)}
+
 ## Issues Created
 {len(self.issues)} issues written to test-reports/issues/
 
 ## Fixes Applied
 {len(self.fixes)} fixes confirmed from Claude Code
 
+{self._format_retests(self.retests)}
+
+## Latency
+
+### Per Test
+{self._format_latency_table(self._test_histograms())}
+
+### Per Endpoint
+{self._format_latency_table(self.endpoint_histograms)}
+
+### Request Phases (per endpoint)
+{self._format_phase_table(self.endpoint_phases)}
+
+### Time to First Byte & Streaming (stress tests)
+{self._format_streaming_table(self.test_results['stress_tests'])}
+
+### Load Profiles
+{self._format_load_profiles(self.test_results['stress_tests'])}
+
+### Traffic Replay (per endpoint)
+{self._format_replay(self.test_results['stress_tests'])}
+
+### Target Resources (stress tests)
+{self._format_resources(self.test_results['stress_tests'])}
+
+### Latency Distribution (all requests)
+{self._format_distribution(self._overall_histogram())}
+
 ## GPT-4 Agent Observations
-- Server response times averaged {self._calculate_avg_response_time():.0f}ms
+- Server latency: {self._format_latency_line(self._overall_histogram())}
+- Slowest tail: {self._format_tail_line(self.endpoint_phases)}
+- Target resources: {self._format_resource_line(self.test_results['stress_tests'])}
 - Most common failure: {self._get_most_common_failure()}
 - Security posture: {self._assess_security()}
 
@@ -502,6 +1782,7 @@ Be concise but detailed.
         report_file = FINAL_DIR / f"test-report-{int(time.time())}.md"
         with open(report_file, 'w', encoding='utf-8') as f:
             f.write(report)
+        self.report_file = report_file
 
         print(f"✅ Report saved to {report_file}")
         return report
@@ -513,16 +1794,425 @@ Be concise but detailed.
 
         lines = []
         for test in tests:
+            if test.get("skipped", False):
+                lines.append(f"- ⏭️ {test['name']} ({test['error']})")
+                continue
             status = "✅" if test.get("passed", False) else "❌"
             lines.append(f"- {status} {test['name']}")
         return "\n".join(lines)
 
-    def _calculate_avg_response_time(self):
-        """Calculate average response time across all tests"""
-        times = []
-        for tests in self.test_results.values():
-            times.extend([t.get("duration_ms", 0) for t in tests])
-        return sum(times) / len(times) if times else 0
+    def _test_histograms(self):
+        """Per-test histograms for every test that recorded one"""
+        return {
+            test["name"]: test["histogram"]
+            for tests in self.test_results.values()
+            for test in tests
+            if test.get("histogram") is not None
+        }
+
+    def _overall_histogram(self):
+        """Merge every endpoint histogram into one"""
+        overall = LatencyHistogram()
+        for histogram in self.endpoint_histograms.values():
+            overall.merge(histogram)
+        return overall
+
+    def _format_replay(self, tests):
+        """Per-endpoint table for each replayed traffic log"""
+        replayed = [test for test in tests if test.get("replay")]
+        if not replayed:
+            return "No traffic replayed (set TEST_AGENT_REPLAY_LOG)"
+
+        sections = []
+        for test in replayed:
+            replay = test["replay"]
+            lines = [
+                f"**{test['name']}** - `{replay['log']}` at {replay['speed']:g}x: {replay['requests']} requests, "
+                f"{replay['captured_s']:.1f}s captured in {replay['replay_s']:.1f}s "
+                f"({replay['invalid']} invalid lines, {replay['reordered']} out of order)",
+                "",
+                "| Endpoint | Requests | Success | Status Codes | p50 | p99 | Max |",
+                "|----------|----------|---------|--------------|-----|-----|-----|"
+            ]
+            for key, endpoint in test["endpoints"].items():
+                s = endpoint["latency"]
+                rate = endpoint["successes"] / endpoint["requests"] if endpoint["requests"] else 0.0
+                codes = ", ".join(f"{code}: {count}" for code, count in sorted(endpoint["status_codes"].items()))
+                lines.append(
+                    f"| {key} | {endpoint['requests']} | {rate:.1%} | {codes} | "
+                    f"{s['p50_ms']:.1f}ms | {s['p99_ms']:.1f}ms | {s['max_ms']:.1f}ms |"
+                )
+            sections.append("\n".join(lines))
+        return "\n\n".join(sections)
+
+    def _format_latency_table(self, histograms):
+        """Markdown percentile table for a {label: histogram} mapping"""
+        if not histograms:
+            return "No latency recorded"
+
+        lines = [
+            "| Name | Requests | p50 | p90 | p99 | p99.9 | Max |",
+            "|------|----------|-----|-----|-----|-------|-----|"
+        ]
+        for name, histogram in histograms.items():
+            s = histogram.summary()
+            lines.append(
+                f"| {name} | {s['count']} | {s['p50_ms']:.1f}ms | {s['p90_ms']:.1f}ms | "
+                f"{s['p99_ms']:.1f}ms | {s['p999_ms']:.1f}ms | {s['max_ms']:.1f}ms |"
+            )
+        return "\n".join(lines)
+
+    def _format_distribution(self, histogram):
+        """Markdown latency distribution table (1-2-5 ms bands)"""
+        rows = histogram.distribution()
+        if not rows:
+            return "No latency recorded"
+
+        lines = ["| Latency | Requests | Cumulative |", "|---------|----------|------------|"]
+        previous = 0
+        for bound, count, cumulative in rows:
+            label = f"≤ {bound}ms" if bound != float("inf") else f"> {previous}ms"
+            lines.append(f"| {label} | {count} | {cumulative:.1f}% |")
+            previous = bound
+        return "\n".join(lines)
+
+    def _format_load_profiles(self, tests, max_rows=40, bar_width=30):
+        """Per-test time series table with an ASCII throughput bar per window"""
+        profiled = [test for test in tests if test.get("time_series") is not None]
+        if not profiled:
+            return "No load profiles run"
+
+        sections = []
+        for test in profiled:
+            rows = self._series_rows(test["stages"], test["time_series"], max_rows)
+            peak = max([row["rps"] for row in rows] or [0]) or 1
+            origin = test["time_series"].origin
+            resources = test.get("resources") or {}
+            lines = [
+                f"**{test['name']}** ({len(test['stages'])} stages, per-second data in `{test['time_series_file']}`)",
+                "",
+                "| t (s) | Target | RPS | Errors | p50 | p99 |"
+                + "".join(f" {name} CPU | {name} RSS |" for name in resources) + " Throughput |",
+                "|-------|--------|-----|--------|-----|-----|" + "-----|-----|" * len(resources) + "------------|"
+            ]
+            for row in rows:
+                unit = "/s" if row["target_kind"] == "rate_per_sec" else " users" if row["target_kind"] else ""
+                window = f"{row['t']}" if row["seconds"] == 1 else f"{row['t']}-{row['t'] + row['seconds'] - 1}"
+                bar = "█" * int(round(row["rps"] / peak * bar_width))
+                usage = ""
+                for name, target in resources.items():
+                    stats = resource_sampler.window_stats(
+                        target["samples"], origin + row["t"], origin + row["t"] + row["seconds"]
+                    )
+                    usage += " - | - |" if stats is None else f" {stats[0]:.0f}% | {stats[1]:.0f}MB |"
+                lines.append(
+                    f"| {window} | {row['target']:.0f}{unit} | {row['rps']:.1f} | {row['error_rate'] * 100:.1f}% | "
+                    f"{row['p50_ms']:.0f}ms | {row['p99_ms']:.0f}ms |{usage} `{bar}` |"
+                )
+            sections.append("\n".join(lines))
+        return "\n\n".join(sections)
+
+    def _format_resources(self, tests):
+        """Per stress test and target: CPU, RSS, threads, FDs and suspected leaks"""
+        sampled = [test for test in tests if test.get("resources")]
+        if not sampled:
+            return "Target processes not sampled (set TEST_AGENT_SAMPLE_PORTS or TEST_AGENT_SAMPLE_PIDS)"
+
+        lines = [
+            "| Test | Target | RPS | CPU avg / max | RSS start → end (max) | Threads | FDs start → end | Leaks |",
+            "|------|--------|-----|---------------|-----------------------|---------|-----------------|-------|"
+        ]
+        for test in sampled:
+            rps = test["requests"] / (test["duration_ms"] / 1000) if test["duration_ms"] else 0.0
+            for name, r in test["resources"].items():
+                if not r["samples"]:
+                    lines.append(f"| {test['name']} | {name} | {rps:.1f} | - | - | - | - | target not running |")
+                    continue
+                leaks = "🚨 " + "; ".join(r["leaks"]) if r["leaks"] else "-"
+                lines.append(
+                    f"| {test['name']} | {name} | {rps:.1f} | {r['cpu_avg_pct']:.0f}% / {r['cpu_max_pct']:.0f}% | "
+                    f"{r['rss_start_mb']:.0f} → {r['rss_end_mb']:.0f}MB ({r['rss_max_mb']:.0f}MB) | "
+                    f"{r['threads_max']} | {r['fds_start']} → {r['fds_end']} | {leaks} |"
+                )
+        return "\n".join(lines)
+
+    def _format_resource_line(self, tests):
+        """One-line verdict on target resources for the observations"""
+        sampled = [test for test in tests if test.get("resources")]
+        if not sampled:
+            return "Not sampled"
+        leaks = [
+            f"{name} during {test['name']}"
+            for test in sampled for name, r in test["resources"].items() if r["leaks"]
+        ]
+        if leaks:
+            return "🚨 Possible leak: " + ", ".join(leaks)
+        busiest = max(
+            ((r["cpu_max_pct"], name) for test in sampled for name, r in test["resources"].items()),
+            default=(0.0, "-")
+        )
+        return f"✅ No leaks detected - peak CPU {busiest[0]:.0f}% ({busiest[1]})"
+
+    def _format_funnels(self, tests):
+        """Per workflow: how many journeys reached and got through each step, with step latency"""
+        workflows = [test for test in tests if test.get("funnel")]
+        if not workflows:
+            return "No multi-step workflows run"
+
+        sections = []
+        for test in workflows:
+            funnel = test["funnel"]
+            lines = [
+                f"**{test['name']}** - {funnel['completed']}/{funnel['journeys']} journeys completed "
+                f"({funnel['completion_rate'] * 100:.1f}%)",
+                "",
+                "| Step | Reached | Completed | Step Conversion | Funnel | Requests | Failures | p50 | p99 |",
+                "|------|---------|-----------|-----------------|--------|----------|----------|-----|-----|"
+            ]
+            for step in funnel["steps"]:
+                latency = step["latency"]
+                lines.append(
+                    f"| {step['step']} | {step['reached']} | {step['completed']} | {step['conversion'] * 100:.1f}% | "
+                    f"{step['funnel'] * 100:.1f}% | {step['requests']} | {step['failures']} | "
+                    f"{latency['p50_ms']:.0f}ms | {latency['p99_ms']:.0f}ms |"
+                )
+            sections.append("\n".join(lines))
+        return "\n\n".join(sections)
+
+    def _format_capacity(self, results):
+        """Max sustainable RPS per endpoint plus each saturation curve"""
+        if not results:
+            return "Capacity search not run (agent.run_capacity_search())"
+
+        lines = [
+            "| Endpoint | Max Sustainable RPS | Knee RPS | Limited By | SLO |",
+            "|----------|---------------------|----------|------------|-----|"
+        ]
+        for r in results:
+            knee = f"{r['knee_rps']:.1f}" if r["knee_rps"] is not None else "-"
+            slo = ", ".join(f"{k} ≤ {v}" for k, v in r["slo"].items())
+            lines.append(
+                f"| {r['name']} | {r['max_sustainable_rps']:.1f} | {knee} | {', '.join(r['limited_by'])} | {slo} |"
+            )
+
+        for r in results:
+            lines += [
+                "",
+                f"**{r['name']}** saturation curve ({r['probe_s']}s probes)",
+                "",
+                "| Offered RPS | Achieved RPS | Errors | p50 | p99 | SLO |",
+                "|-------------|--------------|--------|-----|-----|-----|"
+            ]
+            for p in r["curve"]:
+                lines.append(
+                    f"| {p['rate']:.1f} | {p['achieved_rps']:.1f} | {p['error_rate'] * 100:.1f}% | "
+                    f"{p['p50_ms']:.0f}ms | {p['p99_ms']:.0f}ms | {'✅' if p['passed'] else '❌'} |"
+                )
+        return "\n".join(lines)
+
+    def _format_fuzzing(self, results):
+        """Payload volume per target and every distinct anomalous response cluster"""
+        if not results:
+            return "Security fuzzing not run (agent.run_fuzz_tests())"
+
+        lines = [
+            "| Target | Vectors | Payloads | Req/s | Clusters | Anomalous | p99 |",
+            "|--------|---------|----------|-------|----------|-----------|-----|"
+        ]
+        for r in results:
+            lines.append(
+                f"| {r['name']} | {', '.join(r['vectors'])} | {r['requests']:,} | {r['rps']:.0f} | "
+                f"{r['clusters']} | {len(r['anomalies'])} | {r['latency']['p99_ms']:.0f}ms |"
+            )
+
+        findings = [(r, c) for r in results for c in r["anomalies"]]
+        if findings:
+            lines += [
+                "",
+                "| Target | Anomaly | Status | Payloads | Vectors | Example |",
+                "|--------|---------|--------|----------|---------|---------|"
+            ]
+            for r, c in findings:
+                vectors = ", ".join(f"{v} {n}" for v, n in sorted(c["vectors"].items()))
+                example = json.dumps(c["examples"][0]["payload"], default=str)[:60].replace("|", "\\|").replace("`", "'")
+                lines.append(
+                    f"| {r['name']} | {c['anomaly']} | {c['status']} | {c['count']:,} | {vectors} | `{example}` |"
+                )
+        return "\n".join(lines)
+
+    def _format_regressions(self, regressions):
+        """Per-endpoint latency change and per-test throughput change vs the baseline run"""
+        if not regressions or regressions["baseline"] is None:
+            return "No earlier run of the same tests recorded yet (run-history.sqlite3)"
+        if not regressions["endpoints"] and not regressions["throughput"]:
+            return f"Nothing in common with baseline run {regressions['baseline']}"
+
+        icons = {"regression": "🚨", "improvement": "✅", "no change": "➖", "insufficient data": "❔"}
+        lines = [
+            f"Baseline: run {regressions['baseline']}",
+            "",
+            "| Endpoint | p50 | p99 | p (Mann-Whitney) | Verdict |",
+            "|----------|-----|-----|------------------|---------|"
+        ]
+        for endpoint, r in regressions["endpoints"].items():
+            p_value = f"{r['p_value']:.2g}" if r["p_value"] is not None else "-"
+            lines.append(
+                f"| {endpoint} | {r['baseline_p50_ms']:.0f} → {r['current_p50_ms']:.0f}ms ({r['p50_change'] * 100:+.0f}%) | "
+                f"{r['baseline_p99_ms']:.0f} → {r['current_p99_ms']:.0f}ms ({r['p99_change'] * 100:+.0f}%) | "
+                f"{p_value} | {icons[r['verdict']]} {r['verdict']} |"
+            )
+
+        if regressions["throughput"]:
+            lines += [
+                "",
+                "| Stress Test | Baseline RPS | RPS | Change |",
+                "|-------------|--------------|-----|--------|"
+            ]
+            for name, (before, after) in regressions["throughput"].items():
+                lines.append(f"| {name} | {before:.1f} | {after:.1f} | {(after - before) / before * 100:+.0f}% |")
+        return "\n".join(lines)
+
+    def _format_phase_table(self, phase_stats):
+        """Markdown table of p99 per phase and where the p99 tail spends its time"""
+        rows = {key: stats for key, stats in phase_stats.items() if stats.count}
+        if not rows:
+            return "No request phases recorded"
+
+        lines = [
+            "| Endpoint | Requests | DNS p99 | Connect p99 | TLS p99 | Send p99 | Server p99 | Transfer p99 | p99 Tail Breakdown |",
+            "|----------|----------|---------|-------------|---------|----------|------------|--------------|--------------------|"
+        ]
+        for key, stats in rows.items():
+            cells = []
+            for phase in PHASES:
+                histogram = stats.histograms[phase]
+                cells.append(f"{histogram.percentile(99):.1f}ms" if histogram.total_count else "-")
+            lines.append(f"| {key} | {stats.count} | {' | '.join(cells)} | {self._format_breakdown(stats.breakdown(99))} |")
+        return "\n".join(lines)
+
+    def _format_breakdown(self, shares, minimum=0.01):
+        """'server 90%, transfer 6%, connect 3%' - largest first, tiny shares dropped"""
+        parts = [
+            f"{phase} {share * 100:.0f}%"
+            for phase, share in sorted(shares.items(), key=lambda item: -item[1])
+            if share >= minimum
+        ]
+        return ", ".join(parts) or "-"
+
+    def _format_tail_line(self, phase_stats):
+        """Where the endpoint with the worst p99 spends its tail"""
+        timed = {key: stats for key, stats in phase_stats.items() if stats.count}
+        if not timed:
+            return "no request phases recorded"
+        key, stats = max(timed.items(), key=lambda item: item[1].total.percentile(99))
+        shares = stats.breakdown(99)
+        phase = max(shares, key=shares.get)
+        return f"p99 of {key} is {stats.total.percentile(99):.0f}ms, {shares[phase] * 100:.0f}% {phase} time"
+
+    def _format_streaming_table(self, tests):
+        """Markdown TTFB / first-token / chunk gap / throughput table"""
+        rows = [test for test in tests if (test.get("streaming") or {}).get("ttfb")]
+        if not rows:
+            return "No streaming metrics recorded"
+
+        def ms(summary, field):
+            return f"{summary[field]:.1f}ms" if summary and summary["count"] else "-"
+
+        def rate(value, scale=1):
+            return f"{value / scale:.1f}" if value is not None else "-"
+
+        lines = [
+            "| Test | TTFB p50 | TTFB p99 | TTFT p50 | TTFT p99 | Chunk Gap p99 | Max Gap | Tokens/s | KB/s |",
+            "|------|----------|----------|----------|----------|---------------|---------|----------|------|"
+        ]
+        for test in rows:
+            s = test["streaming"]
+            ttft, gap = s.get("ttft"), s.get("chunk_gap")
+            lines.append(
+                f"| {test['name']} | {ms(s['ttfb'], 'p50_ms')} | {ms(s['ttfb'], 'p99_ms')} | "
+                f"{ms(ttft, 'p50_ms')} | {ms(ttft, 'p99_ms')} | {ms(gap, 'p99_ms')} | {ms(gap, 'max_ms')} | "
+                f"{rate(s.get('tokens_per_sec'))} | {rate(s.get('bytes_per_sec'), 1024)} |"
+            )
+        return "\n".join(lines)
+
+    def _pool_stats(self):
+        """Reused vs. new connections per target, across the sync pool and async engine"""
+        stats = {}
+        sources = [self._http.stats()] if self._http is not None else []
+        if self._async_engine is not None:
+            sources.append(self._async_engine.pool_stats)
+        if self._coordinator is not None:
+            sources.append(self._coordinator.pool_stats)
+
+        for source in sources:
+            for target, counts in source.items():
+                entry = stats.setdefault(target, {"requests": 0, "new_connections": 0, "reused": 0})
+                for field in entry:
+                    entry[field] += counts[field]
+        return stats
+
+    def _format_pool_stats(self):
+        """Markdown table of connection reuse per target"""
+        stats = self._pool_stats()
+        if not stats:
+            return "No connections opened"
+
+        lines = [
+            "| Target | Requests | New Connections | Reused | Reuse Rate |",
+            "|--------|----------|-----------------|--------|------------|"
+        ]
+        for target, s in stats.items():
+            connections = s["new_connections"] + s["reused"]
+            rate = s["reused"] / connections * 100 if connections else 0
+            lines.append(f"| {target} | {s['requests']} | {s['new_connections']} | {s['reused']} | {rate:.1f}% |")
+        return "\n".join(lines)
+
+    def _format_retests(self, retests):
+        """Verdict of every fix retested by monitor_fixes()"""
+        if not retests:
+            return "No fixes retested (agent.monitor_fixes())"
+
+        icons = {"FIXED": "✅", "FIX_FAILED": "❌", "FIX_UNVERIFIED": "❔"}
+        lines = [
+            "| Issue | Test | Verdict | Retest |",
+            "|-------|------|---------|--------|"
+        ]
+        for r in retests:
+            lines.append(f"| {r['issue_id']} | {r['test_name']} | {icons[r['status']]} {r['status']} | {r['details']} |")
+        return "\n".join(lines)
+
+    def _format_availability(self):
+        """Preflight probe and circuit breaker activity per target"""
+        if not self.target_health:
+            return "No preflight run"
+
+        breaker = self.breaker.stats()
+        lines = [
+            "| Target | Preflight | Circuit | Trips | Failed Fast | Last Failure |",
+            "|--------|-----------|---------|-------|-------------|--------------|"
+        ]
+        for target in sorted(set(self.target_health) | set(breaker)):
+            probe = self.target_health.get(target)
+            if probe is None:
+                preflight = "-"
+            elif probe["up"]:
+                preflight = f"✅ HTTP {probe['status_code']} in {probe['latency_ms']:.0f}ms"
+            else:
+                preflight = "⛔ unreachable"
+            b = breaker.get(target, {"state": "closed", "trips": 0, "rejected": 0, "reason": None})
+            reason = (b["reason"] or "-").replace("|", "\\|")[:80]
+            lines.append(f"| {target} | {preflight} | {b['state']} | {b['trips']} | {b['rejected']:,} | {reason} |")
+        return "\n".join(lines)
+
+    def _format_latency_line(self, histogram):
+        """One-line percentile summary"""
+        if not histogram.total_count:
+            return "no requests timed"
+        s = histogram.summary()
+        return (
+            f"p50 {s['p50_ms']:.0f}ms, p99 {s['p99_ms']:.0f}ms, "
+            f"max {s['max_ms']:.0f}ms over {s['count']} requests"
+        )
 
     def _get_most_common_failure(self):
         """Get most common failure type"""
@@ -543,8 +2233,10 @@ Be concise but detailed.
             return "Not assessed"
 
         passed = sum(1 for t in security_tests if t.get("passed", False))
-        total = len(security_tests)
+        total = sum(1 for t in security_tests if not t.get("skipped", False))
 
+        if not total:
+            return "Not assessed - every security test was skipped"
         if passed == total:
             return "✅ Excellent - All security tests passed"
         elif passed / total > 0.8:
@@ -553,24 +2245,163 @@ Be concise but detailed.
             return "🚨 Critical - Multiple security vulnerabilities found"
 
 
-if __name__ == "__main__":
+SUITE_NAMES = [suite[:-len("_tests")] for suite in SUITES]  # "stress", "penetration", ...
+
+
+def parse_args(argv):
+    """CLI: `run` (the default) with filters, plus list / capacity / fuzz / monitor"""
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv = ["run"] + list(argv)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--engine", choices=["async", "threads"], default=LOAD_ENGINE, help="stress test load engine")
+    common.add_argument("--no-llm", action="store_true", help="offline stub fix suggestions - never loads openai")
+    common.add_argument("--format", choices=["markdown", "summary", "json"], default="markdown",
+                        help="what to print at the end (the markdown report is always saved to final/)")
+
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("-s", "--suite", action="append", choices=SUITE_NAMES, help="only this suite (repeatable)")
+    filters.add_argument("-t", "--test", action="append", metavar="NAME", help="test name contains NAME (repeatable)")
+    filters.add_argument("--tag", action="append", help="suite, app / super_agent, concurrent, rate, profile, replay, "
+                                                        "workflow or a test's own tag (repeatable)")
+    filters.add_argument("--target", action="append", metavar="HOST",
+                         help="target URL contains HOST, or app / super_agent (repeatable)")
+
+    parser = argparse.ArgumentParser(description="AI Test Agent - stress, penetration, UX and admin tests")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", parents=[common, filters], help="run tests and write the report (default)")
+    run.add_argument("--serial", action="store_true", help="suite by suite instead of one dependency graph")
+    commands.add_parser("list", parents=[filters], help="show the tests a filter picks, without sending anything")
+    commands.add_parser("capacity", parents=[common], help="find each endpoint's max sustainable RPS (slow)")
+    commands.add_parser("fuzz", parents=[common], help="thousands of mutated injection payloads per vector (loud)")
+    monitor = commands.add_parser("monitor", parents=[common], help="retest issues as fixes land in fixes/")
+    monitor.add_argument("--once", action="store_true", help="retest the fixes already waiting, then stop")
+    return parser.parse_args(argv)
+
+
+RETEST_ICONS = {"FIXED": "✅", "FIX_FAILED": "❌", "FIX_UNVERIFIED": "❔"}
+
+
+def failures(agent):
+    """Failed tests, anomalous fuzz clusters and failed retests - any of them makes the exit code 1"""
+    failed = [
+        test["name"] for tests in agent.test_results.values() for test in tests
+        if not test.get("passed") and not test.get("skipped")
+    ]
+    failed += [f"Fuzz - {r['name']}: {c['anomaly']}" for r in agent.fuzz_results for c in r["anomalies"]]
+    failed += [retest["test_name"] for retest in agent.retests if retest["status"] == "FIX_FAILED"]
+    return failed
+
+
+def format_summary(agent):
+    """One line per test, fuzz target, capacity search and fix retested, for --format summary"""
+    lines = []
+    for suite, tests in agent.test_results.items():
+        for test in tests:
+            if test.get("skipped"):
+                status = "⏭️"
+            else:
+                status = "✅" if test.get("passed") else "❌"
+            latency = test.get("latency") or {}
+            p99 = f", p99 {latency['p99_ms']:.0f}ms" if latency.get("count") else ""
+            details = str(test.get("details") or test.get("error") or "")[:100]
+            lines.append(f"{status} [{suite[:-len('_tests')]}] {test['name']}: {details}{p99}")
+    for r in agent.fuzz_results:
+        found = ", ".join(f"{c['anomaly']} (HTTP {c['status']}) x{c['count']:,}" for c in r["anomalies"])
+        status = "❌" if r["anomalies"] else "✅"
+        lines.append(f"{status} [fuzz] {r['name']}: {r['requests']:,} payloads, {found or 'no anomalies'}")
+    for r in agent.capacity_results:
+        knee = f", knee {r['knee_rps']:.1f}" if r["knee_rps"] is not None else ""
+        limited = f", limited by {', '.join(r['limited_by'])}" if r["limited_by"] else ""
+        lines.append(f"📈 [capacity] {r['name']}: max {r['max_sustainable_rps']:.1f} RPS{knee}{limited}")
+    for retest in agent.retests:
+        icon = RETEST_ICONS.get(retest["status"], "🔁")
+        lines.append(f"{icon} [retest] {retest['issue_id']} {retest['test_name']}: {retest['status']}")
+    return "\n".join(lines) or "No tests run"
+
+
+def format_json(agent, report_file):
+    """Results as JSON for --format json (histograms and time series left out)"""
+    results = {
+        suite: [{key: value for key, value in test.items() if key not in ("histogram", "time_series")} for test in tests]
+        for suite, tests in agent.test_results.items()
+    }
+    return json.dumps({
+        "run_id": agent.run_id,
+        "report": str(report_file) if report_file else None,
+        "results": results,
+        "capacity": agent.capacity_results,
+        "fuzz": agent.fuzz_results,
+        "retests": agent.retests,
+        "issues": [issue["id"] for issue in agent.issues]
+    }, indent=2, default=str)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.command == "list":
+        agent = TestAgent()
+        chosen = agent.select(args.suite and [f"{suite}_tests" for suite in args.suite], args.test, args.tag, args.target)
+        for suite, test in chosen:
+            tags = ", ".join(sorted(agent.test_tags(suite, test)))
+            print(f"{suite[:-len('_tests')]:<12} {test['name']:<45} {agent._target_of(test):<24} {tags}")
+        print(f"\n{len(chosen)} tests")
+        return 0
+
+    # --format json keeps stdout for the JSON - progress goes to stderr
+    out = sys.stdout
+    if args.format == "json":
+        sys.stdout = sys.stderr
+
     print("🤖 AI Test Agent Starting...")
     print("=" * 60)
 
-    agent = TestAgent()
+    agent = TestAgent(engine=args.engine, llm_backend="stub" if args.no_llm else None)
+    agent.mode = args.command
+    # Before LiveExport: forking after its threads start can deadlock the workers
+    agent.start_workers()
+
+    # Progress line every TEST_AGENT_PROGRESS_S, OpenMetrics on TEST_AGENT_METRICS_PORT
+    live = LiveExport().start()
+    try:
+        if args.command == "run":
+            if args.suite or args.test or args.tag or args.target:
+                chosen = agent.select(
+                    args.suite and [f"{suite}_tests" for suite in args.suite], args.test, args.tag, args.target
+                )
+                if not chosen:
+                    print("⚠️ No tests match those filters (see: python ai-test-agent.py list --help)")
+                    return 2
+                print(f"🎯 {len(chosen)} tests selected")
+            # Independent tests in parallel (see TEST_AGENT_PARALLEL)
+            agent.run_all(parallel=PARALLEL and not args.serial)
+        elif args.command == "capacity":
+            # Find max sustainable RPS per endpoint (slow - raises load until the SLO breaks)
+            agent.run_capacity_search()
+        elif args.command == "fuzz":
+            # Thousands of mutated injection payloads per vector, clustered by response
+            agent.run_fuzz_tests()
+        else:
+            # Blocks until Ctrl+C unless --once; works from a separate process
+            agent.monitor_fixes(follow=not args.once)
+
+        report = agent.generate_final_report()
+    finally:
+        live.stop()
+        sys.stdout = out
 
-    # Run all test suites
-    agent.run_stress_tests()
-    agent.run_penetration_tests()
-    agent.run_ux_tests()
-    agent.run_admin_tests()
+    if args.format == "json":
+        print(format_json(agent, agent.report_file))
+    elif args.format == "summary":
+        print(format_summary(agent))
+    else:
+        print("\n" + report)
+        print("\n✅ Testing complete! Issues written to test-reports/issues/")
+        print("👉 Run file watcher to notify Claude Code of issues")
 
-    # Monitor for Claude's fixes (run this in a loop or separate process)
-    # agent.monitor_fixes()
+    return 1 if failures(agent) else 0
 
-    # Generate final report
-    report = agent.generate_final_report()
-    print("\n" + report)
 
-    print("\n✅ Testing complete! Issues written to test-reports/issues/")
-    print("👉 Run file watcher to notify Claude Code of issues")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Capacity Search - find the max request rate an endpoint sustains within its SLO
+Raises the offered open-loop rate exponentially until a probe breaks the SLO
+(p99 latency or error rate), then binary-searches between the last passing
+and first failing rate. Every probe is kept, giving the saturation curve.
+"""
+
+import time
+
+DEFAULT_SLO = {"p99_ms": 1000, "error_rate": 0.01}
+GROWTH = 2.0  # Exponential phase multiplier
+PRECISION = 0.1  # Stop bisecting once the bracket is within 10% of the passing rate
+MAX_PROBES = 12
+COOLDOWN_S = 1.0  # Let the target drain between probes
+
+
+def check_slo(measurement, slo):
+    """List of SLO limits a probe broke (empty = passed)"""
+    broken = []
+    if "p99_ms" in slo and measurement["p99_ms"] > slo["p99_ms"]:
+        broken.append("p99_ms")
+    if "error_rate" in slo and measurement["error_rate"] > slo["error_rate"]:
+        broken.append("error_rate")
+    return broken
+
+
+class CapacitySearch:
+    """Exponential-then-binary search over offered rate
+
+    `probe(rate)` runs the load for one step and returns a measurement dict
+    with at least p99_ms and error_rate.
+    """
+
+    def __init__(self, probe, slo=None, start_rps=1.0, max_rps=10000.0, growth=GROWTH,
+                 precision=PRECISION, max_probes=MAX_PROBES, cooldown_s=COOLDOWN_S):
+        self.probe = probe
+        self.slo = dict(DEFAULT_SLO if slo is None else slo)
+        self.start_rps = start_rps
+        self.max_rps = max_rps
+        self.growth = growth
+        self.precision = precision
+        self.max_probes = max_probes
+        self.cooldown_s = cooldown_s
+        self.probes = []
+
+    def run(self):
+        """-> {max_sustainable_rps, knee_rps, limited_by, slo, curve}"""
+        passing, failing = None, None
+
+        rate = self.start_rps
+        while len(self.probes) < self.max_probes:
+            if self._try(rate):
+                passing = rate
+                if rate >= self.max_rps:
+                    break
+                rate = min(rate * self.growth, self.max_rps)
+            else:
+                failing = rate
+                break
+
+        if failing is not None:
+            low = passing or 0.0
+            while len(self.probes) < self.max_probes and failing - low > self.precision * max(low, self.start_rps):
+                rate = (low + failing) / 2
+                if self._try(rate):
+                    low = passing = rate
+                else:
+                    failing = rate
+
+        knee = next((p for p in self.probes if p["rate"] == failing), None)
+        return {
+            "slo": self.slo,
+            "max_sustainable_rps": passing or 0.0,
+            "knee_rps": failing,
+            "limited_by": knee["broken"] if knee else ["max_rps reached"],
+            "curve": sorted(self.probes, key=lambda p: p["rate"])
+        }
+
+    def _try(self, rate):
+        if self.probes and self.cooldown_s:
+            time.sleep(self.cooldown_s)
+        measurement = dict(self.probe(rate))
+        measurement["rate"] = rate
+        measurement["broken"] = check_slo(measurement, self.slo)
+        measurement["passed"] = not measurement["broken"]
+        self.probes.append(measurement)
+        return measurement["passed"]
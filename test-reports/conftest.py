@@ -0,0 +1,19 @@
+"""
+Shared pytest fixtures - a mock_target.py for the tests that need a server
+"""
+
+import pytest
+
+from agent_benchmark import free_port, start_mock
+
+
+@pytest.fixture(scope="session")
+def mock_urls():
+    """{"app": ..., "super_agent": ...} base URLs of a zero-latency mock target"""
+    app_port, agent_port = free_port(), free_port()
+    process = start_mock(app_port, agent_port)
+    try:
+        yield {"app": f"http://127.0.0.1:{app_port}", "super_agent": f"http://127.0.0.1:{agent_port}"}
+    finally:
+        process.terminate()
+        process.wait()
@@ -0,0 +1,346 @@
+"""
+Distributed Load Generation - coordinator/worker mode for stress tests
+Splits one stress test across N local processes (one per core) and/or
+remote worker hosts, then merges their result aggregates and latency histograms
+
+Run a remote worker:
+    python distributed.py --listen 0.0.0.0:7700
+"""
+
+import argparse
+import atexit
+import concurrent.futures
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import live_metrics
+import load_profile
+from live_metrics import METRICS
+from load_engine import AsyncLoadEngine
+from result_sink import ResultSink, log_path_for
+
+# "auto" = one worker process per core
+_workers = os.getenv("TEST_AGENT_WORKERS", "0")
+LOCAL_WORKERS = os.cpu_count() or 1 if _workers == "auto" else int(_workers)
+REMOTE_WORKERS = [w for w in os.getenv("TEST_AGENT_REMOTE_WORKERS", "").split(",") if w]
+DEFAULT_PORT = 7700
+START_MARGIN_S = 0.5  # Head start so every worker begins an open-loop run together
+REPORT_S = float(os.getenv("TEST_AGENT_WORKER_REPORT_S", "1"))  # Live metrics sent to the coordinator
+
+_HEADER = struct.Struct("!I")
+
+
+# -- wire protocol: 4-byte big-endian length + UTF-8 JSON ----------------------
+
+def send_frame(sock, message):
+    """Write one length-prefixed JSON frame"""
+    body = json.dumps(message).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def recv_frame(sock):
+    """Read one length-prefixed JSON frame (None on clean EOF)"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    body = _recv_exact(sock, _HEADER.unpack(header)[0])
+    if body is None:
+        raise ConnectionError("Connection closed mid-frame")
+    return json.loads(body.decode("utf-8"))
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+# -- worker side ---------------------------------------------------------------
+
+class MetricsReporter:
+    """Sends this process's live metrics for one test to the coordinator while a shard runs
+
+    Every REPORT_S (and once more on exit) `send` gets the live_metrics.changes()
+    rows since the last call, so the coordinator's progress line and /metrics
+    include the worker's requests as they happen.
+    """
+
+    def __init__(self, test_name, send, interval_s=REPORT_S):
+        self.test_name = test_name
+        self.send = send
+        self.interval_s = interval_s
+        self._last = self._snapshot()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.interval_s > 0:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._flush()
+        return False
+
+    def _snapshot(self):
+        # A remote worker may run shards of other tests at the same time
+        return {key: t for key, t in METRICS.snapshot().items() if key[0] == self.test_name}
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_s):
+            self._flush()
+
+    def _flush(self):
+        totals = self._snapshot()
+        rows = live_metrics.changes(totals, self._last)
+        self._last = totals
+        if rows:
+            self.send(rows)
+
+
+def run_shard(shard, report=None):
+    """Run one slice of a stress test on this process's event loop
+
+    Raw records stream to this worker's own runs/ log; only the aggregate
+    (counters, histogram, samples) travels back to the coordinator, plus
+    live metrics changes to `report` while the shard runs.
+    """
+    engine = AsyncLoadEngine()
+    test = shard["test"]
+    suffix = f".{socket.gethostname()}-{os.getpid()}"
+    sink = ResultSink(log_path_for(shard["run_id"], test["name"], suffix), time_series=shard["mode"] == "profile")
+    if sink.series is not None:
+        sink.series.origin = shard["start_at"]
+    with MetricsReporter(test["name"], report) if report else contextlib.nullcontext():
+        _run(engine, shard, sink)
+
+    return {"sink": sink.to_dict(), "pool_stats": engine.pool_stats}
+
+
+def _run(engine, shard, sink):
+    test = shard["test"]
+    try:
+        if shard["mode"] == "open_loop":
+            delay = max(0.0, shard["start_at"] - time.time()) + shard["phase_s"]
+            engine.run_open_loop(
+                test, shard["rate_per_sec"], shard["count"], start_delay=delay, on_result=sink.add, on_halt=sink.halt
+            )
+        elif shard["mode"] == "profile":
+            delay = max(0.0, shard["start_at"] - time.time()) + shard["phase_s"]
+            engine.run_profile(test, shard["stages"], start_delay=delay, on_result=sink.add, on_halt=sink.halt)
+        else:
+            engine.run(test, shard["count"], on_result=sink.add)
+    finally:
+        sink.close()
+
+
+# Live metrics queue to the coordinator, set in each local pool process
+_pool_report = None
+
+
+def _init_pool_worker(queue):
+    global _pool_report
+    _pool_report = queue.put
+
+
+def _run_pooled(shard):
+    return run_shard(shard, _pool_report)
+
+
+class _WorkerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            message = recv_frame(self.request)
+            if message is None:
+                return
+            try:
+                # Metrics frames go out while the shard runs; the reply is sent after the reporter stopped
+                report = lambda rows: send_frame(self.request, {"op": "metrics", "rows": rows})
+                reply = {"ok": True, "result": run_shard(message["shard"], report)}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            send_frame(self.request, reply)
+
+
+class _WorkerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def serve_worker(host="127.0.0.1", port=DEFAULT_PORT):
+    """Block serving shards to a coordinator"""
+    with _WorkerServer((host, port), _WorkerHandler) as server:
+        print(f"🛰️ Load worker listening on {host}:{port}")
+        server.serve_forever()
+
+
+# -- coordinator side ----------------------------------------------------------
+
+def split(total, parts):
+    """Split `total` into `parts` near-equal integers"""
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port or DEFAULT_PORT)
+
+
+class RemoteWorker:
+    """Coordinator-side handle on a worker reachable over TCP"""
+
+    def __init__(self, address, timeout=600):
+        self.address = parse_address(address)
+        self.timeout = timeout
+
+    def run(self, shard):
+        with socket.create_connection(self.address, timeout=self.timeout) as sock:
+            send_frame(sock, {"op": "run", "shard": shard})
+            reply = recv_frame(sock)
+            while reply is not None and reply.get("op") == "metrics":
+                METRICS.fold(reply["rows"])
+                reply = recv_frame(sock)
+        if reply is None or not reply.get("ok"):
+            error = reply.get("error") if reply else "connection closed"
+            raise RuntimeError(f"Worker {self.address[0]}:{self.address[1]} failed: {error}")
+        return reply["result"]
+
+
+def _fork_safe():
+    """fork() is available and no other thread could be holding a lock"""
+    return "fork" in multiprocessing.get_all_start_methods() and threading.active_count() == 1
+
+
+class DistributedCoordinator:
+    """Fans a stress test out to local processes and remote workers, then merges results"""
+
+    def __init__(self, local_workers=LOCAL_WORKERS, remote_workers=REMOTE_WORKERS):
+        self.local_workers = local_workers
+        self.remote_workers = [RemoteWorker(address) for address in remote_workers]
+        self.pool_stats = {}
+        self._pool = None
+        self._reports = None
+
+    @property
+    def worker_count(self):
+        return self.local_workers + len(self.remote_workers)
+
+    def start(self):
+        """Fork the local worker processes
+
+        Call this before the agent starts any thread: a child forked while
+        another thread holds a lock (say LiveMetrics' registry lock) inherits
+        it held, with no thread left to release it. Started any later, the
+        workers are spawned instead (slower, but safe).
+        """
+        if not self.local_workers or self._pool is not None:
+            return self
+        method = "fork" if _fork_safe() else "spawn"
+        context = multiprocessing.get_context(method)
+        self._reports = context.Queue()
+        self._pool = context.Pool(
+            processes=self.local_workers, initializer=_init_pool_worker, initargs=(self._reports,)
+        )
+        threading.Thread(target=self._fold_reports, args=(self._reports,), daemon=True).start()
+        atexit.register(self.close)
+        return self
+
+    def run(self, test, count, sink, run_id):
+        """Concurrent mode: `count` requests split across workers, merged into `sink`"""
+        shards = [
+            {"mode": "concurrent", "test": test, "count": n, "run_id": run_id}
+            for n in split(count, self.worker_count)
+        ]
+        self._dispatch(shards, sink)
+
+    def run_open_loop(self, test, rate_per_sec, count, sink, run_id):
+        """Open-loop mode: each worker sends rate/N, phase-shifted so arrivals interleave"""
+        workers = self.worker_count
+        start_at = time.time() + START_MARGIN_S
+        shards = [
+            {
+                "mode": "open_loop",
+                "test": test,
+                "count": n,
+                "run_id": run_id,
+                "rate_per_sec": rate_per_sec / workers,
+                "start_at": start_at,
+                "phase_s": i / rate_per_sec
+            }
+            for i, n in enumerate(split(count, workers))
+        ]
+        self._dispatch(shards, sink)
+
+    def run_profile(self, test, stages, sink, run_id):
+        """Load profile: every worker runs the stages at 1/N of the rate / concurrency"""
+        workers = self.worker_count
+        start_at = time.time() + START_MARGIN_S
+        peak_rate = load_profile.peak(stages, "rate_per_sec")
+        if sink.series is not None:
+            sink.series.origin = start_at
+        shards = [
+            {
+                "mode": "profile",
+                "test": test,
+                "stages": load_profile.shard(stages, i, workers),
+                "count": 1,  # Every worker takes part for the whole profile
+                "run_id": run_id,
+                "start_at": start_at,
+                "phase_s": i / peak_rate if peak_rate else 0.0
+            }
+            for i in range(workers)
+        ]
+        self._dispatch(shards, sink)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+            self._reports.put(None)
+
+    def _dispatch(self, shards, sink):
+        runners = [self._run_local] * self.local_workers + [w.run for w in self.remote_workers]
+        jobs = [(runner, shard) for runner, shard in zip(runners, shards) if shard["count"]]
+        self.start()  # No-op when the agent already started the pool up front (else spawns)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(jobs) or 1) as executor:
+            replies = list(executor.map(lambda job: job[0](job[1]), jobs))
+
+        for reply in replies:
+            sink.merge(reply["sink"])
+            for target, counts in reply["pool_stats"].items():
+                entry = self.pool_stats.setdefault(target, {"requests": 0, "new_connections": 0, "reused": 0})
+                for field in entry:
+                    entry[field] += counts[field]
+
+    def _run_local(self, shard):
+        return self._pool.apply(_run_pooled, (shard,))
+
+    @staticmethod
+    def _fold_reports(queue):
+        """Fold live metrics from the local worker processes into this process's METRICS"""
+        for rows in iter(queue.get, None):
+            METRICS.fold(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remote load worker for ai-test-agent.py")
+    parser.add_argument("--listen", default=f"127.0.0.1:{DEFAULT_PORT}", help="host:port to accept shards on")
+    args = parser.parse_args()
+    serve_worker(*parse_address(args.listen))
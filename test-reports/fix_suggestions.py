@@ -0,0 +1,208 @@
+"""
+Fix Suggestions - cached, batched GPT-4 fix suggestions for failing tests
+Identical failures share one persistent cache entry (LRU + TTL), and cache
+misses are requested concurrently after the suites finish instead of inline
+
+Backends: "openai" (GPT-4), "stub" (offline), or "module:Class" for your own
+"""
+
+import concurrent.futures
+import hashlib
+import importlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_FILE = Path(__file__).parent / ".cache" / "fix-suggestions.json"
+CACHE_MAX_ENTRIES = int(os.getenv("TEST_AGENT_SUGGESTION_CACHE_SIZE", "500"))
+CACHE_TTL_S = int(os.getenv("TEST_AGENT_SUGGESTION_TTL_DAYS", "7")) * 86400
+MAX_WORKERS = int(os.getenv("TEST_AGENT_LLM_WORKERS", "4"))
+LLM_BACKEND = os.getenv("TEST_AGENT_LLM")  # Default: openai when OPENAI_API_KEY is set, else stub
+
+_VOLATILE = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ][\d:.]+(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+    (re.compile(r"\b0x[0-9a-f]+\b|\b[0-9a-f]{12,}\b", re.I), "<hex>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "<n>"),
+    (re.compile(r"\s+"), " ")
+]
+
+
+def normalize(text):
+    """Strip timestamps, ids and numbers so repeat failures compare equal"""
+    text = str(text or "")
+    for pattern, replacement in _VOLATILE:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def suggestion_key(category, test_result):
+    """Content address of a failure: hash of category, test, error and normalized details"""
+    parts = [
+        category,
+        test_result["name"],
+        normalize(test_result.get("error", "N/A")),
+        normalize(test_result.get("details", "N/A"))
+    ]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def build_prompt(category, test_result):
+    """The GPT-4 prompt for one failing test"""
+    return f"""
+You are a senior security engineer. A {category} test failed with the following details:
+
+Test: {test_result['name']}
+Error: {test_result.get('error', 'N/A')}
+Details: {test_result.get('details', 'N/A')}
+
+Provide a specific, actionable fix suggestion including:
+1. Root cause analysis
+2. Specific file(s) to modify
+3. Code changes needed
+4. Security best practices to implement
+
+Be concise but detailed.
+"""
+
+
+class OpenAIBackend:
+    """GPT-4 via the OpenAI API"""
+
+    def __init__(self, model="gpt-4", max_tokens=500):
+        import openai  # Only loaded when an LLM call is actually needed
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+        self._openai = openai
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def suggest(self, prompt):
+        response = self._openai.ChatCompletion.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=self.max_tokens
+        )
+        return response.choices[0].message.content
+
+
+class StubBackend:
+    """Offline stand-in - deterministic text, no network"""
+
+    cacheable = False  # A real suggestion for the same failure shouldn't be shadowed by the stub
+
+    def suggest(self, prompt):
+        test = re.search(r"^Test: (.*)$", prompt, re.M)
+        error = re.search(r"^Error: (.*)$", prompt, re.M)
+        return (
+            "[offline stub suggestion]\n"
+            f"Test: {test.group(1) if test else 'unknown'}\n"
+            f"Error: {error.group(1) if error else 'unknown'}\n"
+            "Re-run with TEST_AGENT_LLM=openai for a GPT-4 root cause analysis."
+        )
+
+
+BACKENDS = {"openai": OpenAIBackend, "stub": StubBackend}
+
+
+def get_backend(name=None):
+    """Build a backend by name, or import one given as 'module:Class'"""
+    name = name or ("openai" if os.getenv("OPENAI_API_KEY") else "stub")
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    module, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module), attr)()
+
+
+class SuggestionCache:
+    """Persistent on-disk cache of suggestions with LRU and TTL eviction"""
+
+    def __init__(self, path=CACHE_FILE, max_entries=CACHE_MAX_ENTRIES, ttl_s=CACHE_TTL_S):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()  # key -> {"suggestion", "created", "last_used"}, oldest use first
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+                for key, entry in sorted(stored.items(), key=lambda item: item[1]["last_used"]):
+                    self._entries[key] = entry
+            except (OSError, ValueError, KeyError):
+                self._entries.clear()  # Corrupt cache - start over
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created"] > self.ttl_s:
+            del self._entries[key]
+            return None
+        entry["last_used"] = time.time()
+        self._entries.move_to_end(key)
+        return entry["suggestion"]
+
+    def put(self, key, suggestion):
+        now = time.time()
+        self._entries[key] = {"suggestion": suggestion, "created": now, "last_used": now}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+class FixSuggester:
+    """Collects failures during the run, then resolves them in one concurrent batch"""
+
+    def __init__(self, backend_name=LLM_BACKEND, cache=None, max_workers=MAX_WORKERS):
+        self.backend_name = backend_name
+        self.cache = cache if cache is not None else SuggestionCache()
+        self.max_workers = max_workers
+        self._backend = None
+        self._pending = {}  # key -> prompt
+
+    def lookup(self, category, test_result):
+        """Return (key, cached suggestion or None); misses are queued for resolve()"""
+        key = suggestion_key(category, test_result)
+        cached = self.cache.get(key)
+        if cached is None:
+            self._pending[key] = build_prompt(category, test_result)
+        return key, cached
+
+    def resolve(self):
+        """Fetch every queued suggestion concurrently -> {key: suggestion}"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return {}
+
+        try:
+            if self._backend is None:
+                self._backend = get_backend(self.backend_name)
+        except Exception as e:
+            return {key: f"Failed to generate fix suggestion: {str(e)}" for key in pending}
+
+        def fetch(prompt):
+            try:
+                return self._backend.suggest(prompt), True
+            except Exception as e:
+                return f"Failed to generate fix suggestion: {str(e)}", False
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            replies = dict(zip(pending, executor.map(fetch, pending.values())))
+
+        suggestions = {}
+        for key, (suggestion, ok) in replies.items():
+            if ok and getattr(self._backend, "cacheable", True):
+                self.cache.put(key, suggestion)  # Failures aren't cached - retry next run
+            suggestions[key] = suggestion
+        self.cache.save()
+        return suggestions
@@ -0,0 +1,153 @@
+"""
+Fix Watcher - reacts to {issue_id}_FIXED.json files the moment they land
+Uses inotify (via ctypes, Linux) on the fixes directory and falls back to
+polling elsewhere. Files already there are handed over first, and files
+arriving together are batched so their retests can run in parallel. Also
+decides when repeated retest trials count as a confirmed fix.
+"""
+
+import ctypes
+import ctypes.util
+import math
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+FIX_SUFFIX = "_FIXED.json"
+POLL_S = float(os.getenv("TEST_AGENT_FIX_POLL_S", "1.0"))  # Polling fallback interval
+SETTLE_S = 0.01  # Events this close together form one batch
+
+# Load tests are rerun this many times; the fix counts as confirmed when the 95%
+# Wilson lower bound of the trial pass rate clears MIN_PASS_RATE (5 trials: all 5 must pass)
+RETEST_TRIALS = int(os.getenv("TEST_AGENT_RETEST_TRIALS", "5"))
+MIN_PASS_RATE = float(os.getenv("TEST_AGENT_RETEST_MIN_PASS_RATE", "0.5"))
+
+_IN_CLOSE_WRITE = 0x00000008  # Written and closed
+_IN_MOVED_TO = 0x00000080  # Renamed into the directory (atomic writes)
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def wilson_lower_bound(passes, trials, z=1.96):
+    """Lower end of the Wilson score interval for a pass rate"""
+    if not trials:
+        return 0.0
+    rate = passes / trials
+    centre = rate + z * z / (2 * trials)
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials))
+    return (centre - margin) / (1 + z * z / trials)
+
+
+def confirmed(passes, trials, min_pass_rate=MIN_PASS_RATE):
+    """Does a retest confirm the fix? A single trial just has to pass"""
+    if trials == 1:
+        return passes == 1
+    return wilson_lower_bound(passes, trials) >= min_pass_rate
+
+
+def issue_id_of(path):
+    return Path(path).name[:-len(FIX_SUFFIX)]
+
+
+class _Inotify:
+    """Just enough of inotify(7) for one directory"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout_s):
+        """File names written or moved in within `timeout_s` (empty list on timeout)"""
+        if not select.select([self.fd], [], [], timeout_s)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            names.append(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FixWatcher:
+    """Yields batches of fix file paths: the backlog first, then new ones as they're written"""
+
+    def __init__(self, directory, poll_s=POLL_S):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.poll_s = poll_s
+        self._inotify = None
+        try:
+            self._inotify = _Inotify(self.directory)
+            self.mode = "inotify"
+        except (OSError, AttributeError):
+            self.mode = f"polling every {poll_s:g}s"  # No inotify (macOS, Windows, old kernels)
+        self._seen = {}  # name -> mtime_ns, for polling
+
+    def backlog(self):
+        """Fix files already in the directory, oldest first"""
+        paths = [p for p in self.directory.iterdir() if p.name.endswith(FIX_SUFFIX)]
+        for path in paths:
+            self._seen[path.name] = path.stat().st_mtime_ns
+        return sorted(paths, key=lambda p: p.stat().st_mtime_ns)
+
+    def batches(self, follow=True, stop=None):
+        """Backlog (if any), then - with `follow` - every new batch until `stop` is set"""
+        backlog = self.backlog()
+        if backlog:
+            yield backlog
+        while follow and not (stop is not None and stop.is_set()):
+            names = self._wait(timeout_s=0.5)
+            if names:
+                yield [self.directory / name for name in sorted(names)]
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _wait(self, timeout_s):
+        """Names of fix files written since the last call (waits up to `timeout_s` for the first)"""
+        if self._inotify is None:
+            time.sleep(self.poll_s)
+            return self._scan()
+
+        names = set(self._inotify.read(timeout_s))
+        if names:
+            while True:  # Collect the rest of a burst (e.g. a fix loop writing many files at once)
+                more = self._inotify.read(SETTLE_S)
+                if not more:
+                    break
+                names.update(more)
+        return {name for name in names if name.endswith(FIX_SUFFIX)}
+
+    def _scan(self):
+        changed = set()
+        for path in self.directory.iterdir():
+            if not path.name.endswith(FIX_SUFFIX):
+                continue
+            try:
+                mtime = path.stat().st_mtime_ns
+            except OSError:
+                continue
+            if self._seen.get(path.name) != mtime:
+                self._seen[path.name] = mtime
+                changed.add(path.name)
+        return changed
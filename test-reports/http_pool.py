@@ -0,0 +1,211 @@
+"""
+HTTP Connection Pool - one tuned keep-alive requests.Session per target host
+Stops _make_request from paying a fresh TCP handshake on every call,
+with an opt-in cold mode for tests that need brand new connections
+
+Connections are timed: inside phase_timing.recording() every request reports
+its DNS, connect, TLS, send and server-wait phases
+"""
+
+import os
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from phase_timing import current_recorder
+from target_health import base_url
+
+POOL_SIZE = int(os.getenv("TEST_AGENT_POOL_SIZE", "100"))
+KEEP_ALIVE = os.getenv("TEST_AGENT_KEEP_ALIVE", "1") != "0"
+
+
+class _TimedConnection:
+    """Mixin timing urllib3 connection phases into the thread's PhaseRecorder"""
+
+    def _new_conn(self):
+        recorder = current_recorder()
+        if recorder is None:
+            return super()._new_conn()
+
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror:
+            return super()._new_conn()  # Let urllib3 raise its usual NameResolutionError
+        resolved = time.perf_counter()
+        recorder.add("dns", resolved - start)
+
+        try:
+            for i, (_, _, _, _, sockaddr) in enumerate(addresses):
+                self._dns_host = sockaddr[0]  # Connect to the address we just timed, no second lookup
+                try:
+                    return super()._new_conn()
+                except Exception:
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+            recorder.add("connect", time.perf_counter() - resolved)
+
+    def connect(self):
+        recorder = current_recorder()
+        if recorder is None:
+            return super().connect()
+
+        before = recorder.setup_ms()
+        start = time.perf_counter()
+        super().connect()
+        handshake = time.perf_counter() - start - (recorder.setup_ms() - before) / 1000
+        if isinstance(self, HTTPSConnection):
+            recorder.add("tls", max(0.0, handshake))
+
+    def request(self, *args, **kwargs):
+        recorder = current_recorder()
+        if recorder is None:
+            return super().request(*args, **kwargs)
+
+        before = recorder.setup_ms()
+        start = time.perf_counter()
+        super().request(*args, **kwargs)  # Plain HTTP connects lazily in here
+        setup = (recorder.setup_ms() - before) / 1000
+        recorder.add("send", max(0.0, time.perf_counter() - start - setup))
+
+    def getresponse(self, *args, **kwargs):
+        recorder = current_recorder()
+        if recorder is None:
+            return super().getresponse(*args, **kwargs)
+
+        start = time.perf_counter()
+        response = super().getresponse(*args, **kwargs)
+        recorder.add("server", time.perf_counter() - start)  # Request sent -> response headers
+        return response
+
+
+class TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools hand out timed connections"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool
+        }
+
+
+class SessionPool:
+    """Keeps one pooled requests.Session per base URL (BASE_URL, SUPER_AGENT_URL, ...)"""
+
+    def __init__(self, pool_size=POOL_SIZE, keep_alive=KEEP_ALIVE):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self._sessions = {}
+        self._cold_requests = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, endpoint, cold=False, **kwargs):
+        """Send a request through the host's pooled session (or a throwaway one when cold)"""
+        if cold or not self.keep_alive:
+            return self._cold_request(method, endpoint, **kwargs)
+        return self._session_for(endpoint).request(method, endpoint, **kwargs)
+
+    def stats(self):
+        """Per base URL: requests sent, new connections opened, connections reused"""
+        stats = {}
+        with self._lock:
+            sessions = list(self._sessions.items())
+            cold = dict(self._cold_requests)
+
+        for url, session in sessions:
+            adapter = session.get_adapter(url)
+            requests_sent = 0
+            new_connections = 0
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    requests_sent += pool.num_requests
+                    new_connections += pool.num_connections
+            stats[url] = {
+                "requests": requests_sent,
+                "new_connections": new_connections,
+                "reused": max(0, requests_sent - new_connections)
+            }
+
+        for url, count in cold.items():
+            entry = stats.setdefault(url, {"requests": 0, "new_connections": 0, "reused": 0})
+            entry["requests"] += count
+            entry["new_connections"] += count
+        return stats
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def _session_for(self, endpoint):
+        url = base_url(endpoint)
+        session = self._sessions.get(url)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(url)
+                if session is None:
+                    session = requests.Session()
+                    adapter = TimedHTTPAdapter(
+                        pool_connections=1,  # one host per session
+                        pool_maxsize=self.pool_size,
+                        max_retries=0  # a retry would hide the failure we're measuring
+                    )
+                    session.mount(url, adapter)
+                    session.headers["Connection"] = "keep-alive"
+                    self._sessions[url] = session
+        return session
+
+    def _cold_request(self, method, endpoint, **kwargs):
+        """Send through a throwaway session that is closed along with the response"""
+        url = base_url(endpoint)
+        with self._lock:
+            self._cold_requests[url] = self._cold_requests.get(url, 0) + 1
+
+        session = requests.Session()
+        try:
+            session.mount(url, TimedHTTPAdapter(max_retries=0))
+            session.headers["Connection"] = "close"
+            response = session.request(method, endpoint, **kwargs)
+        except BaseException:
+            session.close()
+            raise
+
+        # A streamed body is read after we return - the session goes when the caller closes the response
+        close_response = response.close
+
+        def close():
+            try:
+                close_response()
+            finally:
+                session.close()
+
+        response.close = close
+        return response
@@ -0,0 +1,118 @@
+"""
+Issue Index - fingerprints failures so recurring ones update a single issue
+Persistent SQLite index under test-reports/ mapping fingerprint -> issue ID,
+occurrence count and first/last seen, with an O(1) primary-key lookup.
+Also remembers which test produced each issue, so a fix can be retested
+from any later process.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from fix_suggestions import normalize
+
+INDEX_FILE = Path(__file__).parent / "issue-index.sqlite3"
+
+
+def failure_status(test_result):
+    """Status code behind a failure (dominant non-2xx code for multi-request tests)"""
+    if test_result.get("status_code") is not None:
+        return str(test_result["status_code"])
+
+    failing = {
+        code: count for code, count in test_result.get("status_codes", {}).items()
+        if code not in ("200", "201")
+    }
+    return max(failing, key=failing.get) if failing else None
+
+
+def fingerprint(category, test_result):
+    """Stable identity of a failure: category, test, endpoint, status code, normalized error"""
+    parts = [
+        category,
+        test_result["name"],
+        test_result.get("endpoint"),
+        failure_status(test_result),
+        normalize(test_result.get("error", "Test failed"))
+    ]
+    return hashlib.sha1(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+class IssueIndex:
+    """fingerprint -> {issue_id, count, first_seen, last_seen}"""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS issues (
+                fingerprint TEXT PRIMARY KEY,
+                issue_id TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS tests (
+                issue_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                definition TEXT NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    def get(self, fp):
+        """Index entry for a fingerprint, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT issue_id, count, first_seen, last_seen FROM issues WHERE fingerprint = ?", (fp,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"issue_id": row[0], "count": row[1], "first_seen": row[2], "last_seen": row[3]}
+
+    def add(self, fp, issue_id):
+        """Start tracking a new issue (replaces a stale entry whose file is gone)"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO issues VALUES (?, ?, 1, ?, ?)", (fp, issue_id, now, now)
+            )
+            self._db.commit()
+        return {"issue_id": issue_id, "count": 1, "first_seen": now, "last_seen": now}
+
+    def touch(self, fp):
+        """Count another occurrence -> updated entry"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._db.execute(
+                "UPDATE issues SET count = count + 1, last_seen = ? WHERE fingerprint = ?", (now, fp)
+            )
+            self._db.commit()
+        return self.get(fp)
+
+    def register_test(self, issue_id, kind, definition):
+        """Remember what to rerun for an issue: a suite name and its test dict, "fuzz", "target", ..."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tests VALUES (?, ?, ?)", (issue_id, kind, json.dumps(definition))
+            )
+            self._db.commit()
+
+    def test_for(self, issue_id):
+        """(kind, definition) registered for an issue, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT kind, definition FROM tests WHERE issue_id = ?", (issue_id,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,191 @@
+"""
+Latency Histogram - fixed-memory, mergeable, log-bucketed (HDR-style)
+Records microsecond latencies with bounded relative error, so p99/p99.9
+stay accurate no matter how many requests a test sends
+"""
+
+import math
+from array import array
+
+DEFAULT_HIGHEST_US = 3_600_000_000  # 1 hour
+DEFAULT_SIGNIFICANT_FIGURES = 3
+
+# 1-2-5 ladder (ms) used for the distribution table
+DISTRIBUTION_STEPS_MS = [
+    1, 2, 5, 10, 20, 50, 100, 200, 500,
+    1000, 2000, 5000, 10000, 20000, 30000, 60000
+]
+
+
+class LatencyHistogram:
+    """Counts latencies in log2 buckets, each split into linear sub-buckets
+
+    Memory is fixed by the trackable range and precision (not by the number of
+    samples), and two histograms with the same layout merge by adding counts.
+    """
+
+    def __init__(self, highest_us=DEFAULT_HIGHEST_US, significant_figures=DEFAULT_SIGNIFICANT_FIGURES):
+        self.highest_us = highest_us
+        self.significant_figures = significant_figures
+
+        largest_single_unit = 2 * 10 ** significant_figures
+        self._sub_bucket_count_magnitude = max(1, math.ceil(math.log2(largest_single_unit)))
+        self._sub_bucket_half_count_magnitude = self._sub_bucket_count_magnitude - 1
+        self._sub_bucket_count = 1 << self._sub_bucket_count_magnitude
+        self._sub_bucket_half_count = self._sub_bucket_count >> 1
+        self._sub_bucket_mask = self._sub_bucket_count - 1
+
+        bucket_count = 1
+        smallest_untrackable = self._sub_bucket_count
+        while smallest_untrackable <= highest_us:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+
+        self.counts = array("Q", bytes(8 * (bucket_count + 1) * self._sub_bucket_half_count))
+        self.total_count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    # -- recording ---------------------------------------------------------
+
+    def record(self, latency_ms, count=1):
+        """Record a latency given in milliseconds"""
+        self.record_us(int(latency_ms * 1000), count)
+
+    def record_us(self, value_us, count=1):
+        """Record a latency given in whole microseconds"""
+        value_us = min(max(0, value_us), self.highest_us)
+        self.counts[self._counts_index(value_us)] += count
+        self.total_count += count
+        self.total_us += value_us * count
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other):
+        """Add another histogram's counts into this one (same layout required)"""
+        if (other.highest_us, other.significant_figures) != (self.highest_us, self.significant_figures):
+            raise ValueError("Cannot merge histograms with different layouts")
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total_count += other.total_count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+
+    # -- queries -----------------------------------------------------------
+
+    def percentile(self, percentile):
+        """Latency (ms) at or below which `percentile`% of samples fall"""
+        return self.percentiles([percentile])[0]
+
+    def percentiles(self, percentiles):
+        """Several percentiles (ms) in one pass over the buckets"""
+        if not self.total_count:
+            return [0.0 for _ in percentiles]
+
+        wanted = sorted(
+            (max(1, math.ceil(self.total_count * p / 100)), i) for i, p in enumerate(percentiles)
+        )
+        values = [self.max_us / 1000] * len(percentiles)
+        seen = 0
+        position = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while position < len(wanted) and seen >= wanted[position][0]:
+                value = self._highest_equivalent(self._value_from_index(index))
+                values[wanted[position][1]] = min(value, self.max_us) / 1000
+                position += 1
+            if position == len(wanted):
+                break
+        return values
+
+    def mean(self):
+        """Mean latency in ms"""
+        return self.total_us / self.total_count / 1000 if self.total_count else 0.0
+
+    def summary(self):
+        """Percentile summary (ms) for test results and reports"""
+        p50, p90, p99, p999 = self.percentiles([50, 90, 99, 99.9])
+        return {
+            "count": self.total_count,
+            "min_ms": (self.min_us or 0) / 1000,
+            "mean_ms": self.mean(),
+            "p50_ms": p50,
+            "p90_ms": p90,
+            "p99_ms": p99,
+            "p999_ms": p999,
+            "max_ms": self.max_us / 1000
+        }
+
+    def distribution(self, steps_ms=DISTRIBUTION_STEPS_MS):
+        """Rows of (upper bound ms, count in band, cumulative %) over a 1-2-5 ladder"""
+        if not self.total_count:
+            return []
+
+        rows = []
+        cumulative = 0
+        index = 0
+        bounds = [s for s in steps_ms if s * 1000 < self.max_us]
+        bounds.append(next((s for s in steps_ms if s * 1000 >= self.max_us), math.inf))
+        for bound in bounds:
+            in_band = 0
+            while index < len(self.counts):
+                value = self._value_from_index(index)
+                if value >= bound * 1000:
+                    break
+                in_band += self.counts[index]
+                index += 1
+            cumulative += in_band
+            if in_band:
+                rows.append((bound, in_band, cumulative / self.total_count * 100))
+        return rows
+
+    # -- serialization -----------------------------------------------------
+
+    def to_dict(self):
+        """Sparse, JSON-safe encoding (only non-zero buckets)"""
+        return {
+            "highest_us": self.highest_us,
+            "significant_figures": self.significant_figures,
+            "counts": {str(i): c for i, c in enumerate(self.counts) if c},
+            "total_us": self.total_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a histogram from to_dict() output"""
+        histogram = cls(data["highest_us"], data["significant_figures"])
+        for index, count in data["counts"].items():
+            histogram.counts[int(index)] = count
+        histogram.total_count = sum(data["counts"].values())
+        histogram.total_us = data["total_us"]
+        histogram.min_us = data["min_us"]
+        histogram.max_us = data["max_us"]
+        return histogram
+
+    # -- bucket arithmetic -------------------------------------------------
+
+    def _counts_index(self, value):
+        bucket_index = (value | self._sub_bucket_mask).bit_length() - (self._sub_bucket_half_count_magnitude + 1)
+        sub_bucket_index = value >> bucket_index
+        return ((bucket_index + 1) << self._sub_bucket_half_count_magnitude) + (sub_bucket_index - self._sub_bucket_half_count)
+
+    def _value_from_index(self, index):
+        bucket_index = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self._sub_bucket_half_count
+            bucket_index = 0
+        return sub_bucket_index << bucket_index
+
+    def _highest_equivalent(self, value):
+        bucket_index = (value | self._sub_bucket_mask).bit_length() - (self._sub_bucket_half_count_magnitude + 1)
+        return value + (1 << bucket_index) - 1
@@ -0,0 +1,320 @@
+"""
+Live Metrics - in-flight requests, RPS, errors and latency while a run is going
+Each thread counts into its own shard per (test, endpoint), so the request hot
+path never takes a lock; readers sum the shards. Served as OpenMetrics text on
+TEST_AGENT_METRICS_PORT (/metrics) and printed as a periodic progress line
+(or appended as JSONL to TEST_AGENT_PROGRESS_FILE). Distributed workers ship
+their changes() every second and the coordinator fold()s them in.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+METRICS_HOST = os.getenv("TEST_AGENT_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("TEST_AGENT_METRICS_PORT", "0"))  # 0 = no endpoint
+PROGRESS_S = float(os.getenv("TEST_AGENT_PROGRESS_S", "5"))  # 0 = no progress line
+PROGRESS_FILE = os.getenv("TEST_AGENT_PROGRESS_FILE", "")  # JSONL instead of the console
+
+# Histogram bucket upper bounds (ms) - fixed so shards merge by adding counts
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+class Shard:
+    """One thread's counters for one (test, endpoint)
+
+    Used as a context manager around a request: entering counts it in flight,
+    record() counts its result, leaving counts it finished (even if cancelled).
+    Only the owning thread writes, so plain int updates are safe.
+    """
+
+    __slots__ = ("labels", "started", "finished", "requests", "errors", "buckets", "sum_ms")
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.started = 0
+        self.finished = 0
+        self.requests = 0
+        self.errors = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # Last is +Inf
+        self.sum_ms = 0.0
+
+    def __enter__(self):
+        self.started += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.finished += 1
+        return False
+
+    def record(self, result):
+        """Count a finished request's result record (returned unchanged)"""
+        self.requests += 1
+        if not result.get("success", False):
+            self.errors += 1
+        latency_ms = result.get("latency_ms")
+        if latency_ms is not None:
+            self.buckets[bisect_left(BUCKETS_MS, latency_ms)] += 1
+            self.sum_ms += latency_ms
+        return result
+
+    def fold(self, delta):
+        """Add another process's counter changes (one row of changes())"""
+        self.started += delta["in_flight"]
+        self.requests += delta["requests"]
+        self.errors += delta["errors"]
+        self.sum_ms += delta["sum_ms"]
+        for i, count in enumerate(delta["buckets"]):
+            self.buckets[i] += count
+
+
+class LiveMetrics:
+    """Registry of per-thread shards"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._register_lock = threading.Lock()  # Taken once per new (thread, test)
+
+    def shard(self, test):
+        """This thread's shard for a test dict"""
+        try:
+            shards = self._local.shards
+        except AttributeError:
+            shards = self._local.shards = {}
+        key = (test.get("name"), test.get("endpoint"))
+        shard = shards.get(key)
+        if shard is None:
+            endpoint = f"{test.get('method', 'POST')} {urlsplit(test.get('endpoint') or '').path}"
+            shard = shards[key] = self._register((test.get("name") or endpoint, endpoint))
+        return shard
+
+    def fold(self, changes):
+        """Count changes() rows sent by a distributed worker into this thread's shards"""
+        try:
+            shards = self._local.folded
+        except AttributeError:
+            shards = self._local.folded = {}
+        for test, endpoint, delta in changes:
+            shard = shards.get((test, endpoint))
+            if shard is None:
+                shard = shards[(test, endpoint)] = self._register((test, endpoint))
+            shard.fold(delta)
+
+    def _register(self, labels):
+        shard = Shard(labels)
+        with self._register_lock:
+            self._shards.append(shard)
+        return shard
+
+    def snapshot(self):
+        """(test, endpoint) -> summed counters across threads"""
+        totals = {}
+        for shard in list(self._shards):
+            total = totals.get(shard.labels)
+            if total is None:
+                total = totals[shard.labels] = {
+                    "in_flight": 0, "requests": 0, "errors": 0,
+                    "buckets": [0] * (len(BUCKETS_MS) + 1), "sum_ms": 0.0
+                }
+            total["in_flight"] += shard.started - shard.finished
+            total["requests"] += shard.requests
+            total["errors"] += shard.errors
+            total["sum_ms"] += shard.sum_ms
+            for i, count in enumerate(shard.buckets):
+                total["buckets"][i] += count
+        return totals
+
+    def openmetrics(self):
+        """OpenMetrics text exposition of the current snapshot"""
+        totals = sorted(self.snapshot().items())
+        lines = [
+            "# TYPE test_agent_requests counter",
+            "# HELP test_agent_requests Completed requests.",
+        ]
+        lines += [f"test_agent_requests_total{{{_labels(key)}}} {t['requests']}" for key, t in totals]
+        lines += ["# TYPE test_agent_errors counter", "# HELP test_agent_errors Failed requests (non-2xx or no response)."]
+        lines += [f"test_agent_errors_total{{{_labels(key)}}} {t['errors']}" for key, t in totals]
+        lines += ["# TYPE test_agent_in_flight gauge", "# HELP test_agent_in_flight Requests sent and not yet finished."]
+        lines += [f"test_agent_in_flight{{{_labels(key)}}} {t['in_flight']}" for key, t in totals]
+        lines += [
+            "# TYPE test_agent_request_duration_seconds histogram",
+            "# UNIT test_agent_request_duration_seconds seconds",
+            "# HELP test_agent_request_duration_seconds Request latency."
+        ]
+        for key, t in totals:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS + (None,), t["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound is None else repr(bound / 1000)
+                lines.append(f'test_agent_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"test_agent_request_duration_seconds_count{{{labels}}} {cumulative}")
+            lines.append(f"test_agent_request_duration_seconds_sum{{{labels}}} {t['sum_ms'] / 1000}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def changes(totals, before):
+    """[test, endpoint, delta] rows for what moved between two snapshot()s (JSON-safe)"""
+    rows = []
+    for key, t in totals.items():
+        last = before.get(key)
+        if last is None:
+            rows.append([*key, t])
+            continue
+        delta = {
+            "in_flight": t["in_flight"] - last["in_flight"],
+            "requests": t["requests"] - last["requests"],
+            "errors": t["errors"] - last["errors"],
+            "buckets": [now - was for now, was in zip(t["buckets"], last["buckets"])],
+            "sum_ms": t["sum_ms"] - last["sum_ms"]
+        }
+        if delta["in_flight"] or delta["requests"]:
+            rows.append([*key, delta])
+    return rows
+
+
+def _labels(key):
+    test, endpoint = key
+    return f'test="{_escape(test)}",endpoint="{_escape(endpoint)}"'
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = LiveMetrics()  # Process-wide registry the request paths count into
+
+
+class LiveExport:
+    """Background /metrics server and progress line for a LiveMetrics registry"""
+
+    def __init__(self, metrics=METRICS, port=METRICS_PORT, host=METRICS_HOST,
+                 interval_s=PROGRESS_S, progress_file=PROGRESS_FILE):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.interval_s = interval_s
+        self.progress_file = progress_file
+        self._server = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.port:
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            print(f"📡 Live metrics on http://{self.host}:{self._server.server_port}/metrics")
+        if self.interval_s > 0:
+            self._thread = threading.Thread(target=self._progress_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.openmetrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Scrapes would drown out the agent's own output
+
+        return Handler
+
+    def _progress_loop(self):
+        started = last_at = time.time()
+        last = {}
+        while not self._stop.wait(self.interval_s):
+            now = time.time()
+            totals = self.metrics.snapshot()
+            line = self._progress(totals, last, now - last_at, now - started)
+            last, last_at = totals, now
+            if line is not None:
+                self._emit(line, now)
+
+    def _progress(self, totals, last, interval_s, elapsed_s):
+        """Interval deltas across all tests, or None when nothing happened"""
+        requests = errors = in_flight = 0
+        buckets = [0] * (len(BUCKETS_MS) + 1)
+        tests = {}
+        for key, t in totals.items():
+            before = last.get(key, {"requests": 0, "errors": 0, "buckets": [0] * len(buckets)})
+            delta = t["requests"] - before["requests"]
+            requests += delta
+            errors += t["errors"] - before["errors"]
+            in_flight += t["in_flight"]
+            for i, count in enumerate(t["buckets"]):
+                buckets[i] += count - before["buckets"][i]
+            if delta or t["in_flight"]:
+                name = tests.setdefault(key[0], {"requests": 0, "errors": 0, "in_flight": 0})
+                name["requests"] += delta
+                name["errors"] += t["errors"] - before["errors"]
+                name["in_flight"] += t["in_flight"]
+        if not requests and not in_flight:
+            return None
+
+        return {
+            "elapsed_s": round(elapsed_s, 1),
+            "requests": sum(t["requests"] for t in totals.values()),
+            "rps": requests / interval_s if interval_s else 0.0,
+            "error_rate": errors / requests if requests else 0.0,
+            "in_flight": in_flight,
+            "p99_le_ms": _bucket_percentile(buckets, 99),
+            "tests": tests
+        }
+
+    def _emit(self, line, now):
+        if self.progress_file:
+            with open(self.progress_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": now, **line}) + "\n")
+            return
+
+        busiest = max(line["tests"], key=lambda name: line["tests"][name]["requests"])
+        if line["p99_le_ms"] is None:
+            p99 = "-"
+        elif line["p99_le_ms"] == "+Inf":
+            p99 = f"> {BUCKETS_MS[-1]}ms"
+        else:
+            p99 = f"≤ {line['p99_le_ms']}ms"
+        print(
+            f"⏱️  [{line['elapsed_s']:>6.0f}s] {line['requests']:,} requests | {line['rps']:.1f} req/s | "
+            f"errors {line['error_rate'] * 100:.1f}% | {line['in_flight']} in flight | p99 {p99} | {busiest}"
+        )
+
+
+def _bucket_percentile(buckets, percentile):
+    """Upper bound (ms) of the bucket holding the percentile ("+Inf" past the last, None if empty)"""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = total * percentile / 100
+    cumulative = 0
+    for bound, count in zip(BUCKETS_MS + ("+Inf",), buckets):
+        cumulative += count
+        if cumulative >= rank:
+            return bound
+    return "+Inf"
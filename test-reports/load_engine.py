@@ -0,0 +1,418 @@
+"""
+Async Load Engine - asyncio/aiohttp request generator for stress tests
+Drives thousands of in-flight requests from a single core
+Accepts the same test dicts as TestAgent and returns the same result records
+"""
+
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import load_profile
+from live_metrics import METRICS
+from phase_timing import phases_from_marks
+from stream_metrics import MAX_BODY_BYTES, StreamTimer, drains, is_event_stream
+from target_health import (
+    DEADLINE_EXCEEDED, REQUEST_TIMEOUT_S, UNAVAILABLE, halt_reason, halted, request_timeout, skipped
+)
+from virtual_users import drive_async
+
+# Max in-flight requests per target host (scheme://host:port)
+DEFAULT_TARGET_CONCURRENCY = 1000
+KEEPALIVE_TIMEOUT = 30
+CONTROL_INTERVAL_S = 0.1  # How often a concurrency ramp adjusts its worker count
+
+
+def target_of(endpoint):
+    """Return the scheme://host:port a test endpoint belongs to"""
+    parts = urlsplit(endpoint)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def raise_fd_limit(wanted):
+    """Lift the soft open-file limit so thousands of sockets can be open at once"""
+    try:
+        import resource
+    except ImportError:
+        return  # Windows - no RLIMIT_NOFILE
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY:
+        wanted = min(wanted, hard)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+
+class AsyncLoadEngine:
+    """Runs N copies of a test request concurrently on one event loop"""
+
+    def __init__(self, target_concurrency=DEFAULT_TARGET_CONCURRENCY, timeout=REQUEST_TIMEOUT_S,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, breaker=None):
+        self.target_concurrency = target_concurrency
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.breaker = breaker  # target_health.CircuitBreaker shared with the agent, if any
+        self.pool_stats = {}  # target -> {"requests", "new_connections", "reused"}
+        self._stats_lock = threading.Lock()  # Parallel tests run their own loops on other threads
+
+    def run(self, test, count, on_result=None):
+        """Fire `count` requests for `test` and return the per-request results in order
+
+        With `on_result`, each result is handed over as it completes instead of
+        being collected (returns None) - used to stream into a ResultSink.
+        """
+        return self.run_batch([test] * count, on_result)
+
+    def run_batch(self, tests, on_result=None):
+        """Fire one request per test dict (any mix of targets) and return results in order"""
+        raise_fd_limit(min(len(tests), self.target_concurrency) * 2 + 256)
+        return asyncio.run(self._run(tests, on_result))
+
+    def _count(self, target, field):
+        with self._stats_lock:
+            entry = self.pool_stats.setdefault(target, {"requests": 0, "new_connections": 0, "reused": 0})
+            entry[field] += 1
+
+    def run_open_loop(self, test, rate_per_sec, count, start_delay=0.0, on_result=None, on_halt=None):
+        """Send `count` requests on a fixed timetable at `rate_per_sec`, never waiting on replies
+
+        Each result carries latency_ms measured from its *intended* send time, so a
+        stalled server shows up as tail latency instead of silently lowering the
+        offered load (coordinated omission). The timetable stops early once the
+        test's deadline or an open breaker makes further sends pointless;
+        on_halt(target_health.halted(...)) is told once what was left unsent.
+        """
+        raise_fd_limit(min(count, self.target_concurrency) * 2 + 256)
+        return asyncio.run(self._run_open_loop(test, rate_per_sec, count, start_delay, on_result, on_halt))
+
+    def run_replay(self, entries, on_result, on_halt=None):
+        """Replay (offset_s, test) entries - e.g. a traffic_replay.ReplayLog - on their own timetable
+
+        Entries are pulled lazily as their send time comes up; on_result(test, result)
+        gets each result with latency measured from the intended send time. Stops
+        early like run_open_loop().
+        """
+        raise_fd_limit(self.target_concurrency * 2 + 256)
+        asyncio.run(self._run_replay(entries, on_result, on_halt))
+
+    def run_profile(self, test, stages, start_delay=0.0, on_result=None, on_halt=None):
+        """Run a staged load profile (see load_profile) - open-loop rate and/or looping-user stages
+
+        Returns the results in completion order, or None when streaming to `on_result`.
+        Stops early like run_open_loop().
+        """
+        load_profile.validate(stages)
+        raise_fd_limit(self.target_concurrency * 2 + 256)
+        return asyncio.run(self._run_profile(test, stages, start_delay, on_result, on_halt))
+
+    def run_users(self, journeys, steps, ramp_s=0.0):
+        """Drive virtual-user journeys (virtual_users.VirtualUser.journey()) concurrently
+
+        Each user gets its own cookie jar; connections come from one shared pool.
+        Users start evenly spread over `ramp_s` seconds.
+        """
+        asyncio.run(self._run_users(journeys, steps, ramp_s))
+
+    def _semaphores(self, tests):
+        # One bounded semaphore per target so a slow host can't starve another
+        semaphores = {}
+        for test in tests:
+            target = target_of(test["endpoint"])
+            if target not in semaphores:
+                limit = test.get("max_in_flight", self.target_concurrency)
+                semaphores[target] = asyncio.BoundedSemaphore(limit)
+        return semaphores
+
+    def _session(self, cold=False, connector=None, cookie_jar=None):
+        """Pooled keep-alive session; cold=True opens a fresh connection per request
+
+        Trace hooks count new vs. reused connections and timestamp each request
+        phase into trace_request_ctx["marks"] (see phase_timing.phases_from_marks).
+        Virtual users pass a shared `connector` and their own `cookie_jar`.
+        """
+        async def on_create(session, context, params):
+            context.trace_request_ctx["marks"]["connect_end"] = time.perf_counter()
+            self._count(context.trace_request_ctx["target"], "new_connections")
+
+        async def on_reuse(session, context, params):
+            self._count(context.trace_request_ctx["target"], "reused")
+
+        def mark(name):
+            async def hook(session, context, params):
+                context.trace_request_ctx["marks"][name] = time.perf_counter()
+            return hook
+
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        trace.on_request_start.append(mark("request_start"))
+        trace.on_dns_resolvehost_start.append(mark("dns_start"))
+        trace.on_dns_resolvehost_end.append(mark("dns_end"))
+        trace.on_connection_create_start.append(mark("connect_start"))
+        trace.on_request_headers_sent.append(mark("sent"))
+        trace.on_request_chunk_sent.append(mark("sent"))
+        trace.on_request_end.append(mark("headers"))
+
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        if connector is not None:
+            return aiohttp.ClientSession(
+                connector=connector, connector_owner=False, cookie_jar=cookie_jar, timeout=timeout,
+                trace_configs=[trace]
+            )
+        if cold:
+            connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=300, force_close=True)
+        else:
+            connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=300, keepalive_timeout=self.keepalive_timeout)
+        return aiohttp.ClientSession(connector=connector, cookie_jar=cookie_jar, timeout=timeout, trace_configs=[trace])
+
+    async def _run(self, tests, on_result):
+        semaphores = self._semaphores(tests)
+        results = None if on_result else [None] * len(tests)
+
+        async def one(index, test, session):
+            result = await self._make_request(session, semaphores[target_of(test["endpoint"])], test)
+            self._deliver(results, index, result, on_result)
+
+        async with self._session() as warm, self._session(cold=True) as cold:
+            await asyncio.gather(*(
+                one(i, test, cold if test.get("cold_connections") else warm)
+                for i, test in enumerate(tests)
+            ))
+        return results
+
+    async def _run_open_loop(self, test, rate_per_sec, count, start_delay, on_result, on_halt):
+        semaphore = self._semaphores([test])[target_of(test["endpoint"])]
+        interval = 1.0 / rate_per_sec
+        results = None if on_result else [None] * count
+        pending = set()  # only in-flight requests are held, not the whole timetable
+
+        async def one(index, intended):
+            result = await self._scheduled_request(session, semaphore, test, intended)
+            self._deliver(results, index, result, on_result)
+
+        async with self._session(cold=test.get("cold_connections", False)) as session:
+            start = time.perf_counter() + start_delay
+            for i in range(count):
+                intended = start + i * interval
+                delay = intended - time.perf_counter()
+                reason = halt_reason(test, self.breaker, delay)
+                if reason is not None:
+                    self._halt(on_halt, halted(reason, unsent=count - i, remaining_s=(count - i) * interval))
+                    break
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Behind schedule? Fire immediately - the lag is charged to latency
+                task = asyncio.ensure_future(one(i, intended))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        return results
+
+    async def _run_replay(self, entries, on_result, on_halt):
+        semaphores = {}  # The hosts in a capture aren't known up front
+        pending = set()
+
+        async def one(test, intended):
+            target = target_of(test["endpoint"])
+            if target not in semaphores:
+                semaphores[target] = asyncio.BoundedSemaphore(test.get("max_in_flight", self.target_concurrency))
+            on_result(test, await self._scheduled_request(session, semaphores[target], test, intended))
+
+        async with self._session() as session:
+            start = time.perf_counter()
+            for offset, test in entries:
+                intended = start + offset
+                delay = intended - time.perf_counter()
+                reason = halt_reason(test, self.breaker, delay)
+                if reason is not None:
+                    self._halt(on_halt, halted(reason))  # The rest of the log is never read
+                    break
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.ensure_future(one(test, intended))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+
+    async def _run_profile(self, test, stages, start_delay, on_result, on_halt):
+        semaphore = self._semaphores([test])[target_of(test["endpoint"])]
+        results = None if on_result else []
+        deliver = on_result or results.append
+        pending = set()
+        users = {}  # index -> looping task for concurrency stages
+        state = {"users": 0, "halted": None}
+
+        async def scheduled(intended):
+            deliver(await self._scheduled_request(session, semaphore, test, intended))
+
+        async def user(index):
+            while index < state["users"] and time.perf_counter() < stop and not halt(0.0):
+                deliver(await self._make_request(session, semaphore, test))
+
+        def halt(delay):
+            """Stop the profile (once) if the deadline or an open breaker says so"""
+            if state["halted"] is None:
+                reason = halt_reason(test, self.breaker, delay)
+                if reason is not None:
+                    state["halted"] = reason
+                    state["users"] = 0
+                    self._halt(on_halt, halted(reason, remaining_s=max(0.0, stop - time.perf_counter())))
+            return state["halted"] is not None
+
+        def spawn(task):
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            return task
+
+        async with self._session(cold=test.get("cold_connections", False)) as session:
+            start = time.perf_counter() + start_delay
+            stop = start + load_profile.duration(stages)
+            for segment in load_profile.segments(stages):
+                if segment.kind == "rate_per_sec":
+                    state["users"] = 0  # Looping users from an earlier stage wind down
+                    for offset in load_profile.arrivals(segment):
+                        intended = start + offset
+                        delay = intended - time.perf_counter()
+                        if halt(delay):
+                            break
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                        spawn(asyncio.ensure_future(scheduled(intended)))
+                    if state["halted"]:
+                        break
+                    continue
+
+                end = start + segment.end
+                now = time.perf_counter()
+                if halt(start + segment.start - now):
+                    break
+                if start + segment.start > now:
+                    await asyncio.sleep(start + segment.start - now)
+                while time.perf_counter() < end and not halt(0.0):
+                    offset = time.perf_counter() - start
+                    state["users"] = int(round(load_profile.value_at(segment, offset)))
+                    for index in range(state["users"]):
+                        if index not in users or users[index].done():
+                            users[index] = spawn(asyncio.ensure_future(user(index)))
+                    await asyncio.sleep(min(CONTROL_INTERVAL_S, max(0.0, end - time.perf_counter())))
+
+            delay = stop - time.perf_counter()
+            if delay > 0 and not state["halted"] and halt_reason(test, self.breaker, delay) is None:
+                await asyncio.sleep(delay)  # A rate stage's arrivals end before its duration does
+            state["users"] = 0
+            if pending:
+                await asyncio.gather(*pending)
+        return results
+
+    async def _run_users(self, journeys, steps, ramp_s):
+        semaphores = self._semaphores(steps)
+
+        async with self._session() as shared:
+            async def user(index, journey):
+                await asyncio.sleep(ramp_s * index / len(journeys))
+                jar = aiohttp.CookieJar(unsafe=True)  # unsafe: keep cookies from IP-address hosts too
+                async with self._session(connector=shared.connector, cookie_jar=jar) as session:
+                    async def send(request):
+                        return await self._make_request(session, semaphores[target_of(request["endpoint"])], request)
+                    await drive_async(journey, send)
+
+            await asyncio.gather(*(user(i, journey) for i, journey in enumerate(journeys)))
+
+    def _halt(self, on_halt, record):
+        if on_halt is not None:
+            on_halt(record)
+
+    def _deliver(self, results, index, result, on_result):
+        if on_result is not None:
+            on_result(result)
+        else:
+            results[index] = result
+
+    async def _scheduled_request(self, session, semaphore, test, intended):
+        sent = time.perf_counter()
+        result = await self._make_request(session, semaphore, test)
+        if result.get("skipped"):
+            return result
+        done = time.perf_counter()
+        result["latency_ms"] = (done - intended) * 1000
+        result["schedule_lag_ms"] = (sent - intended) * 1000
+        return result
+
+    async def _make_request(self, session, semaphore, test):
+        """Async twin of TestAgent._make_request - same result record"""
+        target = target_of(test["endpoint"])
+        if self.breaker is not None and not self.breaker.allow(target):
+            return skipped(UNAVAILABLE)
+        async with semaphore:
+            with METRICS.shard(test) as live:
+                result = live.record(await self._send_request(session, test))
+        if self.breaker is not None:
+            self.breaker.record(target, result)
+        return result
+
+    async def _send_request(self, session, test):
+        """Send one request and stream its body into a result record"""
+        method = test.get("method", "POST")
+        endpoint = test.get("endpoint")
+        payload = test.get("payload", {})
+        headers = test.get("headers", {})
+
+        limits = request_timeout(test, self.timeout)
+        if limits is None:
+            return skipped(DEADLINE_EXCEEDED)
+        timeout = aiohttp.ClientTimeout(total=limits[1], sock_connect=limits[0])
+
+        trace_ctx = {"target": target_of(endpoint), "marks": {}}
+        self._count(trace_ctx["target"], "requests")
+        start = time.perf_counter()
+        try:
+            if method in ("GET", "HEAD"):
+                request = session.request(
+                    method, endpoint, headers=headers, timeout=timeout, trace_request_ctx=trace_ctx
+                )
+            else:
+                request = session.request(
+                    method, endpoint, json=payload, headers=headers, timeout=timeout, trace_request_ctx=trace_ctx
+                )
+
+            async with request as response:
+                timer = StreamTimer(
+                    start,
+                    keep_bytes=test.get("body_bytes", MAX_BODY_BYTES),
+                    sse=is_event_stream(response.headers.get("Content-Type")),
+                    timed=test.get("stream", False) or response.headers.get("Transfer-Encoding") == "chunked"
+                )
+                timer.headers()
+                drain = drains(test, timer.sse)
+                async for chunk in response.content.iter_any():
+                    timer.feed(chunk)
+                    if timer.satisfied and not drain:
+                        break  # Rest is never downloaded - the connection is closed, not reused
+
+                done = time.perf_counter()
+                return {
+                    "success": response.status in [200, 201],
+                    "status_code": response.status,
+                    "data": timer.text(response.charset),
+                    "latency_ms": (done - start) * 1000,
+                    "phases": phases_from_marks(trace_ctx["marks"], done),
+                    **timer.fields()
+                }
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return {
+                "success": False,
+                "error": str(e) or type(e).__name__,
+                "latency_ms": (time.perf_counter() - start) * 1000
+            }
+        except Exception as e:  # Bad URL / payload, unwrapped OSError... - one failed request, not a failed batch
+            return {
+                "success": False,
+                "error": f"{type(e).__name__}: {e}",
+                "latency_ms": (time.perf_counter() - start) * 1000
+            }
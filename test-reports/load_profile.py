@@ -0,0 +1,135 @@
+"""
+Load Profiles - staged ramp-up / soak / spike schedules for stress tests
+
+A stress test with "stages" runs them back to back. Each stage holds or ramps
+either an open-loop arrival rate or a closed-loop concurrency level:
+
+    "stages": [
+        {"duration_s": 30, "rate_per_sec": 50},                   # ramp 0 -> 50/s
+        {"duration_s": 600, "rate_per_sec": 50},                  # soak
+        {"duration_s": 10, "rate_per_sec": 500, "ramp": "step"},  # spike
+        {"duration_s": 60, "concurrency": 20, "from": 1}          # 1 -> 20 looping users
+    ]
+
+"ramp" is "linear" (default - from the previous stage's target of the same
+kind, or "from") or "step" (jump straight to the target).
+"""
+
+import math
+from collections import namedtuple
+
+RAMPS = ("linear", "step")
+KINDS = ("rate_per_sec", "concurrency")
+
+Segment = namedtuple("Segment", "start end kind start_value end_value")
+
+
+def validate(stages):
+    """Raise ValueError on a malformed stage list"""
+    if not stages:
+        raise ValueError("A load profile needs at least one stage")
+    for i, stage in enumerate(stages):
+        kinds = [kind for kind in KINDS if kind in stage]
+        if len(kinds) != 1:
+            raise ValueError(f"Stage {i + 1} needs exactly one of rate_per_sec / concurrency")
+        if stage.get("duration_s", 0) <= 0:
+            raise ValueError(f"Stage {i + 1} needs a positive duration_s")
+        if stage.get("ramp", "linear") not in RAMPS:
+            raise ValueError(f"Stage {i + 1} ramp must be one of {RAMPS}")
+
+
+def segments(stages):
+    """Stages as Segments with absolute start/end offsets (seconds) and ramp endpoints"""
+    previous = dict.fromkeys(KINDS, 0)
+    start = 0.0
+    result = []
+    for stage in stages:
+        kind = "rate_per_sec" if "rate_per_sec" in stage else "concurrency"
+        end_value = stage[kind]
+        if stage.get("ramp", "linear") == "step":
+            start_value = end_value
+        else:
+            start_value = stage.get("from", previous[kind])
+        end = start + stage["duration_s"]
+        result.append(Segment(start, end, kind, start_value, end_value))
+        previous[kind] = end_value
+        start = end
+    return result
+
+
+def duration(stages):
+    return sum(stage["duration_s"] for stage in stages)
+
+
+def value_at(segment, offset):
+    """Target rate/concurrency `offset` seconds into the profile (within `segment`)"""
+    span = segment.end - segment.start
+    progress = min(1.0, max(0.0, (offset - segment.start) / span))
+    return segment.start_value + (segment.end_value - segment.start_value) * progress
+
+
+def target_at(stages, offset):
+    """(kind, target) at `offset` seconds into the profile, or (None, 0) past the end"""
+    for segment in segments(stages):
+        if segment.start <= offset < segment.end:
+            return segment.kind, value_at(segment, offset)
+    return None, 0
+
+
+def arrivals(segment):
+    """Send offsets (seconds from profile start) for an open-loop rate segment
+
+    The k-th request goes out when the integral of the (linearly ramped) rate
+    reaches k, so a ramp 0 -> 100/s over 10s sends 500 requests.
+    """
+    r0, r1 = segment.start_value, segment.end_value
+    span = segment.end - segment.start
+    a = (r1 - r0) / (2 * span)  # N(t) = r0*t + a*t^2
+    k = 0
+    while True:
+        if a == 0:
+            if r0 <= 0:
+                return
+            t = k / r0
+        else:
+            discriminant = r0 * r0 + 4 * a * k
+            if discriminant < 0:
+                return  # Ramping down - the rate has reached zero
+            t = (-r0 + math.sqrt(discriminant)) / (2 * a)
+        if t >= span:
+            return
+        yield segment.start + t
+        k += 1
+
+
+def expected_requests(stages):
+    """Requests the rate stages will send (concurrency stages depend on latency)"""
+    return sum(
+        int((s.start_value + s.end_value) / 2 * (s.end - s.start))
+        for s in segments(stages) if s.kind == "rate_per_sec"
+    )
+
+
+def peak(stages, kind):
+    """Highest rate or concurrency any stage reaches"""
+    return max([max(s.start_value, s.end_value) for s in segments(stages) if s.kind == kind] or [0])
+
+
+def shard(stages, index, workers):
+    """This worker's share of a profile: rate / workers, concurrency split as integers"""
+    def share(value, kind):
+        if kind == "rate_per_sec":
+            return value / workers
+        return int(value) // workers + (1 if index < int(value) % workers else 0)
+
+    sharded = []
+    previous = dict.fromkeys(KINDS, 0)
+    for stage, segment in zip(stages, segments(stages)):
+        kind = segment.kind
+        part = dict(stage)
+        part[kind] = share(segment.end_value, kind)
+        if stage.get("ramp", "linear") == "linear" and segment.start_value != previous[kind]:
+            part["from"] = share(segment.start_value, kind)
+        previous[kind] = segment.end_value
+        sharded.append(part)
+    return sharded
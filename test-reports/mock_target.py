@@ -0,0 +1,327 @@
+"""
+Mock Target - local stand-in for the Next.js app (:3000) and Super Agent (:9500)
+Serves the routes ai-test-agent.py hits with configurable latency
+distributions, error rates, rate limiting and streamed (SSE / chunked) replies,
+so the agent can run - and be benchmarked - without the real stack
+
+Run both servers on the default ports:
+    python mock_target.py
+
+Slow, flaky AI routes:
+    python mock_target.py --latency lognormal:120,0.6 --error-rate 0.02
+
+Per-route overrides from a JSON profile (route -> settings, see DEFAULT_ROUTES):
+    python mock_target.py --profile mock-profile.json
+
+A request can also pick its own latency with the X-Mock-Latency header
+(same spec format, e.g. "const:500") - agent_benchmark.py uses it to hold
+requests in flight.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import random
+import re
+import time
+import uuid
+
+from aiohttp import web
+
+APP_PORT = 3000
+SUPER_AGENT_PORT = 9500
+SUPER_AGENT_KEY = "super-agent-dev-key-12345"
+SESSION_COOKIE = "next-auth.session-token"
+ADMIN_CREDENTIALS = ("admin", "test-password")
+
+# route -> settings; "latency" is a spec string (see parse_latency)
+# "stream": SSE tokens ("sse") or a chunked JSON body ("chunked")
+# "rate_limit": requests/sec per client with an equal burst (429 + Retry-After past it)
+DEFAULT_ROUTES = {
+    "/api/ai-assistant": {
+        "latency": "lognormal:80,0.5",
+        "stream": {"mode": "sse", "tokens": 40, "interval_ms": 10}
+    },
+    "/api/estimate": {"latency": "lognormal:20,0.4"},
+    "/api/auth/[...nextauth]": {"latency": "uniform:5,15"},
+    "/api/auth/signin": {"latency": "uniform:5,15"},
+    "/admin/super": {"latency": "const:2"},
+    "/api/admin/users": {"latency": "lognormal:15,0.3"},
+    "/api/admin/analytics": {"latency": "lognormal:40,0.4"},
+    "/api/admin/activity-logs": {"latency": "lognormal:25,0.4"},
+    "/api/ai-assessment/start": {"latency": "lognormal:30,0.3"},
+    "/api/ai-assessment/answer": {"latency": "lognormal:30,0.3"},
+    "/api/ai-assessment/generate": {
+        "latency": "lognormal:150,0.5",
+        "stream": {"mode": "sse", "tokens": 80, "interval_ms": 10}
+    },
+    "/orchestrate": {
+        "latency": "lognormal:200,0.6",
+        "stream": {"mode": "chunked", "chunks": 20, "chunk_bytes": 1024, "interval_ms": 5}
+    },
+    "/health": {"latency": "const:0"}
+}
+
+APP_ROUTES = [route for route in DEFAULT_ROUTES if route != "/orchestrate"]
+SUPER_AGENT_ROUTES = ["/orchestrate", "/health"]
+
+_SQLI = re.compile(r"('|--|;|\b(or|and|union|select)\b.*=)", re.I)
+_XSS = re.compile(r"<\s*script|javascript:|on\w+\s*=", re.I)
+
+
+def parse_latency(spec):
+    """'const:50', 'uniform:10,100', 'lognormal:<median ms>,<sigma>', 'exp:<mean ms>' -> sampler() ms"""
+    kind, _, args = str(spec).partition(":")
+    values = [float(v) for v in args.split(",") if v]
+
+    if kind == "const":
+        return lambda: values[0] if values else 0.0
+    if kind == "uniform":
+        low, high = values
+        return lambda: random.uniform(low, high)
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(0, sigma) * median
+    if kind == "exp":
+        mean, = values
+        return lambda: random.expovariate(1 / mean) if mean else 0.0
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class TokenBucket:
+    """Per-client token bucket - `rate` tokens/sec, `burst` capacity"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._buckets = {}  # client -> (tokens, last refill)
+
+    def take(self, client):
+        """True if the client may send now"""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1
+        self._buckets[client] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+
+class MockTarget:
+    """Both mock servers on one event loop, sharing per-route settings and state"""
+
+    def __init__(self, routes=None, latency=None, error_rate=None, rate_limit=None):
+        self.routes = copy.deepcopy(DEFAULT_ROUTES)
+        for route, settings in (routes or {}).items():
+            self.routes.setdefault(route, {}).update(settings)
+        for settings in self.routes.values():  # Global flags override every route
+            if latency is not None:
+                settings["latency"] = latency
+            if error_rate is not None:
+                settings["error_rate"] = error_rate
+            if rate_limit is not None:
+                settings["rate_limit"] = rate_limit
+
+        self._samplers = {route: parse_latency(s.get("latency", "const:0")) for route, s in self.routes.items()}
+        self._limiters = {
+            route: TokenBucket(s["rate_limit"]) for route, s in self.routes.items() if s.get("rate_limit")
+        }
+        self.sessions = set()
+        self.assessments = {}  # assessmentId -> answers so far
+        self.users = []
+        self.requests_served = 0
+
+    def app(self, routes):
+        """aiohttp application serving `routes` (any method)"""
+        application = web.Application()
+        for route in routes:
+            application.router.add_route("*", route, self._handler(route))
+        return application
+
+    async def serve(self, host="127.0.0.1", app_port=APP_PORT, agent_port=SUPER_AGENT_PORT):
+        """Start both servers and block until cancelled"""
+        runners = []
+        for routes, port in ((APP_ROUTES, app_port), (SUPER_AGENT_ROUTES, agent_port)):
+            runner = web.AppRunner(self.app(routes), access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, host, port, backlog=4096).start()
+            runners.append(runner)
+
+        print(f"🎭 Mock app on http://{host}:{app_port}, Super Agent on http://{host}:{agent_port}", flush=True)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+
+    def _handler(self, route):
+        settings = self.routes[route]
+        behaviour = getattr(self, "_route_" + re.sub(r"\W+", "_", route).strip("_"))
+
+        async def handle(request):
+            self.requests_served += 1
+            override = request.headers.get("X-Mock-Latency")
+            delay_ms = parse_latency(override)() if override else self._samplers[route]()
+
+            limiter = self._limiters.get(route)
+            if limiter is not None and not limiter.take(request.remote):
+                return web.json_response(
+                    {"error": "Too many requests"}, status=429, headers={"Retry-After": "1"}
+                )
+
+            if delay_ms > 0:
+                await asyncio.sleep(delay_ms / 1000)
+
+            if random.random() < settings.get("error_rate", 0):
+                return web.json_response({"error": "Injected server error"}, status=500)
+
+            body = await self._json_body(request)
+            reply = behaviour(request, body)
+            if isinstance(reply, web.StreamResponse):
+                return reply
+            if settings.get("stream"):
+                return await self._stream(request, settings["stream"], reply)
+            return web.json_response(reply)
+
+        return handle
+
+    async def _json_body(self, request):
+        if not request.can_read_body:
+            return {}
+        try:
+            body = await request.json()
+        except (ValueError, UnicodeDecodeError):
+            return {}
+        return body if isinstance(body, dict) else {}
+
+    async def _stream(self, request, stream, reply):
+        """Send `reply` as SSE tokens or as a slow chunked JSON body"""
+        interval = stream.get("interval_ms", 0) / 1000
+
+        if stream["mode"] == "sse":
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+            await response.prepare(request)
+            for i in range(stream.get("tokens", 20)):
+                if interval:
+                    await asyncio.sleep(interval)
+                await response.write(f"data: {json.dumps({'token': f'tok{i} '})}\n\n".encode())
+            await response.write(f"data: {json.dumps(reply)}\n\ndata: [DONE]\n\n".encode())
+            await response.write_eof()
+            return response
+
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        payload = json.dumps(reply).encode()
+        padding = stream.get("chunk_bytes", 1024)
+        await response.write(payload[:-1] + b', "trace": [')
+        for i in range(stream.get("chunks", 10)):
+            if interval:
+                await asyncio.sleep(interval)
+            separator = b", " if i else b""
+            await response.write(separator + json.dumps("x" * padding).encode())
+        await response.write(b"]}")
+        await response.write_eof()
+        return response
+
+    def _signed_in(self, request):
+        return request.cookies.get(SESSION_COOKIE) in self.sessions
+
+    # -- route behaviour: dict -> JSON 200, or a finished web.Response -----
+
+    def _route_api_ai_assistant(self, request, body):
+        message = str(body.get("message", ""))
+        if _XSS.search(message):
+            return web.json_response({"error": "Invalid input"}, status=400)
+        return {"reply": f"Mock assistant reply to: {message[:80]}", "conversationId": body.get("conversationId")}
+
+    def _route_api_estimate(self, request, body):
+        if "industry" not in body:
+            return web.json_response({"error": "industry is required"}, status=400)
+        size = body.get("size", 0)
+        return {"industry": body["industry"], "size": size, "estimate": round(size * 1.75, 2)}
+
+    def _route_api_auth_nextauth(self, request, body):
+        username, password = str(body.get("username", "")), str(body.get("password", ""))
+        if _SQLI.search(username) or _SQLI.search(password) or (username, password) != ADMIN_CREDENTIALS:
+            return web.json_response({"error": "Invalid credentials"}, status=401)
+        return self._route_api_auth_signin(request, body)
+
+    def _route_api_auth_signin(self, request, body):
+        token = uuid.uuid4().hex
+        self.sessions.add(token)
+        response = web.json_response({"ok": True, "user": body.get("username", "admin")})
+        response.set_cookie(SESSION_COOKIE, token, httponly=True)
+        return response
+
+    def _route_admin_super(self, request, body):
+        if not self._signed_in(request):
+            return web.json_response({"error": "Unauthorized"}, status=401)
+        return {"page": "super admin"}
+
+    def _route_api_admin_users(self, request, body):
+        if request.method == "GET":
+            return {"users": self.users}
+        user = {"id": uuid.uuid4().hex, "email": body.get("email"), "role": body.get("role", "user")}
+        self.users.append(user)
+        return web.json_response(user, status=201)
+
+    def _route_api_admin_analytics(self, request, body):
+        return {"users": len(self.users), "assessments": len(self.assessments), "requests": self.requests_served}
+
+    def _route_api_admin_activity_logs(self, request, body):
+        return {"logs": [{"action": "user.create", "email": u["email"]} for u in self.users]}
+
+    def _route_api_ai_assessment_start(self, request, body):
+        assessment_id = uuid.uuid4().hex
+        self.assessments[assessment_id] = []
+        return {"assessmentId": assessment_id, "question": "How many buildings are on the campus?"}
+
+    def _route_api_ai_assessment_answer(self, request, body):
+        assessment_id = body.get("assessmentId")
+        if assessment_id is not None and assessment_id not in self.assessments:
+            return web.json_response({"error": "Unknown assessment"}, status=404)
+        answers = self.assessments.setdefault(assessment_id, [])
+        answers.append(body.get("answer"))
+        return {"assessmentId": assessment_id, "answered": len(answers), "question": "Any existing cameras?"}
+
+    def _route_api_ai_assessment_generate(self, request, body):
+        assessment_id = body.get("assessmentId")
+        if assessment_id is not None and assessment_id not in self.assessments:
+            return web.json_response({"error": "Unknown assessment"}, status=404)
+        return {"assessmentId": assessment_id, "proposal": "Mock security proposal"}
+
+    def _route_orchestrate(self, request, body):
+        if request.headers.get("X-API-Key") != SUPER_AGENT_KEY:
+            return web.json_response({"error": "Invalid API key"}, status=403)
+        return {"user_id": body.get("user_id"), "result": f"Orchestrated {len(str(body.get('prompt', '')))} chars"}
+
+    def _route_health(self, request, body):
+        return {"status": "ok"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Next.js app and Super Agent")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--app-port", type=int, default=APP_PORT)
+    parser.add_argument("--agent-port", type=int, default=SUPER_AGENT_PORT)
+    parser.add_argument("--latency", help="latency spec for every route, e.g. const:0 or lognormal:50,0.5")
+    parser.add_argument("--error-rate", type=float, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit", type=float, help="requests/sec per client on every route")
+    parser.add_argument("--profile", help="JSON file of per-route settings")
+    args = parser.parse_args()
+
+    routes = None
+    if args.profile:
+        with open(args.profile, 'r', encoding='utf-8') as f:
+            routes = json.load(f)
+
+    target = MockTarget(routes, latency=args.latency, error_rate=args.error_rate, rate_limit=args.rate_limit)
+    try:
+        asyncio.run(target.serve(args.host, args.app_port, args.agent_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
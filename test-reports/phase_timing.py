@@ -0,0 +1,160 @@
+"""
+Phase Timing - where a request's time went: DNS, connect, TLS, send, server, transfer
+The sync client (http_pool's timed connections) and the async engine (aiohttp
+trace hooks) both produce result["phases"] = {phase: ms}; PhaseStats folds
+those into per-phase histograms plus a tail breakdown, so the report can say
+"p99 of /api/estimate is 90% server time"
+
+Phases a request skipped (DNS/connect/TLS on a reused connection) are absent.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from latency_histogram import LatencyHistogram
+
+PHASES = ("dns", "connect", "tls", "send", "server", "transfer")
+BANDS_PER_DOUBLING = 4  # Resolution of the tail breakdown (total latency bands)
+PHASE_SIGNIFICANT_FIGURES = 2  # Phase histograms are per endpoint - keep them small
+
+_local = threading.local()
+
+
+class PhaseRecorder:
+    """Accumulates phase durations for the request running on this thread"""
+
+    __slots__ = ("phases",)
+
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds * 1000
+
+    def setup_ms(self):
+        """Connection setup recorded so far (DNS + connect + TLS)"""
+        return sum(self.phases.get(phase, 0.0) for phase in ("dns", "connect", "tls"))
+
+
+@contextmanager
+def recording():
+    """Collect phase timings for requests made on this thread inside the block"""
+    recorder = PhaseRecorder()
+    previous = getattr(_local, "recorder", None)
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+
+
+def current_recorder():
+    """This thread's active PhaseRecorder, or None when nobody is timing"""
+    return getattr(_local, "recorder", None)
+
+
+def phases_from_marks(marks, done=None):
+    """Phase durations (ms) from aiohttp trace timestamps (perf_counter seconds)
+
+    aiohttp reports DNS but not the TLS handshake separately, so TLS time is
+    part of "connect" here.
+    """
+    done = done if done is not None else time.perf_counter()
+    phases = {}
+
+    def span(start, end):
+        if start in marks and end in marks:
+            return max(0.0, marks[end] - marks[start]) * 1000
+        return None
+
+    dns = span("dns_start", "dns_end")
+    if dns is not None:
+        phases["dns"] = dns
+    connect = span("connect_start", "connect_end")
+    if connect is not None:
+        phases["connect"] = max(0.0, connect - (dns or 0.0))
+
+    ready = max(marks.get("request_start", 0.0), marks.get("connect_end", 0.0))
+    sent = marks.get("sent")
+    headers = marks.get("headers")
+    if sent is not None and ready:
+        phases["send"] = max(0.0, sent - ready) * 1000
+    if headers is not None:
+        phases["server"] = max(0.0, headers - (sent or ready)) * 1000
+        phases["transfer"] = max(0.0, done - headers) * 1000
+    return phases
+
+
+class PhaseStats:
+    """Per-phase latency histograms, plus phase time summed per total-latency band
+
+    The bands let breakdown(99) attribute the slowest 1% of requests to their
+    phases without keeping per-request records.
+    """
+
+    def __init__(self):
+        self.histograms = {
+            phase: LatencyHistogram(significant_figures=PHASE_SIGNIFICANT_FIGURES) for phase in PHASES
+        }
+        self.total = LatencyHistogram(significant_figures=PHASE_SIGNIFICANT_FIGURES)
+        self.bands = {}  # band -> [requests, total ms, ms per phase...]
+
+    @property
+    def count(self):
+        return self.total.total_count
+
+    def record(self, total_ms, phases):
+        """Account for one request's total latency and its phase durations"""
+        self.total.record(total_ms)
+        row = self.bands.setdefault(self._band(total_ms), [0, 0.0] + [0.0] * len(PHASES))
+        row[0] += 1
+        row[1] += total_ms
+        for i, phase in enumerate(PHASES):
+            if phase in phases:
+                self.histograms[phase].record(phases[phase])
+                row[2 + i] += phases[phase]
+
+    def merge(self, other):
+        self.total.merge(other.total)
+        for phase in PHASES:
+            self.histograms[phase].merge(other.histograms[phase])
+        for band, theirs in other.bands.items():
+            row = self.bands.setdefault(band, [0, 0.0] + [0.0] * len(PHASES))
+            for i, value in enumerate(theirs):
+                row[i] += value
+        return self
+
+    def breakdown(self, percentile=None):
+        """{phase: share of time} over all requests, or only those at/above `percentile`
+
+        Whatever the phases don't explain (client overhead, scheduling lag) is "other".
+        """
+        floor = self._band(self.total.percentile(percentile)) if percentile else 0
+        rows = [row for band, row in self.bands.items() if band >= floor]
+        total = sum(row[1] for row in rows)
+        if not total:
+            return {}
+
+        shares = {phase: sum(row[2 + i] for row in rows) / total for i, phase in enumerate(PHASES)}
+        shares["other"] = max(0.0, 1 - sum(shares.values()))
+        return shares
+
+    def to_dict(self):
+        return {
+            "histograms": {phase: h.to_dict() for phase, h in self.histograms.items()},
+            "total": self.total.to_dict(),
+            "bands": {str(band): row for band, row in self.bands.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.histograms = {phase: LatencyHistogram.from_dict(h) for phase, h in data["histograms"].items()}
+        stats.total = LatencyHistogram.from_dict(data["total"])
+        stats.bands = {int(band): list(row) for band, row in data["bands"].items()}
+        return stats
+
+    def _band(self, ms):
+        return int(math.log2(max(0.0, ms) + 1) * BANDS_PER_DOUBLING)
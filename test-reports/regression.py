@@ -0,0 +1,87 @@
+"""
+Regression Detection - is this run's latency distribution worse than the baseline's?
+One-sided Mann-Whitney U test computed straight from two histograms' bucket
+counts (each bucket is a tie group, ranked by midrank), so no per-request
+samples are needed. A regression must be both statistically significant and
+large enough to matter - with thousands of requests, tiny shifts are
+"significant" too.
+"""
+
+import math
+import os
+
+ALPHA = float(os.getenv("TEST_AGENT_REGRESSION_ALPHA", "0.01"))
+MIN_CHANGE = float(os.getenv("TEST_AGENT_REGRESSION_MIN_CHANGE", "0.10"))  # +10% p50 or p99
+MIN_SAMPLES = 20
+
+
+def mann_whitney(baseline, current):
+    """(U, z, one-sided p) that `current` tends to be slower than `baseline`
+
+    Both histograms must share a layout; bucket index order is value order.
+    """
+    if (baseline.highest_us, baseline.significant_figures) != (current.highest_us, current.significant_figures):
+        raise ValueError("Cannot compare histograms with different layouts")
+    n1, n2 = baseline.total_count, current.total_count
+    if not n1 or not n2:
+        raise ValueError("Both histograms need samples")
+
+    rank = 0  # Ranks used so far
+    rank_sum = 0.0  # Sum of ranks held by `current`
+    ties = 0  # sum(t^3 - t) over tie groups
+    for a, b in zip(baseline.counts, current.counts):
+        group = a + b
+        if not group:
+            continue
+        midrank = rank + (group + 1) / 2
+        rank_sum += b * midrank
+        ties += group ** 3 - group
+        rank += group
+
+    n = n1 + n2
+    u = rank_sum - n2 * (n2 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return u, 0.0, 1.0  # Every sample in one bucket - no evidence either way
+    z = (u - mean - 0.5) / math.sqrt(variance)  # Continuity correction
+    return u, z, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(baseline, current, alpha=ALPHA, min_change=MIN_CHANGE):
+    """Verdict for one endpoint: regression / improvement / no change / insufficient data"""
+    before = baseline.summary()
+    after = current.summary()
+    result = {
+        "baseline_requests": before["count"],
+        "current_requests": after["count"],
+        "baseline_p50_ms": before["p50_ms"],
+        "current_p50_ms": after["p50_ms"],
+        "baseline_p99_ms": before["p99_ms"],
+        "current_p99_ms": after["p99_ms"],
+        "p50_change": _change(before["p50_ms"], after["p50_ms"]),
+        "p99_change": _change(before["p99_ms"], after["p99_ms"]),
+        "p_value": None,
+        "verdict": "insufficient data"
+    }
+    if before["count"] < MIN_SAMPLES or after["count"] < MIN_SAMPLES:
+        return result
+
+    _, _, slower = mann_whitney(baseline, current)
+    _, _, faster = mann_whitney(current, baseline)
+    result["p_value"] = slower
+    worst = max(result["p50_change"], result["p99_change"])
+    best = min(result["p50_change"], result["p99_change"])
+
+    if slower < alpha and worst >= min_change:
+        result["verdict"] = "regression"
+    elif faster < alpha and best <= -min_change:
+        result["verdict"] = "improvement"
+        result["p_value"] = faster
+    else:
+        result["verdict"] = "no change"
+    return result
+
+
+def _change(before, after):
+    return (after - before) / before if before else 0.0
@@ -0,0 +1,215 @@
+"""
+Resource Sampler - CPU, RSS, threads and open FDs of the target processes
+Reads /proc at a fixed interval while a stress test runs, so latency climbing
+in the time series can be matched to the server running out of CPU, memory or
+file descriptors. Targets are found by listening port (every process holding
+the socket, e.g. prefork workers, is summed) or given by PID. Linux only.
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+PROC = Path("/proc")
+
+# Targets to sample, e.g. "app=3000,agent=9500" / "app=1234" (names optional)
+SAMPLE_PORTS = os.getenv("TEST_AGENT_SAMPLE_PORTS", "")
+SAMPLE_PIDS = os.getenv("TEST_AGENT_SAMPLE_PIDS", "")
+SAMPLE_INTERVAL_S = float(os.getenv("TEST_AGENT_SAMPLE_INTERVAL_S", "1.0"))
+
+# Leak = steady growth (linear fit R^2) by at least this much within a window
+LEAK_MIN_R2 = 0.8
+LEAK_MIN_RSS_MB = float(os.getenv("TEST_AGENT_LEAK_MIN_RSS_MB", "20"))
+LEAK_MIN_FDS = int(os.getenv("TEST_AGENT_LEAK_MIN_FDS", "50"))
+LEAK_MIN_SAMPLES = 10
+
+Sample = namedtuple("Sample", "ts cpu_pct rss_mb threads fds")
+
+_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_MB = (os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096) / (1024 * 1024)
+
+
+def available():
+    return PROC.joinpath("self", "stat").exists()
+
+
+def _parse_targets(spec):
+    """'app=3000,9500' -> [("app", 3000), (None, 9500)]"""
+    targets = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.rpartition("=")
+        targets.append((name or None, int(value)))
+    return targets
+
+
+def pids_for_port(port):
+    """PIDs holding a listening TCP socket on `port` (IPv4 or IPv6)"""
+    inodes = set()
+    for table in ("tcp", "tcp6"):
+        try:
+            lines = PROC.joinpath("net", table).read_text().splitlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            if fields[3] == "0A" and int(fields[1].rsplit(":", 1)[1], 16) == port:  # 0A = LISTEN
+                inodes.add(f"socket:[{fields[9]}]")
+    if not inodes:
+        return []
+
+    pids = []
+    for entry in PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            if any(os.readlink(fd) in inodes for fd in entry.joinpath("fd").iterdir()):
+                pids.append(int(entry.name))
+        except OSError:
+            continue  # Exited, or not ours to inspect
+    return sorted(pids)
+
+
+def resolve_targets(ports=SAMPLE_PORTS, pids=SAMPLE_PIDS):
+    """name -> PIDs for every configured target that can be found"""
+    targets = {}
+    if not (ports or pids):
+        return targets
+    if not available():
+        print("⚠️ Target resource sampling needs /proc (Linux) - skipped")
+        return targets
+
+    for name, port in _parse_targets(ports):
+        found = pids_for_port(port)
+        if found:
+            targets[name or f":{port}"] = found
+        else:
+            print(f"⚠️ No process listening on port {port} to sample")
+    for name, pid in _parse_targets(pids):
+        if PROC.joinpath(str(pid)).exists():
+            targets[name or f"pid {pid}"] = [pid]
+        else:
+            print(f"⚠️ No process {pid} to sample")
+    return targets
+
+
+def read_process(pid):
+    """(cpu ticks, rss MB, threads, open fds) for one process, None once it's gone"""
+    try:
+        stat = PROC.joinpath(str(pid), "stat").read_text()
+        fields = stat[stat.rindex(")") + 2:].split()  # After "pid (comm) "
+        rss_pages = int(PROC.joinpath(str(pid), "statm").read_text().split()[1])
+        fds = len(os.listdir(PROC.joinpath(str(pid), "fd")))
+    except (OSError, ValueError):
+        return None
+    # fields[11] utime, [12] stime, [17] num_threads (stat fields 14, 15, 20)
+    return int(fields[11]) + int(fields[12]), rss_pages * _PAGE_MB, int(fields[17]), fds
+
+
+class ResourceSampler:
+    """Samples each target every `interval_s` on a background thread"""
+
+    def __init__(self, targets, interval_s=SAMPLE_INTERVAL_S):
+        self.targets = targets  # name -> [pid, ...]
+        self.interval_s = interval_s
+        self.samples = {name: [] for name in targets}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and return name -> [Sample, ...]"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.samples
+
+    def _read(self, pids):
+        totals = [read_process(pid) for pid in pids]
+        totals = [t for t in totals if t is not None]
+        if not totals:
+            return None
+        return tuple(sum(values) for values in zip(*totals))
+
+    def _loop(self):
+        last = {name: (time.time(), self._read(pids)) for name, pids in self.targets.items()}
+        while True:
+            stopped = self._stop.wait(self.interval_s)  # One last sample on stop - short tests get one too
+            for name, pids in self.targets.items():
+                now, current = time.time(), self._read(pids)
+                then, previous = last[name]
+                if current is None:
+                    continue  # Target went away - keep whatever was sampled
+                cpu_pct = None
+                if previous is not None and now > then:
+                    cpu_pct = (current[0] - previous[0]) / _TICKS / (now - then) * 100
+                self.samples[name].append(Sample(now, cpu_pct, current[1], current[2], current[3]))
+                last[name] = (now, current)
+            if stopped:
+                return
+
+
+def summarize(samples):
+    """CPU avg/max, RSS start/end/max, threads max, FDs start/end over a test"""
+    cpu = [s.cpu_pct for s in samples if s.cpu_pct is not None]
+    return {
+        "samples": len(samples),
+        "cpu_avg_pct": sum(cpu) / len(cpu) if cpu else 0.0,
+        "cpu_max_pct": max(cpu or [0.0]),
+        "rss_start_mb": samples[0].rss_mb if samples else 0.0,
+        "rss_end_mb": samples[-1].rss_mb if samples else 0.0,
+        "rss_max_mb": max([s.rss_mb for s in samples] or [0.0]),
+        "threads_max": max([s.threads for s in samples] or [0]),
+        "fds_start": samples[0].fds if samples else 0,
+        "fds_end": samples[-1].fds if samples else 0
+    }
+
+
+def _trend(points):
+    """(slope per second, R^2) of a least-squares line through (t, value) points"""
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    s_tt = sum((t - mean_t) ** 2 for t, _ in points)
+    s_vv = sum((v - mean_v) ** 2 for _, v in points)
+    s_tv = sum((t - mean_t) * (v - mean_v) for t, v in points)
+    if not s_tt or not s_vv:
+        return 0.0, 0.0
+    return s_tv / s_tt, s_tv * s_tv / (s_tt * s_vv)
+
+
+def find_leaks(samples, windows):
+    """Steady RSS / FD growth within any (start_ts, end_ts, label) window
+
+    Soak stages are the natural windows - load is constant, so memory or
+    descriptors should plateau; a good straight-line fit that keeps climbing
+    by more than the thresholds is reported.
+    """
+    leaks = []
+    for start, end, label in windows:
+        window = [s for s in samples if start <= s.ts <= end]
+        if len(window) < LEAK_MIN_SAMPLES:
+            continue
+        span = window[-1].ts - window[0].ts
+        for field, unit, minimum in (("rss_mb", "MB", LEAK_MIN_RSS_MB), ("fds", "FDs", LEAK_MIN_FDS)):
+            slope, r2 = _trend([(s.ts, getattr(s, field)) for s in window])
+            growth = slope * span
+            if slope > 0 and r2 >= LEAK_MIN_R2 and growth >= minimum:
+                what = "RSS" if field == "rss_mb" else "Open FDs"
+                leaks.append(f"{what} +{growth:.0f} {unit} over {span:.0f}s {label} (R²={r2:.2f})")
+    return leaks
+
+
+def window_stats(samples, start_ts, end_ts):
+    """(avg CPU %, last RSS MB) of samples in [start_ts, end_ts), None if none fall in it"""
+    window = [s for s in samples if start_ts <= s.ts < end_ts]
+    if not window:
+        return None
+    cpu = [s.cpu_pct for s in window if s.cpu_pct is not None]
+    return (sum(cpu) / len(cpu) if cpu else 0.0), window[-1].rss_mb
@@ -0,0 +1,229 @@
+"""
+Result Sink - streams per-request records to an append-only JSONL log
+Keeps only counters, latency histograms (total, TTFB and streaming), failure
+samples and a small reservoir of successes in memory, so a 1M-request soak
+stays bounded
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+from latency_histogram import LatencyHistogram
+from phase_timing import PhaseStats
+from time_series import TimeSeries
+
+RUNS_DIR = Path(__file__).parent / "runs"
+RESERVOIR_SIZE = int(os.getenv("TEST_AGENT_RESERVOIR_SIZE", "20"))
+MAX_FAILURE_SAMPLES = int(os.getenv("TEST_AGENT_MAX_FAILURE_SAMPLES", "100"))
+
+
+def log_path_for(run_id, test_name, suffix=""):
+    """runs/{run_id}/{test-name-slug}{suffix}.jsonl"""
+    slug = re.sub(r"[^a-z0-9]+", "-", test_name.lower()).strip("-")
+    return RUNS_DIR / str(run_id) / f"{slug}{suffix}.jsonl"
+
+
+class ResultSink:
+    """Aggregates request results as they complete and spills the raw records to disk"""
+
+    def __init__(self, log_path=None, reservoir_size=RESERVOIR_SIZE, max_failures=MAX_FAILURE_SAMPLES,
+                 time_series=False):
+        self.reservoir_size = reservoir_size
+        self.max_failures = max_failures
+        self.histogram = LatencyHistogram()
+        self.ttfb = LatencyHistogram()
+        self.ttft = LatencyHistogram()  # Streamed responses only
+        self.chunk_gaps = LatencyHistogram()
+        self.phases = PhaseStats()  # DNS / connect / TLS / send / server / transfer
+        self.series = TimeSeries() if time_series else None  # Per-second view for load profiles
+        self.streams = 0
+        self.tokens = 0
+        self._rates = {"tokens_per_sec": [0.0, 0], "bytes_per_sec": [0.0, 0]}  # sum, count
+        self.requests = 0
+        self.successes = 0
+        self.status_codes = {}
+        self.failure_samples = []
+        self.success_samples = []
+        self.log_files = []
+        self.halted = None  # Why the schedule stopped early and how much of it was never sent
+        self._log = None
+        self._lock = threading.Lock()  # Thread engine delivers from many workers
+
+        if log_path is not None:
+            log_path = Path(log_path)
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(log_path, "a", encoding="utf-8")
+            self.log_files.append(str(log_path))
+
+    def add(self, result):
+        """Record one completed request"""
+        with self._lock:
+            self.requests += 1
+            status = result.get("status_code")
+            key = str(status) if status is not None else "error"
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+
+            if result.get("latency_ms") is not None:
+                self.histogram.record(result["latency_ms"])
+            if result.get("ttfb_ms") is not None:
+                self.ttfb.record(result["ttfb_ms"])
+            if result.get("phases") and result.get("latency_ms") is not None:
+                self.phases.record(result["latency_ms"], result["phases"])
+            if "chunks" in result:
+                self._add_stream(result)
+            if self.series is not None:
+                self.series.add(result)
+
+            if result.get("success", False):
+                self.successes += 1
+                # Reservoir sampling (Algorithm R) - uniform sample of all successes
+                if len(self.success_samples) < self.reservoir_size:
+                    self.success_samples.append(result)
+                else:
+                    slot = random.randrange(self.successes)
+                    if slot < self.reservoir_size:
+                        self.success_samples[slot] = result
+            elif len(self.failure_samples) < self.max_failures:
+                self.failure_samples.append(result)
+
+            if self._log is not None:
+                record = {k: v for k, v in result.items() if k not in ("data", "chunk_gaps_ms")}
+                record["ts"] = round(time.time(), 3)
+                self._log.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def _add_stream(self, result):
+        self.streams += 1
+        self.tokens += result.get("tokens", 0)
+        if result.get("ttft_ms") is not None:
+            self.ttft.record(result["ttft_ms"])
+        for gap in result.get("chunk_gaps_ms", ()):
+            self.chunk_gaps.record(gap)
+        for field, rate in self._rates.items():
+            if result.get(field) is not None:
+                rate[0] += result[field]
+                rate[1] += 1
+
+    def halt(self, record):
+        """Note that the schedule was cut short (target_health.halted()) - one record, not a failure per unsent request"""
+        with self._lock:
+            self._merge_halt(record)
+
+    def _merge_halt(self, record):
+        if self.halted is None:
+            self.halted = dict(record)
+            return
+        for field in ("unsent", "remaining_s"):  # Shards of one test each stop their own share
+            if record.get(field) is not None:
+                self.halted[field] = (self.halted.get(field) or 0) + record[field]
+
+    @property
+    def failures(self):
+        return self.requests - self.successes
+
+    def close(self):
+        """Flush and close the on-disk log"""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def to_dict(self):
+        """JSON-safe aggregate (what a distributed worker ships back)"""
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "status_codes": self.status_codes,
+            "histogram": self.histogram.to_dict(),
+            "ttfb": self.ttfb.to_dict(),
+            "ttft": self.ttft.to_dict(),
+            "chunk_gaps": self.chunk_gaps.to_dict(),
+            "phases": self.phases.to_dict(),
+            "series": self.series.to_dict() if self.series is not None else None,
+            "streams": self.streams,
+            "tokens": self.tokens,
+            "rates": self._rates,
+            "failure_samples": self.failure_samples,
+            "success_samples": self.success_samples,
+            "log_files": self.log_files,
+            "halted": self.halted
+        }
+
+    def merge(self, data):
+        """Fold another sink's to_dict() into this one"""
+        with self._lock:
+            theirs = data["successes"]
+            ours = self.successes
+            self.requests += data["requests"]
+            self.successes += theirs
+            for status, count in data["status_codes"].items():
+                self.status_codes[status] = self.status_codes.get(status, 0) + count
+            self.histogram.merge(LatencyHistogram.from_dict(data["histogram"]))
+            self.ttfb.merge(LatencyHistogram.from_dict(data["ttfb"]))
+            self.ttft.merge(LatencyHistogram.from_dict(data["ttft"]))
+            self.chunk_gaps.merge(LatencyHistogram.from_dict(data["chunk_gaps"]))
+            self.phases.merge(PhaseStats.from_dict(data["phases"]))
+            if data.get("series") and self.series is not None:
+                self.series.merge(data["series"])
+            self.streams += data["streams"]
+            self.tokens += data["tokens"]
+            for field, (total, count) in data["rates"].items():
+                self._rates[field][0] += total
+                self._rates[field][1] += count
+
+            room = self.max_failures - len(self.failure_samples)
+            self.failure_samples.extend(data["failure_samples"][:max(0, room)])
+            self.success_samples = self._merge_reservoirs(
+                self.success_samples, ours, list(data["success_samples"]), theirs
+            )
+            self.log_files.extend(data["log_files"])
+            if data.get("halted"):
+                self._merge_halt(data["halted"])
+
+    def _merge_reservoirs(self, mine, mine_population, theirs, their_population):
+        """Draw a combined sample, picking each slot in proportion to the populations left"""
+        mine = list(mine)
+        merged = []
+        while len(merged) < self.reservoir_size and (mine or theirs):
+            total = mine_population + their_population
+            take_mine = not theirs or (bool(mine) and random.random() * total < mine_population)
+            source = mine if take_mine else theirs
+            merged.append(source.pop(random.randrange(len(source))))
+            # Without replacement from the populations themselves - each pick stands for one success
+            if take_mine:
+                mine_population -= 1
+            else:
+                their_population -= 1
+        return merged
+
+    def streaming(self):
+        """TTFB for every request, plus TTFT / chunk gaps / throughput for streamed ones"""
+        streaming = {"ttfb": self.ttfb.summary() if self.ttfb.total_count else None}
+        if self.streams:
+            streaming.update({
+                "streams": self.streams,
+                "ttft": self.ttft.summary(),
+                "chunk_gap": self.chunk_gaps.summary(),
+                "tokens": self.tokens
+            })
+            for field, (total, count) in self._rates.items():
+                streaming[field] = total / count if count else None
+        return streaming
+
+    def summary(self):
+        """Aggregate view stored in the test result"""
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "status_codes": self.status_codes,
+            "streaming": self.streaming(),
+            "log_files": self.log_files,
+            "failure_samples": self.failure_samples,
+            "success_samples": self.success_samples,
+            "halted": self.halted
+        }
@@ -0,0 +1,174 @@
+"""
+Run History - every run's per-endpoint latency histograms and throughput
+Persistent SQLite store under test-reports/ so a run can be compared with the
+previous one or with a pinned baseline (a tagged run, e.g. "release-1.4").
+
+    python run_history.py list
+    python run_history.py tag latest release-1.4
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from latency_histogram import LatencyHistogram
+
+HISTORY_FILE = Path(__file__).parent / "run-history.sqlite3"
+
+# Baseline to compare against: a tag or run ID (default: the previous run of the same tests)
+BASELINE = os.getenv("TEST_AGENT_BASELINE", "")
+FULL_RUN = "all"  # Selection of a plain run of every suite
+
+
+class RunHistory:
+    """run_id -> per-endpoint histograms and per-test throughput"""
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript(
+            """CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY,
+                recorded TEXT NOT NULL,
+                tag TEXT UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS endpoints (
+                run_id INTEGER NOT NULL,
+                endpoint TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                histogram TEXT NOT NULL,
+                PRIMARY KEY (run_id, endpoint)
+            );
+            CREATE TABLE IF NOT EXISTS tests (
+                run_id INTEGER NOT NULL,
+                test TEXT NOT NULL,
+                endpoint TEXT,
+                requests INTEGER NOT NULL,
+                duration_ms REAL NOT NULL,
+                throughput_rps REAL NOT NULL,
+                PRIMARY KEY (run_id, test)
+            );"""
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(runs)")}
+        if "selection" not in columns:  # Stores from before runs were filtered were all full runs
+            self._db.execute(f"ALTER TABLE runs ADD COLUMN selection TEXT NOT NULL DEFAULT '{FULL_RUN}'")
+        self._db.commit()
+
+    def record(self, run_id, endpoint_histograms, tests, selection=FULL_RUN):
+        """Store one run (replaces an earlier record of the same run ID) -> False if nothing was measured
+
+        `tests` are stress test results - requests / duration is their throughput.
+        `selection` names what ran ("all", "tests:<names>", "fuzz", ...); only runs
+        of the same selection are compared.
+        """
+        if not any(histogram.total_count for histogram in endpoint_histograms.values()):
+            return False  # e.g. monitor --once with nothing to retest - never a useful baseline
+        with self._lock:
+            self._db.execute("DELETE FROM endpoints WHERE run_id = ?", (run_id,))
+            self._db.execute("DELETE FROM tests WHERE run_id = ?", (run_id,))
+            self._db.execute(
+                "INSERT OR IGNORE INTO runs (run_id, recorded, selection) VALUES (?, ?, ?)",
+                (run_id, datetime.now().isoformat(), selection)
+            )
+            self._db.execute("UPDATE runs SET selection = ? WHERE run_id = ?", (selection, run_id))
+            self._db.executemany(
+                "INSERT INTO endpoints VALUES (?, ?, ?, ?)",
+                [
+                    (run_id, endpoint, histogram.total_count, json.dumps(histogram.to_dict()))
+                    for endpoint, histogram in endpoint_histograms.items() if histogram.total_count
+                ]
+            )
+            self._db.executemany(
+                "INSERT INTO tests VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, test["name"], test.get("endpoint"), test["requests"], test["duration_ms"],
+                     test["requests"] / (test["duration_ms"] / 1000))
+                    for test in tests if test.get("requests") and test.get("duration_ms")
+                ]
+            )
+            self._db.commit()
+        return True
+
+    def baseline(self, run_id, selection=FULL_RUN, pinned=BASELINE):
+        """Run ID to compare `run_id` with: the pinned tag / run ID, else the last earlier
+        run of the same selection that measured something"""
+        with self._lock:
+            if pinned:
+                row = self._db.execute(
+                    "SELECT run_id FROM runs WHERE tag = ? OR CAST(run_id AS TEXT) = ?", (pinned, pinned)
+                ).fetchone()
+                if row is None:
+                    raise ValueError(f"No run tagged or numbered '{pinned}' in {self.path.name}")
+            else:
+                row = self._db.execute(
+                    """SELECT MAX(r.run_id) FROM runs r
+                       WHERE r.run_id < ? AND r.selection = ?
+                         AND EXISTS (SELECT 1 FROM endpoints e WHERE e.run_id = r.run_id)""",
+                    (run_id, selection)
+                ).fetchone()
+        return row[0] if row else None
+
+    def histograms(self, run_id):
+        """endpoint -> LatencyHistogram for a stored run"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT endpoint, histogram FROM endpoints WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {endpoint: LatencyHistogram.from_dict(json.loads(data)) for endpoint, data in rows}
+
+    def throughput(self, run_id):
+        """test name -> achieved requests/sec for a stored run"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT test, throughput_rps FROM tests WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def tag(self, run_id, tag):
+        """Pin a run under a name (moves the tag if another run had it)"""
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is None:
+                raise ValueError(f"No run {run_id} in {self.path.name}")
+            self._db.execute("UPDATE runs SET tag = NULL WHERE tag = ?", (tag,))
+            self._db.execute("UPDATE runs SET tag = ? WHERE run_id = ?", (tag, run_id))
+            self._db.commit()
+
+    def runs(self, limit=20):
+        """Most recent runs first: (run_id, recorded, tag, selection, endpoints, requests)"""
+        with self._lock:
+            return self._db.execute(
+                """SELECT r.run_id, r.recorded, r.tag, r.selection, COUNT(e.endpoint), COALESCE(SUM(e.requests), 0)
+                   FROM runs r LEFT JOIN endpoints e ON e.run_id = r.run_id
+                   GROUP BY r.run_id ORDER BY r.run_id DESC LIMIT ?""",
+                (limit,)
+            ).fetchall()
+
+    def latest(self):
+        with self._lock:
+            return self._db.execute("SELECT MAX(run_id) FROM runs").fetchone()[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and tag stored test runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="show recent runs")
+    listing.add_argument("--limit", type=int, default=20)
+    tagging = commands.add_parser("tag", help="pin a run as a baseline (TEST_AGENT_BASELINE=<tag>)")
+    tagging.add_argument("run_id", help="run ID or 'latest'")
+    tagging.add_argument("tag")
+    args = parser.parse_args()
+
+    history = RunHistory()
+    if args.command == "list":
+        for run_id, recorded, tag, selection, endpoints, requests in history.runs(args.limit):
+            print(f"{run_id}  {recorded[:19]}  {endpoints:3d} endpoints  {requests:8d} requests  "
+                  f"{selection[:40]:<40}  {tag or ''}")
+    else:
+        run_id = history.latest() if args.run_id == "latest" else int(args.run_id)
+        history.tag(run_id, args.tag)
+        print(f"🏷️  Run {run_id} tagged '{args.tag}'")
@@ -0,0 +1,129 @@
+"""
+Test Scheduler - runs tests as a dependency graph instead of suite by suite
+Independent tests run in parallel; tests can declare ordering with "after";
+each target host has its own concurrency budget, and load-generating
+(exclusive) tests take a host's whole budget so they can't skew the
+latency-sensitive checks running against it
+"""
+
+import concurrent.futures
+import os
+import threading
+
+DEFAULT_TARGET_BUDGET = int(os.getenv("TEST_AGENT_TARGET_BUDGET", "4"))
+
+
+class TestScheduler:
+    """Dependency-graph executor with per-target concurrency budgets"""
+
+    def __init__(self, budgets=None, default_budget=DEFAULT_TARGET_BUDGET):
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+        self._nodes = {}  # id -> node, in declaration order
+        self._cond = threading.Condition()
+
+    def add(self, node_id, fn, target, after=(), exclusive=False):
+        """Register a test: fn() runs once every node in `after` has finished"""
+        if node_id in self._nodes:
+            raise ValueError(f"Duplicate test in schedule: {node_id}")
+        self._nodes[node_id] = {
+            "id": node_id,
+            "fn": fn,
+            "target": target,
+            "after": list(after),
+            "exclusive": exclusive
+        }
+
+    def run(self):
+        """Run every node -> {node_id: return value}"""
+        self._validate()
+
+        done = set()
+        running = set()
+        in_use = {}  # target -> slots held
+        results = {}
+        errors = []
+        max_workers = sum(self._budget(t) for t in {n["target"] for n in self._nodes.values()})
+
+        def finish(node, future):
+            with self._cond:
+                in_use[node["target"]] -= self._budget(node["target"]) if node["exclusive"] else 1
+                running.discard(node["id"])
+                done.add(node["id"])
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                else:
+                    results[node["id"]] = future.result()
+                self._cond.notify_all()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or 1) as executor:
+            with self._cond:
+                while len(done) < len(self._nodes):
+                    admitted = self._admissible(done, running, in_use)
+                    for node in admitted:
+                        slots = self._budget(node["target"]) if node["exclusive"] else 1
+                        in_use[node["target"]] = in_use.get(node["target"], 0) + slots
+                        running.add(node["id"])
+                        future = executor.submit(node["fn"])
+                        # Runs finish() right here if the test already finished - look again before waiting
+                        future.add_done_callback(lambda f, node=node: finish(node, f))
+                    if not admitted and len(done) < len(self._nodes):
+                        self._cond.wait()
+
+        if errors:
+            raise errors[0]
+        return results
+
+    def _budget(self, target):
+        return self.budgets.get(target, self.default_budget)
+
+    def _admissible(self, done, running, in_use):
+        """Ready nodes that fit their target's budget, in declaration order"""
+        admitted = []
+        held = dict(in_use)
+        draining = set()  # targets with an exclusive test waiting - let them empty out
+        for node in self._nodes.values():
+            if node["id"] in done or node["id"] in running:
+                continue
+            if any(dep not in done for dep in node["after"]):
+                continue
+
+            target = node["target"]
+            if target in draining:
+                continue
+            budget = self._budget(target)
+            used = held.get(target, 0)
+            if node["exclusive"]:
+                if used:
+                    draining.add(target)
+                    continue
+                held[target] = budget
+            else:
+                if used >= budget:
+                    continue
+                held[target] = used + 1
+            admitted.append(node)
+        return admitted
+
+    def _validate(self):
+        """Reject unknown dependencies and cycles before anything runs"""
+        for node in self._nodes.values():
+            for dep in node["after"]:
+                if dep not in self._nodes:
+                    raise ValueError(f"{node['id']} depends on unknown test: {dep}")
+
+        visiting, visited = set(), set()
+
+        def visit(node_id):
+            if node_id in visited:
+                return
+            if node_id in visiting:
+                raise ValueError(f"Dependency cycle through: {node_id}")
+            visiting.add(node_id)
+            for dep in self._nodes[node_id]["after"]:
+                visit(dep)
+            visiting.discard(node_id)
+            visited.add(node_id)
+
+        for node_id in self._nodes:
+            visit(node_id)
@@ -23,7 +23,7 @@ if %ERRORLEVEL% NEQ 0 (
 )
 
 echo [1/4] Installing Python dependencies...
-pip install openai requests
+pip install openai requests aiohttp
 if %ERRORLEVEL% NEQ 0 (
     echo ERROR: Failed to install Python packages
     pause
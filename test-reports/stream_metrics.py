@@ -0,0 +1,121 @@
+"""
+Stream Metrics - bounded body reads with time-to-first-byte / first-token timing
+Keeps only the first few hundred bytes of a response and discards the rest as
+it arrives, while timing headers, the first token, the gaps between chunks and
+token/byte throughput. SSE bodies count one token per "data:" event.
+
+Shared by TestAgent._make_request (requests, stream=True) and the async engine
+"""
+
+import os
+import time
+
+MAX_BODY_BYTES = int(os.getenv("TEST_AGENT_MAX_BODY_BYTES", "500"))  # What result["data"] keeps
+READ_CHUNK_BYTES = 8192
+MAX_GAPS = 1024  # Per request - longer streams still count toward max_gap_ms
+
+_PREFIX_BYTES = 16  # Enough of a line to tell "data: [DONE]" from a token
+
+# Keys that make a test dict a load test (stress kinds, capacity search, virtual users)
+LOAD_KEYS = ("concurrent", "rate_per_sec", "rapid_fire", "stages", "replay", "start_rps", "virtual_users")
+
+
+def drains(test, sse=False):
+    """Whether to read a response body to the end ("drain" on the test overrides)
+
+    Load tests and streams do: the connection stays reusable and latency covers
+    the whole transfer. Single requests stop once the kept bytes are in - the
+    rest is never downloaded and the connection is closed.
+    """
+    if "drain" in test:
+        return test["drain"]
+    return sse or test.get("stream", False) or any(key in test for key in LOAD_KEYS)
+
+
+class StreamTimer:
+    """Fed each body chunk as it arrives; produces the timing fields of a result"""
+
+    def __init__(self, start, keep_bytes=MAX_BODY_BYTES, sse=False, timed=False):
+        self.start = start
+        self.keep_bytes = keep_bytes
+        self.sse = sse
+        self.timed = timed or sse  # Record per-chunk timing (streamed AI responses)
+        self.kept = bytearray()
+        self.bytes = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.headers_at = None
+        self.first_token_at = None
+        self.last_chunk_at = None
+        self.gaps_ms = []
+        self.max_gap_ms = 0.0
+        self._line = b""  # Start of the SSE line still being received
+
+    def headers(self, now=None):
+        """Response status line and headers arrived"""
+        self.headers_at = now if now is not None else time.perf_counter()
+
+    @property
+    def satisfied(self):
+        """True once everything we keep has been read"""
+        return len(self.kept) >= self.keep_bytes
+
+    def feed(self, chunk, now=None):
+        """Account for one body chunk"""
+        if not chunk:
+            return
+        now = now if now is not None else time.perf_counter()
+        if len(self.kept) < self.keep_bytes:
+            self.kept += chunk[:self.keep_bytes - len(self.kept)]
+        self.bytes += len(chunk)
+        self.chunks += 1
+
+        if self.timed:
+            if self.last_chunk_at is not None:
+                gap = (now - self.last_chunk_at) * 1000
+                self.max_gap_ms = max(self.max_gap_ms, gap)
+                if len(self.gaps_ms) < MAX_GAPS:
+                    self.gaps_ms.append(gap)
+            if self.sse:
+                self._count_events(chunk, now)
+            elif self.first_token_at is None:
+                self.first_token_at = now
+        self.last_chunk_at = now
+
+    def _count_events(self, chunk, now):
+        lines = chunk.split(b"\n")
+        lines[0] = self._line + lines[0]
+        for line in lines[:-1]:
+            if line.startswith(b"data:") and line[5:].strip() != b"[DONE]":
+                self.tokens += 1
+                if self.first_token_at is None:
+                    self.first_token_at = now
+        self._line = lines[-1][:_PREFIX_BYTES]
+
+    def text(self, encoding=None):
+        """Kept bytes decoded for result["data"]"""
+        return bytes(self.kept).decode(encoding or "utf-8", errors="replace")
+
+    def fields(self):
+        """Timing fields merged into the request result"""
+        ms = lambda t: (t - self.start) * 1000 if t is not None else None
+        fields = {"ttfb_ms": ms(self.headers_at), "bytes": self.bytes}
+        if not self.timed:
+            return fields
+
+        fields["ttft_ms"] = ms(self.first_token_at)
+        fields["chunks"] = self.chunks
+        fields["chunk_gaps_ms"] = self.gaps_ms
+        fields["max_gap_ms"] = self.max_gap_ms
+        if self.headers_at is not None and self.last_chunk_at is not None and self.last_chunk_at > self.headers_at:
+            fields["bytes_per_sec"] = self.bytes / (self.last_chunk_at - self.headers_at)
+        if self.sse:
+            fields["tokens"] = self.tokens
+            span = (self.last_chunk_at or 0) - (self.first_token_at or 0)
+            if self.tokens > 1 and span > 0:
+                fields["tokens_per_sec"] = (self.tokens - 1) / span  # Decode rate after the first token
+        return fields
+
+
+def is_event_stream(content_type):
+    return (content_type or "").split(";")[0].strip().lower() == "text/event-stream"
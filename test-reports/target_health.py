@@ -0,0 +1,219 @@
+"""
+Target Health - preflight probes, request deadlines and a per-host circuit breaker
+A target that is down should cost the run a few seconds, not a 30s timeout per
+request: every host is probed once before the first test, requests get a
+timeout cut short by their test's (and the run's) deadline, and after a few
+consecutive connection failures a host's breaker opens so everything aimed at
+it fails instantly - "skipped: target unavailable" - until a trial request
+gets through again.
+"""
+
+import concurrent.futures
+import http.client
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import load_profile
+
+HEALTH_PATH = os.getenv("TEST_AGENT_HEALTH_PATH", "/health")
+HEALTH_TIMEOUT_S = float(os.getenv("TEST_AGENT_HEALTH_TIMEOUT_S", "3"))
+CONNECT_TIMEOUT_S = float(os.getenv("TEST_AGENT_CONNECT_TIMEOUT_S", "5"))
+REQUEST_TIMEOUT_S = float(os.getenv("TEST_AGENT_REQUEST_TIMEOUT_S", "30"))
+# Allowance on top of a test's scheduled load (profile stages, rate timetable); 0 = no limit; "deadline_s" per test
+TEST_DEADLINE_S = float(os.getenv("TEST_AGENT_TEST_DEADLINE_S", "300"))
+RUN_DEADLINE_S = float(os.getenv("TEST_AGENT_RUN_DEADLINE_S", "0"))  # 0 = no limit
+
+# Consecutive requests with no HTTP response (refused, reset, timed out) that open a host's breaker
+BREAKER_FAILURES = int(os.getenv("TEST_AGENT_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_S = float(os.getenv("TEST_AGENT_BREAKER_COOLDOWN_S", "30"))  # Open this long, then one trial
+
+UNAVAILABLE = "skipped: target unavailable"
+DEADLINE_EXCEEDED = "skipped: deadline exceeded"
+
+
+def base_url(endpoint):
+    """scheme://host:port of an endpoint - what health, breakers and pools are keyed on"""
+    parts = urlsplit(endpoint)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def deadline_after(seconds, cap=None):
+    """Epoch time `seconds` from now (no limit for 0/None), never later than `cap`"""
+    deadline = time.time() + seconds if seconds else None
+    if cap is None:
+        return deadline
+    return cap if deadline is None else min(deadline, cap)
+
+
+def planned_s(test):
+    """Seconds a test's load is scheduled to run for - None when only running it can tell (a replay)"""
+    if "replay" in test:
+        return None  # The capture's span isn't known until the log has been read
+    if "stages" in test:
+        return load_profile.duration(test["stages"])
+    if "rapid_fire" in test:
+        return test["rapid_fire"] / test.get("rate_per_sec", 100)
+    if "rate_per_sec" in test:
+        return test.get("duration_s", 0)
+    return 0
+
+
+def deadline_for(test, default=None):
+    """Seconds a test may take: its own "deadline_s", else `default` (TEST_DEADLINE_S) past its
+    planned schedule - so an hour-long soak isn't cut off at 5 minutes. 0 = no limit."""
+    if "deadline_s" in test:
+        return test["deadline_s"]
+    default = TEST_DEADLINE_S if default is None else default
+    planned = planned_s(test)
+    if not default or planned is None:
+        return 0  # Replays are bounded by the run deadline only
+    return planned + default
+
+
+def request_timeout(test, default=REQUEST_TIMEOUT_S):
+    """(connect, total) timeout in seconds for one request - None once the test's deadline_at has passed"""
+    deadline = test.get("deadline_at")
+    if deadline is None:
+        return min(CONNECT_TIMEOUT_S, default), default
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        return None
+    return min(CONNECT_TIMEOUT_S, default, remaining), min(default, remaining)
+
+
+def skipped(reason):
+    """Result record for a request that was never sent (no latency - it's kept out of histograms)"""
+    return {"success": False, "skipped": True, "error": reason, "latency_ms": None}
+
+
+def halt_reason(test, breaker=None, send_in_s=0.0):
+    """Why a timetable should stop sending `test` now, or None
+
+    Its next send (`send_in_s` from now) would land past the deadline, or its
+    host's breaker is open - checked before sleeping, so a dead schedule isn't waited out.
+    """
+    deadline = test.get("deadline_at")
+    if deadline is not None and time.time() + max(0.0, send_in_s) >= deadline:
+        return DEADLINE_EXCEEDED
+    if breaker is not None and not breaker.available(base_url(test["endpoint"])):
+        return UNAVAILABLE
+    return None
+
+
+def halted(reason, unsent=None, remaining_s=None):
+    """Record of a schedule cut short: the requests (if known) and seconds of it never sent"""
+    return {"reason": reason, "unsent": unsent, "remaining_s": remaining_s}
+
+
+def probe(target, path=HEALTH_PATH, timeout_s=HEALTH_TIMEOUT_S):
+    """GET target + path; any HTTP response at all (even a 404) means the host is up
+
+    Plain http.client, so the probe doesn't wait on importing requests.
+    """
+    parts = urlsplit(target)
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    start = time.perf_counter()
+    connection = connection_class(parts.netloc, timeout=timeout_s)
+    try:
+        connection.request("GET", path)
+        status = connection.getresponse().status
+    except (OSError, http.client.HTTPException) as e:
+        return {"up": False, "error": str(e) or type(e).__name__, "latency_ms": (time.perf_counter() - start) * 1000}
+    finally:
+        connection.close()
+    return {"up": True, "status_code": status, "latency_ms": (time.perf_counter() - start) * 1000}
+
+
+def preflight(targets):
+    """Probe every target at once - target -> probe result"""
+    targets = sorted(set(targets))
+    if not targets:
+        return {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        return dict(zip(targets, executor.map(probe, targets)))
+
+
+class CircuitBreaker:
+    """Per-host breaker: closed -> open after consecutive failures -> one trial after a cooldown
+
+    Checking a closed host and recording a success on a healthy one are
+    lock-free, so the breaker stays off the request hot path.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown_s=BREAKER_COOLDOWN_S):
+        self.failures = failures
+        self.cooldown_s = cooldown_s
+        self.trips = {}  # target -> times opened
+        self.rejected = {}  # target -> requests failed fast while open
+        self.reasons = {}  # target -> last failure
+        self._consecutive = {}  # target -> consecutive failures
+        self._open_until = {}  # target -> monotonic time the next trial may go
+        self._trials = set()  # Targets with a trial request in flight
+        self._lock = threading.Lock()
+
+    def available(self, target):
+        """Worth starting a test against `target` - closed, or due a trial"""
+        until = self._open_until.get(target)
+        return until is None or time.monotonic() >= until
+
+    def allow(self, target):
+        """May a request go to `target` now (claims the trial slot when one is due)"""
+        if target not in self._open_until:
+            return True
+        with self._lock:
+            until = self._open_until.get(target)
+            if until is None:
+                return True
+            if target not in self._trials and time.monotonic() >= until:
+                self._trials.add(target)
+                return True
+            self.rejected[target] = self.rejected.get(target, 0) + 1
+            return False
+
+    def record(self, target, result):
+        """Count a request's outcome - only "no HTTP response" counts against the host"""
+        if result.get("skipped"):
+            return
+        failed = result.get("status_code") is None
+        if not failed and not self._consecutive.get(target) and target not in self._open_until:
+            return
+        with self._lock:
+            self._trials.discard(target)
+            if not failed:
+                self._consecutive[target] = 0
+                if self._open_until.pop(target, None) is not None:
+                    print(f"✅ {target} is answering again - circuit closed")
+                return
+            count = self._consecutive[target] = self._consecutive.get(target, 0) + 1
+            self.reasons[target] = result.get("error")
+            if target in self._open_until or count >= self.failures:
+                self._open(target, count)
+
+    def trip(self, target, reason):
+        """Open the breaker straight away (e.g. the preflight probe failed)"""
+        with self._lock:
+            self.reasons[target] = reason
+            self._open(target, None)
+
+    def stats(self):
+        """target -> state, trips, requests failed fast, last failure"""
+        with self._lock:
+            targets = set(self.trips) | set(self._open_until)
+            return {
+                target: {
+                    "state": "open" if target in self._open_until else "closed",
+                    "trips": self.trips.get(target, 0),
+                    "rejected": self.rejected.get(target, 0),
+                    "reason": self.reasons.get(target)
+                }
+                for target in sorted(targets)
+            }
+
+    def _open(self, target, count):
+        if target not in self._open_until:
+            self.trips[target] = self.trips.get(target, 0) + 1
+            after = f" after {count} consecutive failures" if count else ""
+            print(f"⛔ {target} unavailable{after} - circuit open, retrying in {self.cooldown_s:.0f}s")
+        self._open_until[target] = time.monotonic() + self.cooldown_s
@@ -0,0 +1,61 @@
+"""
+CapacitySearch exponential / binary search over offered rate and SLO checks
+"""
+
+from capacity import CapacitySearch, check_slo
+
+
+def _target(capacity, broken="p99_ms"):
+    """Fake probe: within the SLO up to `capacity` rps, then either slow or failing"""
+    def probe(rate):
+        if rate <= capacity:
+            return {"p99_ms": 50, "error_rate": 0.0}
+        if broken == "p99_ms":
+            return {"p99_ms": 2000, "error_rate": 0.0}
+        return {"p99_ms": 50, "error_rate": 0.2}
+    return probe
+
+
+def test_check_slo():
+    slo = {"p99_ms": 100, "error_rate": 0.01}
+    assert check_slo({"p99_ms": 100, "error_rate": 0.01}, slo) == []
+    assert check_slo({"p99_ms": 101, "error_rate": 0.5}, slo) == ["p99_ms", "error_rate"]
+    assert check_slo({"p99_ms": 5000, "error_rate": 0.0}, {"error_rate": 0.01}) == []
+
+
+def test_grows_then_bisects_to_the_knee():
+    search = CapacitySearch(_target(75), start_rps=10, cooldown_s=0)
+    result = search.run()
+    assert [p["rate"] for p in search.probes] == [10, 20, 40, 80, 60, 70, 75]
+    assert result["max_sustainable_rps"] == 75
+    assert result["knee_rps"] == 80
+    assert result["limited_by"] == ["p99_ms"]
+    assert [p["rate"] for p in result["curve"]] == [10, 20, 40, 60, 70, 75, 80]
+    assert [p["passed"] for p in result["curve"]] == [True] * 6 + [False]
+
+
+def test_reports_which_limit_broke():
+    result = CapacitySearch(_target(30, broken="error_rate"), start_rps=10, cooldown_s=0).run()
+    assert result["limited_by"] == ["error_rate"]
+    assert 27 <= result["max_sustainable_rps"] <= 30
+
+
+def test_stops_at_max_rps():
+    result = CapacitySearch(_target(10_000), start_rps=10, max_rps=100, cooldown_s=0).run()
+    assert result["max_sustainable_rps"] == 100
+    assert result["knee_rps"] is None
+    assert result["limited_by"] == ["max_rps reached"]
+
+
+def test_probe_budget_bounds_the_search():
+    search = CapacitySearch(_target(10_000), start_rps=1, max_probes=5, cooldown_s=0)
+    result = search.run()
+    assert len(search.probes) == 5
+    assert result["max_sustainable_rps"] == 16
+
+
+def test_failing_at_the_start_rate_bisects_towards_zero():
+    search = CapacitySearch(_target(2), start_rps=10, cooldown_s=0)
+    result = search.run()
+    assert 1.8 <= result["max_sustainable_rps"] <= 2
+    assert len(search.probes) <= search.max_probes
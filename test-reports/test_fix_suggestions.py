@@ -0,0 +1,110 @@
+"""
+Fix suggestion cache keys, LRU / TTL eviction and batched resolution
+"""
+
+import fix_suggestions
+from fix_suggestions import FixSuggester, SuggestionCache, StubBackend, suggestion_key
+
+
+class _Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_volatile_details():
+    first = {"name": "Login", "error": "500 at 2026-10-17T09:00:01Z", "details": "request 4f1c2a9e8b7d6c5a took 812ms"}
+    again = {"name": "Login", "error": "500 at 2026-10-18T11:22:33Z", "details": "request 0a1b2c3d4e5f6a7b took 95ms"}
+    other = {"name": "Login", "error": "timeout at 2026-10-17T09:00:01Z", "details": "request 4f1c2a9e8b7d6c5a took 812ms"}
+    assert suggestion_key("SECURITY", first) == suggestion_key("SECURITY", again)
+    assert suggestion_key("SECURITY", first) != suggestion_key("SECURITY", other)
+    assert suggestion_key("SECURITY", first) != suggestion_key("UX", first)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = SuggestionCache(tmp_path / "cache.json", max_entries=2)
+    cache.put("a", "fix a")
+    cache.put("b", "fix b")
+    assert cache.get("a") == "fix a"  # "b" is now the least recently used
+    cache.put("c", "fix c")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("fix a", "fix c")
+
+
+def test_cache_expires_entries_after_the_ttl(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(fix_suggestions.time, "time", clock)
+    cache = SuggestionCache(tmp_path / "cache.json", ttl_s=60)
+    cache.put("a", "fix a")
+    clock.now += 59
+    assert cache.get("a") == "fix a"  # Using an entry doesn't extend its life
+    clock.now += 2
+    assert cache.get("a") is None
+
+
+def test_cache_round_trips_recency_through_disk(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(fix_suggestions.time, "time", clock)
+    path = tmp_path / "cache.json"
+    cache = SuggestionCache(path, max_entries=2)
+    for key in ("a", "b"):
+        clock.now += 1
+        cache.put(key, f"fix {key}")
+    clock.now += 1
+    cache.get("a")
+    cache.save()
+
+    reloaded = SuggestionCache(path, max_entries=2)
+    reloaded.put("c", "fix c")  # Evicts "b", the least recently used before the save
+    assert reloaded.get("b") is None
+    assert reloaded.get("a") == "fix a"
+
+
+def test_corrupt_cache_file_starts_empty(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("{not json")
+    assert SuggestionCache(path).get("anything") is None
+
+
+class _Backend:
+    cacheable = True
+
+    def __init__(self):
+        self.prompts = []
+
+    def suggest(self, prompt):
+        self.prompts.append(prompt)
+        if "Flaky" in prompt:
+            raise RuntimeError("rate limited")
+        return "use parameterised queries"
+
+
+def test_suggester_batches_misses_and_caches_only_good_answers(tmp_path):
+    cache = SuggestionCache(tmp_path / "cache.json")
+    suggester = FixSuggester(cache=cache)
+    suggester._backend = backend = _Backend()
+
+    good_key, cached = suggester.lookup("SECURITY", {"name": "SQL Injection", "error": "200"})
+    assert cached is None
+    bad_key, _ = suggester.lookup("SECURITY", {"name": "Flaky", "error": "200"})
+    suggester.lookup("SECURITY", {"name": "SQL Injection", "error": "200"})  # Same failure - one prompt
+
+    suggestions = suggester.resolve()
+    assert len(backend.prompts) == 2
+    assert suggestions[good_key] == "use parameterised queries"
+    assert suggestions[bad_key].startswith("Failed to generate fix suggestion: rate limited")
+    assert cache.get(good_key) == "use parameterised queries"
+    assert cache.get(bad_key) is None  # Retried next run
+    assert suggester.lookup("SECURITY", {"name": "SQL Injection", "error": "200"})[1] == "use parameterised queries"
+    assert suggester.resolve() == {}
+
+
+def test_stub_suggestions_are_never_cached(tmp_path):
+    cache = SuggestionCache(tmp_path / "cache.json")
+    suggester = FixSuggester(cache=cache)
+    suggester._backend = StubBackend()
+    key, _ = suggester.lookup("UX", {"name": "Dashboard", "error": "timeout"})
+    assert "offline stub" in suggester.resolve()[key]
+    assert cache.get(key) is None
@@ -0,0 +1,73 @@
+"""
+Retest confirmation by Wilson lower bound and fix file watching
+"""
+
+import threading
+
+import pytest
+
+from fix_watcher import FixWatcher, confirmed, issue_id_of, wilson_lower_bound
+
+
+@pytest.mark.parametrize("passes, trials, expected", [
+    (5, 5, 0.5655),
+    (4, 5, 0.3755),
+    (9, 10, 0.5958),
+    (3, 3, 0.4385),
+])
+def test_wilson_lower_bound(passes, trials, expected):
+    assert wilson_lower_bound(passes, trials) == pytest.approx(expected, abs=1e-4)
+
+
+def test_wilson_lower_bound_edges():
+    assert wilson_lower_bound(0, 0) == 0.0
+    assert wilson_lower_bound(0, 5) == pytest.approx(0.0, abs=1e-12)
+    assert wilson_lower_bound(50, 50) > wilson_lower_bound(5, 5)  # More trials, more confidence
+
+
+@pytest.mark.parametrize("passes, trials, expected", [
+    (1, 1, True),
+    (0, 1, False),
+    (5, 5, True),
+    (4, 5, False),  # One flaky trial in five isn't a confirmed fix
+    (3, 3, False),  # Too few trials to clear 50% with 95% confidence
+    (9, 10, True),
+])
+def test_confirmed(passes, trials, expected):
+    assert confirmed(passes, trials) is expected
+
+
+def test_issue_id_of():
+    assert issue_id_of("/tmp/fixes/SECURITY_12_FIXED.json") == "SECURITY_12"
+
+
+def _next_batch(watcher, path, stop):
+    """Write `path` once the watcher is waiting, return the first batch after the backlog"""
+    batches = watcher.batches(stop=stop)
+    backlog = next(batches)
+    timer = threading.Timer(0.1, path.write_text, args=("{}",))
+    timer.start()
+    try:
+        return backlog, next(batches)
+    finally:
+        timer.join()
+        stop.set()
+        watcher.close()
+
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_watcher_hands_over_the_backlog_then_new_fixes(tmp_path, polling):
+    (tmp_path / "UX_1_FIXED.json").write_text("{}")
+    (tmp_path / "notes.txt").write_text("ignored")
+    watcher = FixWatcher(tmp_path, poll_s=0.05)
+    if polling:
+        watcher.close()  # As on a system without inotify
+    backlog, batch = _next_batch(watcher, tmp_path / "SECURITY_2_FIXED.json", threading.Event())
+    assert [p.name for p in backlog] == ["UX_1_FIXED.json"]
+    assert [p.name for p in batch] == ["SECURITY_2_FIXED.json"]
+
+
+def test_watcher_without_follow_stops_after_the_backlog(tmp_path):
+    watcher = FixWatcher(tmp_path)
+    assert list(watcher.batches(follow=False)) == []
+    watcher.close()
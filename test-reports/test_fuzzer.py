@@ -0,0 +1,68 @@
+"""
+Fuzz payload generation, response signatures and anomaly clustering
+"""
+
+import pytest
+
+import fuzzer
+
+
+def test_signature_groups_responses_by_shape_not_values():
+    first = fuzzer.signature({"status_code": 400, "data": '{"error": "bad id 123"}'}, "' OR 1=1", 1000)
+    second = fuzzer.signature({"status_code": 400, "data": '{"error": "bad id 98765"}'}, "admin'--", 1000)
+    other = fuzzer.signature({"status_code": 400, "data": '{"errors": ["bad"]}'}, "' OR 1=1", 1000)
+    assert first == second
+    assert first != other
+
+
+def test_signature_flags_reflection_evaluation_and_slowness():
+    payload = "<script>alert('reflected-xss-probe')</script>"
+    status, _, _, timing, reflected, evaluated = fuzzer.signature(
+        {"status_code": 200, "data": f"<p>Hello {payload}</p>", "latency_ms": 2500}, payload, 1000
+    )
+    assert (status, timing, reflected, evaluated) == (200, "slow", True, False)
+
+    sig = fuzzer.signature({"status_code": 200, "data": "Hello 49"}, "{{7*7}}", 1000)
+    assert sig[5] is True
+    assert fuzzer.signature({"error": "timed out"}, "x", 1000)[0] == "no response"
+
+
+@pytest.mark.parametrize("sig, vector, reject, baseline, expected", [
+    (("no response", "", 0, "normal", False, False), "sqli", True, [200], "no response"),
+    ((500, "", 0, "normal", False, False), "sqli", True, [200], "server error"),
+    ((500, "", 0, "normal", False, False), "sqli", True, [200, 503], None),  # Already failing without payloads
+    ((200, "", 0, "normal", False, True), "ssti", False, [200], "template evaluated"),
+    ((200, "", 0, "normal", True, False), "xss", False, [200], "payload reflected"),
+    ((200, "", 0, "normal", True, False), "sqli", False, [200], None),  # Echoing a SQL string is harmless
+    ((400, "", 0, "slow", False, False), "sqli", True, [200], "slow response"),
+    ((201, "", 0, "normal", False, False), "sqli", True, [200], "payload accepted"),
+    ((400, "", 0, "normal", False, False), "sqli", True, [200], None),
+])
+def test_anomaly(sig, vector, reject, baseline, expected):
+    assert fuzzer.anomaly(sig, vector, reject, baseline) == expected
+
+
+def test_mutations_are_distinct_reproducible_and_start_with_the_seeds():
+    payloads = fuzzer.mutations("sqli", count=300)
+    assert len(payloads) == 300
+    assert len({repr(p) for p in payloads}) == 300
+    assert payloads[:len(fuzzer.SEEDS["sqli"])] == list(fuzzer.SEEDS["sqli"])
+    assert fuzzer.mutations("sqli", count=300) == payloads
+    assert fuzzer.mutations("sqli", count=300, seed=1) != payloads
+
+
+def test_clusters_collapse_thousands_of_responses_into_behaviours():
+    clusters = fuzzer.ResponseClusters(reject=True, baseline_statuses=[200])
+    for i in range(500):
+        clusters.add("sqli", f"' OR {i}=1", {"status_code": 400, "data": '{"error": "bad input"}', "latency_ms": 5})
+    for i in range(30):
+        body = '{"error": "internal"}' + " " * i  # Lengths differ - still one behaviour
+        clusters.add("sqli", f"'; DROP {i}", {"status_code": 500, "data": body, "latency_ms": 9}, field="email")
+    clusters.add("xss", "<svg>", {"error": "timed out", "latency_ms": 10000})
+
+    assert clusters.requests == 531
+    anomalies = clusters.anomalies()
+    assert [(a["anomaly"], a["count"]) for a in anomalies] == [("server error", 30), ("no response", 1)]
+    assert len(anomalies[0]["examples"]) == fuzzer.MAX_EXAMPLES
+    assert anomalies[0]["examples"][0] == {"vector": "sqli", "field": "email", "payload": "'; DROP 0"}
+    assert anomalies[0]["max_latency_ms"] == 9
@@ -0,0 +1,52 @@
+"""
+SessionPool keep-alive and cold connections against a local mock_target.py
+"""
+
+import json
+
+import requests
+
+from http_pool import SessionPool
+
+
+def test_keep_alive_requests_reuse_one_connection(mock_urls):
+    pool = SessionPool()
+    for _ in range(5):
+        with pool.request("GET", f"{mock_urls['app']}/health", timeout=5, stream=True) as response:
+            assert response.json() == {"status": "ok"}
+    assert pool.stats()[mock_urls["app"]] == {"requests": 5, "new_connections": 1, "reused": 4}
+    pool.close()
+
+
+def test_cold_session_stays_open_until_the_streamed_body_is_read(mock_urls, monkeypatch):
+    closed = []
+    close_session = requests.Session.close
+    monkeypatch.setattr(requests.Session, "close", lambda session: closed.append(session) or close_session(session))
+
+    pool = SessionPool()
+    endpoint = f"{mock_urls['super_agent']}/orchestrate"
+    headers = {"X-API-Key": "super-agent-dev-key-12345"}
+    response = pool.request("POST", endpoint, cold=True, json={"prompt": "x"}, headers=headers, timeout=5, stream=True)
+    assert not closed  # The chunked body hasn't been read yet
+    with response:
+        body = b"".join(response.iter_content(8192))
+    assert response.status_code == 200
+    assert json.loads(body)["result"] == "Orchestrated 1 chars"  # Every chunk of the 20 KB chunked reply arrived
+    assert len(closed) == 1
+    assert response.headers.get("Connection", "").lower() != "keep-alive"
+
+    cold = pool.request("GET", f"{mock_urls['super_agent']}/health", cold=True, timeout=5, stream=True)
+    cold.close()
+    assert pool.stats()[mock_urls["super_agent"]] == {"requests": 2, "new_connections": 2, "reused": 0}
+
+
+def test_cold_session_is_closed_when_the_request_fails(monkeypatch):
+    closed = []
+    close_session = requests.Session.close
+    monkeypatch.setattr(requests.Session, "close", lambda session: closed.append(session) or close_session(session))
+
+    try:
+        SessionPool().request("GET", "http://127.0.0.1:9/health", cold=True, timeout=1)
+    except requests.exceptions.ConnectionError:
+        pass
+    assert len(closed) == 1
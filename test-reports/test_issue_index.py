@@ -0,0 +1,54 @@
+"""
+Failure fingerprints and the persistent issue index
+"""
+
+from issue_index import IssueIndex, failure_status, fingerprint
+
+LOGIN = {
+    "name": "SQL Injection - Login Form",
+    "endpoint": "http://localhost:3000/api/auth/signin",
+    "status_code": 200,
+    "error": "Malicious SQL input was not rejected after 812ms (request 4f1c2a9e8b7d6c5a)"
+}
+
+
+def test_fingerprint_survives_volatile_details():
+    again = {**LOGIN, "error": "Malicious SQL input was not rejected after 95ms (request 0a1b2c3d4e5f6a7b)"}
+    assert fingerprint("SECURITY", LOGIN) == fingerprint("SECURITY", again)
+
+
+def test_fingerprint_separates_real_differences():
+    base = fingerprint("SECURITY", LOGIN)
+    assert fingerprint("SECURITY", {**LOGIN, "status_code": 500}) != base
+    assert fingerprint("SECURITY", {**LOGIN, "endpoint": "http://localhost:3000/api/login"}) != base
+    assert fingerprint("SECURITY", {**LOGIN, "name": "SQL Injection - Search"}) != base
+    assert fingerprint("STRESS_TEST", LOGIN) != base
+
+
+def test_failure_status_of_multi_request_tests():
+    assert failure_status({"status_code": 403}) == "403"
+    assert failure_status({"status_codes": {"200": 900, "429": 80, "503": 20}}) == "429"
+    assert failure_status({"status_codes": {"200": 10, "201": 5}}) is None
+    assert failure_status({}) is None
+
+
+def test_index_counts_occurrences_and_persists(tmp_path):
+    path = tmp_path / "index.sqlite3"
+    fp = fingerprint("SECURITY", LOGIN)
+    index = IssueIndex(path)
+    assert index.get(fp) is None
+    first = index.add(fp, "SECURITY_1")
+    index.touch(fp)
+    index.register_test("SECURITY_1", "penetration_tests", {"name": LOGIN["name"]})
+    index.close()
+
+    reopened = IssueIndex(path)
+    entry = reopened.touch(fp)
+    assert (entry["issue_id"], entry["count"], entry["first_seen"]) == ("SECURITY_1", 3, first["first_seen"])
+    assert entry["last_seen"] >= first["last_seen"]
+    assert reopened.test_for("SECURITY_1") == ("penetration_tests", {"name": LOGIN["name"]})
+    assert reopened.test_for("SECURITY_2") is None
+
+    replaced = reopened.add(fp, "SECURITY_9")  # Stale entry whose issue file is gone
+    assert (replaced["issue_id"], reopened.get(fp)["count"]) == ("SECURITY_9", 1)
+    reopened.close()
@@ -0,0 +1,71 @@
+"""
+LatencyHistogram bucketing, percentiles, merging and serialisation
+"""
+
+import json
+
+import pytest
+
+from latency_histogram import LatencyHistogram
+
+
+def _histogram(latencies_ms):
+    histogram = LatencyHistogram()
+    for latency_ms in latencies_ms:
+        histogram.record(latency_ms)
+    return histogram
+
+
+@pytest.mark.parametrize("value_us", [0, 1, 999, 2047, 2048, 123_456, 9_999_999, 3_599_999_999])
+def test_histogram_bucket_holds_value_within_precision(value_us):
+    histogram = LatencyHistogram()
+    index = histogram._counts_index(value_us)
+    low = histogram._value_from_index(index)
+    high = histogram._highest_equivalent(low)
+    assert low <= value_us <= high
+    assert high - low <= max(1, value_us / 1000)  # 3 significant figures
+
+
+def test_histogram_percentiles_and_summary():
+    histogram = _histogram(range(1, 1001))  # 1..1000 ms
+    p50, p99, p100 = histogram.percentiles([50, 99, 100])
+    assert p50 == pytest.approx(500, rel=1e-3)
+    assert p99 == pytest.approx(990, rel=1e-3)
+    assert p100 == 1000
+    summary = histogram.summary()
+    assert summary["count"] == 1000
+    assert summary["min_ms"] == 1
+    assert summary["mean_ms"] == pytest.approx(500.5)
+
+
+def test_histogram_clamps_out_of_range_values():
+    histogram = LatencyHistogram(highest_us=1_000_000)
+    histogram.record(-5)
+    histogram.record(5_000)  # 5s > 1s highest
+    assert histogram.min_us == 0
+    assert histogram.max_us == 1_000_000
+    assert histogram.total_count == 2
+
+
+def test_histogram_merge_and_round_trip():
+    merged = _histogram([1, 2, 3]).merge(_histogram([100, 200]))
+    assert merged.total_count == 5
+    assert merged.max_us == 200_000
+    restored = LatencyHistogram.from_dict(json.loads(json.dumps(merged.to_dict())))
+    assert list(restored.counts) == list(merged.counts)
+    assert restored.summary() == merged.summary()
+
+    with pytest.raises(ValueError):
+        merged.merge(LatencyHistogram(significant_figures=2))
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentiles([50, 99]) == [0.0, 0.0]
+    assert histogram.mean() == 0.0
+    assert histogram.distribution() == []
+
+
+def test_distribution_rows_follow_the_1_2_5_ladder():
+    rows = _histogram([1, 3, 7, 150]).distribution()
+    assert rows == [(2, 1, 25.0), (5, 1, 50.0), (10, 1, 75.0), (200, 1, 100.0)]
@@ -0,0 +1,103 @@
+"""
+Per-thread live metric shards, worker change folding and OpenMetrics text
+"""
+
+import json
+import threading
+
+from live_metrics import BUCKETS_MS, LiveExport, LiveMetrics, _bucket_percentile, changes
+
+ESTIMATE = {"name": "Estimate", "method": "POST", "endpoint": "http://localhost:3000/api/estimate?x=1"}
+
+
+def test_shards_count_in_flight_and_results():
+    metrics = LiveMetrics()
+    shard = metrics.shard(ESTIMATE)
+    assert shard.labels == ("Estimate", "POST /api/estimate")
+    with shard:
+        assert metrics.snapshot()[shard.labels]["in_flight"] == 1
+        shard.record({"success": True, "latency_ms": 7})
+    with shard:
+        shard.record({"success": False, "latency_ms": 70000})
+    shard.record({"success": False, "error": "refused"})  # No latency - counted, not bucketed
+
+    total = metrics.snapshot()[shard.labels]
+    assert (total["in_flight"], total["requests"], total["errors"]) == (0, 3, 2)
+    assert total["buckets"][1] == 1 and total["buckets"][-1] == 1
+    assert total["sum_ms"] == 70007
+    assert metrics.shard(ESTIMATE) is shard  # One shard per thread and test
+
+
+def test_snapshot_sums_every_threads_shard():
+    metrics = LiveMetrics()
+
+    def worker():
+        shard = metrics.shard(ESTIMATE)
+        for _ in range(100):
+            with shard:
+                shard.record({"success": True, "latency_ms": 3})
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(metrics._shards) == 4
+    assert metrics.snapshot()[("Estimate", "POST /api/estimate")]["requests"] == 400
+
+
+def test_folded_worker_changes_match_the_worker():
+    worker, coordinator = LiveMetrics(), LiveMetrics()
+    shard = worker.shard(ESTIMATE)
+    before = {}
+    for latency_ms in (4, 40, 400):
+        with shard:
+            shard.record({"success": latency_ms < 400, "latency_ms": latency_ms})
+        shard.__enter__()  # One request still running when the report goes out
+        totals = worker.snapshot()
+        coordinator.fold(json.loads(json.dumps(changes(totals, before))))
+        before = totals
+    assert changes(worker.snapshot(), before) == []  # Nothing moved since
+    assert coordinator.snapshot() == worker.snapshot()
+
+
+def test_openmetrics_text():
+    metrics = LiveMetrics()
+    shard = metrics.shard({"name": 'Say "hi"\\', "method": "GET", "endpoint": "http://h/api"})
+    shard.record({"success": True, "latency_ms": 7})
+    shard.record({"success": True, "latency_ms": 20})
+    text = metrics.openmetrics()
+
+    labels = 'test="Say \\"hi\\"\\\\",endpoint="GET /api"'
+    assert f"test_agent_requests_total{{{labels}}} 2" in text
+    assert f'test_agent_request_duration_seconds_bucket{{{labels},le="0.005"}} 0' in text
+    assert f'test_agent_request_duration_seconds_bucket{{{labels},le="0.01"}} 1' in text
+    assert f'test_agent_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"test_agent_request_duration_seconds_sum{{{labels}}} 0.027" in text
+    assert text.endswith("# EOF\n")
+
+
+def test_bucket_percentile():
+    buckets = [0] * (len(BUCKETS_MS) + 1)
+    assert _bucket_percentile(buckets, 99) is None
+    buckets[0], buckets[4] = 98, 2  # 98 under 5ms, 2 under 100ms
+    assert _bucket_percentile(buckets, 50) == 5
+    assert _bucket_percentile(buckets, 99) == 100
+    buckets[-1] = 10
+    assert _bucket_percentile(buckets, 99) == "+Inf"
+
+
+def test_progress_line_reports_the_interval():
+    metrics = LiveMetrics()
+    export = LiveExport(metrics, port=0, interval_s=0)
+    shard = metrics.shard(ESTIMATE)
+    for i in range(10):
+        shard.record({"success": i > 0, "latency_ms": 20})
+    first = metrics.snapshot()
+    for _ in range(20):
+        shard.record({"success": True, "latency_ms": 20})
+    line = export._progress(metrics.snapshot(), first, interval_s=2, elapsed_s=4)
+    assert (line["requests"], line["rps"], line["error_rate"]) == (30, 10.0, 0.0)
+    assert line["p99_le_ms"] == 25
+    assert line["tests"] == {"Estimate": {"requests": 20, "errors": 0, "in_flight": 0}}
+    assert export._progress(metrics.snapshot(), metrics.snapshot(), 2, 6) is None
@@ -0,0 +1,37 @@
+"""
+AsyncLoadEngine against a local mock_target.py
+"""
+
+from load_engine import AsyncLoadEngine
+
+
+def _estimate(urls, **extra):
+    return {
+        "name": "Estimate",
+        "endpoint": f"{urls['app']}/api/estimate",
+        "method": "POST",
+        "payload": {"industry": "education", "size": 50000},
+        **extra
+    }
+
+
+def test_batch_results_come_back_in_order(mock_urls):
+    tests = [_estimate(mock_urls, payload={"industry": "education", "size": size}) for size in range(5)]
+    results = AsyncLoadEngine().run_batch(tests)
+    assert [r["status_code"] for r in results] == [200] * 5
+    assert [f'"size": {size}' in r["data"] for size, r in enumerate(results)] == [True] * 5
+
+
+def test_one_bad_request_does_not_sink_the_batch(mock_urls):
+    bad = _estimate(mock_urls, payload={"size": object()})  # Not JSON serialisable - TypeError, not a ClientError
+    results = AsyncLoadEngine().run_batch([_estimate(mock_urls)] * 4 + [bad] + [_estimate(mock_urls)] * 4)
+    assert [r["success"] for r in results] == [True] * 4 + [False] + [True] * 4
+    assert results[4]["error"].startswith("TypeError")
+    assert results[4]["latency_ms"] is not None
+
+
+def test_open_loop_sends_the_whole_timetable(mock_urls):
+    received = []
+    AsyncLoadEngine().run_open_loop(_estimate(mock_urls), rate_per_sec=50, count=20, on_result=received.append)
+    assert len(received) == 20
+    assert all(r["success"] and "schedule_lag_ms" in r for r in received)
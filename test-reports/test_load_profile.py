@@ -0,0 +1,83 @@
+"""
+Load profile stages: validation, ramps, arrival timetables and sharding
+"""
+
+import pytest
+
+import load_profile
+from load_profile import Segment
+
+PROFILE = [
+    {"duration_s": 10, "rate_per_sec": 100},  # Ramp 0 -> 100/s
+    {"duration_s": 20, "rate_per_sec": 100},  # Soak
+    {"duration_s": 5, "rate_per_sec": 300, "ramp": "step"},  # Spike
+    {"duration_s": 60, "concurrency": 20, "from": 1}
+]
+
+
+@pytest.mark.parametrize("stages, message", [
+    ([], "at least one stage"),
+    ([{"duration_s": 10}], "exactly one of"),
+    ([{"duration_s": 10, "rate_per_sec": 5, "concurrency": 2}], "exactly one of"),
+    ([{"duration_s": 0, "rate_per_sec": 5}], "positive duration_s"),
+    ([{"duration_s": 10, "rate_per_sec": 5, "ramp": "exponential"}], "ramp must be"),
+])
+def test_validate_rejects_malformed_stages(stages, message):
+    with pytest.raises(ValueError, match=message):
+        load_profile.validate(stages)
+
+
+def test_segments_ramp_from_the_previous_stage_of_the_same_kind():
+    load_profile.validate(PROFILE)
+    assert load_profile.segments(PROFILE) == [
+        Segment(0.0, 10.0, "rate_per_sec", 0, 100),
+        Segment(10.0, 30.0, "rate_per_sec", 100, 100),
+        Segment(30.0, 35.0, "rate_per_sec", 300, 300),
+        Segment(35.0, 95.0, "concurrency", 1, 20)
+    ]
+    assert load_profile.duration(PROFILE) == 95
+    assert load_profile.peak(PROFILE, "rate_per_sec") == 300
+    assert load_profile.peak(PROFILE, "concurrency") == 20
+
+
+def test_value_at_interpolates_and_clamps():
+    ramp = Segment(10.0, 20.0, "rate_per_sec", 50, 150)
+    assert load_profile.value_at(ramp, 10.0) == 50
+    assert load_profile.value_at(ramp, 12.5) == 75
+    assert load_profile.value_at(ramp, 99.0) == 150
+    assert load_profile.target_at(PROFILE, 5.0) == ("rate_per_sec", 50)
+    assert load_profile.target_at(PROFILE, 65.0) == ("concurrency", 10.5)
+    assert load_profile.target_at(PROFILE, 95.0) == (None, 0)
+
+
+def test_arrivals_follow_the_integral_of_the_rate():
+    ramp_up = list(load_profile.arrivals(Segment(0.0, 10.0, "rate_per_sec", 0, 100)))
+    assert len(ramp_up) == 500
+    assert ramp_up == sorted(ramp_up) and ramp_up[-1] < 10
+    assert sum(1 for t in ramp_up if t < 5) == 125  # A quarter of the area is in the first half
+
+    steady = list(load_profile.arrivals(Segment(30.0, 31.0, "rate_per_sec", 4, 4)))
+    assert steady == [30.0, 30.25, 30.5, 30.75]
+
+    ramp_down = list(load_profile.arrivals(Segment(0.0, 10.0, "rate_per_sec", 100, 0)))
+    assert len(ramp_down) == 500
+    assert list(load_profile.arrivals(Segment(0.0, 10.0, "rate_per_sec", 0, 0))) == []
+
+
+def test_expected_requests_counts_only_rate_stages():
+    assert load_profile.expected_requests(PROFILE) == 500 + 2000 + 1500
+
+
+def test_shards_add_up_to_the_whole_profile():
+    shards = [load_profile.shard(PROFILE, index, 3) for index in range(3)]
+    for shard in shards:
+        load_profile.validate(shard)
+        assert load_profile.duration(shard) == load_profile.duration(PROFILE)
+    sent = sum(
+        len(list(load_profile.arrivals(segment)))
+        for shard in shards for segment in load_profile.segments(shard) if segment.kind == "rate_per_sec"
+    )
+    assert sent == pytest.approx(4000, abs=9)  # At most one request per worker per rate stage either way
+    assert [shard[3]["concurrency"] for shard in shards] == [7, 7, 6]
+    assert [shard[3]["from"] for shard in shards] == [1, 0, 0]
+    assert "from" not in shards[0][1]  # Soak continues from the sharded ramp target
@@ -0,0 +1,76 @@
+"""
+Phase durations from aiohttp trace marks and the per-phase tail breakdown
+"""
+
+import json
+
+import pytest
+
+from phase_timing import PhaseStats, current_recorder, phases_from_marks, recording
+
+
+def test_phases_of_a_new_connection():
+    marks = {
+        "request_start": 1.000,
+        "connect_start": 1.000,
+        "dns_start": 1.001,
+        "dns_end": 1.003,
+        "connect_end": 1.010,
+        "sent": 1.011,
+        "headers": 1.061
+    }
+    phases = phases_from_marks(marks, done=1.071)
+    assert phases == pytest.approx({"dns": 2, "connect": 8, "send": 1, "server": 50, "transfer": 10})  # DNS isn't counted twice
+
+
+def test_reused_connection_has_no_setup_phases():
+    phases = phases_from_marks({"request_start": 2.0, "sent": 2.001, "headers": 2.021}, done=2.025)
+    assert phases == pytest.approx({"send": 1, "server": 20, "transfer": 4})
+
+
+def test_server_time_starts_when_the_connection_was_ready_if_send_was_not_seen():
+    phases = phases_from_marks({"request_start": 3.0, "headers": 3.030}, done=3.030)
+    assert phases == pytest.approx({"server": 30, "transfer": 0})
+
+
+def test_recording_is_per_block_and_nests():
+    assert current_recorder() is None
+    with recording() as outer:
+        outer.add("dns", 0.002)
+        with recording() as inner:
+            current_recorder().add("connect", 0.005)
+        current_recorder().add("tls", 0.010)
+    assert current_recorder() is None
+    assert outer.phases == pytest.approx({"dns": 2, "tls": 10})
+    assert inner.phases == pytest.approx({"connect": 5})
+    assert outer.setup_ms() == pytest.approx(12)
+
+
+def _stats(fast, slow):
+    stats = PhaseStats()
+    for _ in range(fast):
+        stats.record(20, {"server": 18, "transfer": 1})
+    for _ in range(slow):
+        stats.record(1000, {"server": 100, "transfer": 850})
+    return stats
+
+
+def test_tail_breakdown_only_looks_at_the_slowest_requests():
+    stats = _stats(fast=97, slow=3)
+    assert stats.count == 100
+    tail = stats.breakdown(99)
+    assert tail["transfer"] == pytest.approx(0.85)
+    assert tail["server"] == pytest.approx(0.10)
+    assert tail["other"] == pytest.approx(0.05)
+    overall = stats.breakdown()
+    assert overall["server"] == pytest.approx((97 * 18 + 3 * 100) / (97 * 20 + 3 * 1000))
+    assert PhaseStats().breakdown(99) == {}
+
+
+def test_merge_and_round_trip_match_one_stats_object():
+    whole = _stats(fast=50, slow=2)
+    merged = _stats(fast=20, slow=1).merge(_stats(fast=30, slow=1))
+    restored = PhaseStats.from_dict(json.loads(json.dumps(merged.to_dict())))
+    assert restored.count == whole.count
+    assert restored.bands == whole.bands
+    assert restored.breakdown(99) == pytest.approx(whole.breakdown(99))
@@ -0,0 +1,49 @@
+"""
+Mann-Whitney U over latency histograms and the regression verdicts
+"""
+
+import pytest
+
+import regression
+from latency_histogram import LatencyHistogram
+
+
+def _histogram(latencies_ms):
+    histogram = LatencyHistogram()
+    for latency_ms in latencies_ms:
+        histogram.record(latency_ms)
+    return histogram
+
+
+def test_mann_whitney_matches_direct_rank_sum():
+    baseline, current = [10, 20, 30, 40], [25, 35, 45, 55, 65]
+    u, _, p = regression.mann_whitney(_histogram(baseline), _histogram(current))
+    # U for `current`: pairs (b, c) with c > b
+    assert u == sum(1 for b in baseline for c in current if c > b)
+    assert 0 < p < 0.5
+
+
+def test_compare_verdicts():
+    fast = _histogram([100 + i % 10 for i in range(200)])
+    slow = _histogram([150 + i % 10 for i in range(200)])
+    same = _histogram([100 + (i + 3) % 10 for i in range(200)])
+
+    assert regression.compare(fast, slow)["verdict"] == "regression"
+    assert regression.compare(slow, fast)["verdict"] == "improvement"
+    assert regression.compare(fast, same)["verdict"] == "no change"
+    assert regression.compare(fast, _histogram([500] * 5))["verdict"] == "insufficient data"
+
+
+def test_compare_ignores_significant_but_tiny_shifts():
+    before = _histogram([100] * 5000 + [101] * 5000)
+    after = _histogram([101] * 5000 + [102] * 5000)
+    result = regression.compare(before, after)
+    assert result["p_value"] < regression.ALPHA
+    assert result["verdict"] == "no change"  # 1% slower is below MIN_CHANGE
+
+
+def test_compare_rejects_mismatched_or_empty_histograms():
+    with pytest.raises(ValueError):
+        regression.mann_whitney(_histogram([1]), LatencyHistogram(significant_figures=2))
+    with pytest.raises(ValueError):
+        regression.mann_whitney(_histogram([1]), LatencyHistogram())
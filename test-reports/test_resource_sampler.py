@@ -0,0 +1,67 @@
+"""
+Leak detection, sample summaries and /proc target lookup
+"""
+
+import os
+import socket
+
+import pytest
+
+import resource_sampler
+from resource_sampler import Sample, find_leaks, summarize, window_stats
+
+
+def _samples(rss, fds=lambda i: 40, seconds=60, start=1000.0):
+    return [Sample(start + i, 10.0 + i % 3, rss(i), 8, fds(i)) for i in range(seconds)]
+
+
+def test_steady_growth_in_a_soak_window_is_a_leak():
+    samples = _samples(rss=lambda i: 100 + i * 0.5)  # +30MB over the minute
+    leaks = find_leaks(samples, [(1000.0, 1059.0, "in soak stage 2")])
+    assert leaks == ["RSS +30 MB over 59s in soak stage 2 (R²=1.00)"]
+
+
+def test_fd_growth_is_reported_separately():
+    samples = _samples(rss=lambda i: 100, fds=lambda i: 40 + i)
+    assert find_leaks(samples, [(1000.0, 1059.0, "in soak")]) == ["Open FDs +59 FDs over 59s in soak (R²=1.00)"]
+
+
+@pytest.mark.parametrize("rss", [
+    lambda i: 100 + (i % 10) * 5,  # GC sawtooth - no trend
+    lambda i: 100 + i * 0.1,  # Steady, but only +6MB
+    lambda i: 200 - i,  # Shrinking
+])
+def test_plateaus_and_small_or_negative_trends_are_not_leaks(rss):
+    assert find_leaks(_samples(rss=rss), [(1000.0, 1059.0, "in soak")]) == []
+
+
+def test_windows_need_enough_samples():
+    samples = _samples(rss=lambda i: 100 + i * 10)
+    assert find_leaks(samples, [(1000.0, 1000.0 + resource_sampler.LEAK_MIN_SAMPLES - 2, "short")]) == []
+    assert find_leaks(samples, [(5000.0, 6000.0, "after the run")]) == []
+
+
+def test_summarize_and_window_stats():
+    samples = _samples(rss=lambda i: 100 + i, fds=lambda i: 40 + i // 10, seconds=10)
+    summary = summarize(samples)
+    assert (summary["samples"], summary["rss_start_mb"], summary["rss_end_mb"], summary["rss_max_mb"]) == (10, 100, 109, 109)
+    assert (summary["fds_start"], summary["fds_end"], summary["threads_max"]) == (40, 40, 8)
+    assert summary["cpu_max_pct"] == 12.0
+    assert window_stats(samples, 1000.0, 1003.0) == (11.0, 102)
+    assert window_stats(samples, 2000.0, 2001.0) is None
+    assert summarize([])["samples"] == 0
+
+
+def test_parse_targets():
+    assert resource_sampler._parse_targets("app=3000, 9500,") == [("app", 3000), (None, 9500)]
+
+
+@pytest.mark.skipif(not resource_sampler.available(), reason="needs /proc")
+def test_finds_the_process_listening_on_a_port():
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        port = listener.getsockname()[1]
+        assert resource_sampler.pids_for_port(port) == [os.getpid()]
+        ticks, rss_mb, threads, fds = resource_sampler.read_process(os.getpid())
+        assert rss_mb > 0 and threads >= 1 and fds >= 1
@@ -0,0 +1,73 @@
+"""
+ResultSink counters, bounded samples, JSONL log and distributed merging
+"""
+
+import json
+import random
+
+from result_sink import ResultSink, log_path_for
+
+
+def _result(i, status=200, **extra):
+    return {"success": status == 200, "status_code": status, "latency_ms": 10 + i % 50, "data": "x" * 100, **extra}
+
+
+def test_sink_keeps_counters_and_bounded_samples(tmp_path):
+    log = tmp_path / "run" / "test.jsonl"
+    sink = ResultSink(log, reservoir_size=5, max_failures=3)
+    for i in range(100):
+        sink.add(_result(i, status=500 if i % 10 == 0 else 200))
+    sink.add({"success": False, "error": "refused", "latency_ms": 1})
+    sink.close()
+
+    assert (sink.requests, sink.successes, sink.failures) == (101, 90, 11)
+    assert sink.status_codes == {"200": 90, "500": 10, "error": 1}
+    assert sink.histogram.total_count == 101
+    assert len(sink.success_samples) == 5
+    assert len(sink.failure_samples) == 3
+
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    assert len(records) == 101
+    assert "data" not in records[0] and "ts" in records[0]  # Bodies stay out of the log
+
+
+def test_log_path_slugs_the_test_name():
+    assert log_path_for(17, "Rate Limit Test - 50 requests/min", ".host-1").parts[-2:] == (
+        "17", "rate-limit-test-50-requests-min.host-1.jsonl"
+    )
+
+
+def test_merge_matches_one_sink_that_saw_everything():
+    whole, first, second = ResultSink(), ResultSink(), ResultSink()
+    for i in range(60):
+        result = _result(i, status=503 if i % 7 == 0 else 200, ttfb_ms=3, phases={"server": 5.0})
+        whole.add(result)
+        (first if i < 25 else second).add(result)
+    first.halt({"reason": "skipped: deadline exceeded", "unsent": 4, "remaining_s": 1.5})
+    second.halt({"reason": "skipped: deadline exceeded", "unsent": 6, "remaining_s": 1.0})
+
+    merged = ResultSink()
+    merged.merge(json.loads(json.dumps(first.to_dict())))  # Over the wire, as a distributed worker sends it
+    merged.merge(json.loads(json.dumps(second.to_dict())))
+
+    assert (merged.requests, merged.successes) == (whole.requests, whole.successes)
+    assert merged.status_codes == whole.status_codes
+    assert list(merged.histogram.counts) == list(whole.histogram.counts)
+    assert merged.ttfb.total_count == 60
+    assert merged.halted == {"reason": "skipped: deadline exceeded", "unsent": 10, "remaining_s": 2.5}
+    assert len(merged.success_samples) == merged.reservoir_size
+
+
+def test_merged_reservoir_draws_in_proportion_to_the_populations():
+    random.seed(3)
+    sink = ResultSink(reservoir_size=10)
+    mine = [("mine", i) for i in range(10)]
+    theirs = [("theirs", i) for i in range(10)]
+    picked = [
+        origin
+        for _ in range(500)
+        for origin, _ in sink._merge_reservoirs(mine, 900, list(theirs), 100)
+    ]
+    share = picked.count("mine") / len(picked)
+    assert 0.85 < share < 0.95  # 900 of 1000 successes were ours
+    assert sorted(sink._merge_reservoirs([], 0, list(theirs), 40)) == theirs  # Only one side - all of it
@@ -0,0 +1,59 @@
+"""
+Run history storage and baseline selection
+"""
+
+import pytest
+
+from latency_histogram import LatencyHistogram
+from run_history import RunHistory
+
+
+def _histogram(latencies_ms):
+    histogram = LatencyHistogram()
+    for latency_ms in latencies_ms:
+        histogram.record(latency_ms)
+    return histogram
+
+
+def test_baseline_is_the_last_run_of_the_same_selection(tmp_path):
+    history = RunHistory(tmp_path / "history.sqlite3")
+    measured = {"GET /health": _histogram([5])}
+    history.record(1, measured, [])
+    history.record(2, measured, [], selection="fuzz")
+    history.record(3, measured, [], selection="tests:Login")
+    assert not history.record(4, {"GET /health": LatencyHistogram()}, [])  # Nothing measured
+
+    assert history.baseline(5) == 1
+    assert history.baseline(5, selection="fuzz") == 2
+    assert history.baseline(5, selection="tests:Other") is None
+    assert history.baseline(1) is None
+    history.tag(3, "release-1.4")
+    assert history.baseline(5, pinned="release-1.4") == 3
+    with pytest.raises(ValueError):
+        history.baseline(5, pinned="missing")
+
+
+def test_stored_run_round_trips_and_rerecording_replaces_it(tmp_path):
+    path = tmp_path / "history.sqlite3"
+    history = RunHistory(path)
+    tests = [{"name": "Burst", "endpoint": "/api/estimate", "requests": 500, "duration_ms": 2000}]
+    history.record(7, {"POST /api/estimate": _histogram([10, 20, 30])}, tests)
+    history.record(7, {"POST /api/estimate": _histogram([40])}, [])
+
+    reopened = RunHistory(path)
+    histograms = reopened.histograms(7)
+    assert list(histograms) == ["POST /api/estimate"]
+    assert histograms["POST /api/estimate"].total_count == 1
+    assert reopened.throughput(7) == {}
+    assert reopened.latest() == 7
+
+
+def test_tags_move_between_runs(tmp_path):
+    history = RunHistory(tmp_path / "history.sqlite3")
+    for run_id in (1, 2):
+        history.record(run_id, {"GET /health": _histogram([5])}, [])
+    history.tag(1, "release-1.4")
+    history.tag(2, "release-1.4")
+    assert [row[2] for row in history.runs()] == ["release-1.4", None]
+    with pytest.raises(ValueError):
+        history.tag(9, "release-1.5")
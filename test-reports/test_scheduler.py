@@ -0,0 +1,94 @@
+"""
+TestScheduler dependency order, cycle detection and per-host budgets
+"""
+
+import threading
+import time
+
+import pytest
+
+import scheduler as dag
+
+
+def test_scheduler_rejects_cycles_unknown_and_duplicate_tests():
+    schedule = dag.TestScheduler()
+    schedule.add("a", lambda: None, "host", after=["b"])
+    schedule.add("b", lambda: None, "host", after=["a"])
+    with pytest.raises(ValueError, match="cycle"):
+        schedule.run()
+
+    schedule = dag.TestScheduler()
+    schedule.add("a", lambda: None, "host", after=["missing"])
+    with pytest.raises(ValueError, match="unknown test: missing"):
+        schedule.run()
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        schedule.add("a", lambda: None, "host")
+
+
+def test_scheduler_runs_dependencies_first():
+    order = []
+    schedule = dag.TestScheduler()
+    schedule.add("create", lambda: order.append("create"), "host")
+    schedule.add("list", lambda: order.append("list"), "host", after=["create"])
+    schedule.add("delete", lambda: order.append("delete") or "gone", "host", after=["list"])
+    results = schedule.run()
+    assert order == ["create", "list", "delete"]
+    assert results["delete"] == "gone"
+
+
+def _tracked(active, peak, lock, target, delay_s=0.05):
+    def run():
+        with lock:
+            active[target] = active.get(target, 0) + 1
+            peak[target] = max(peak.get(target, 0), active[target])
+        time.sleep(delay_s)
+        with lock:
+            active[target] -= 1
+    return run
+
+
+def test_scheduler_keeps_each_target_within_its_budget():
+    active, peak, lock = {}, {}, threading.Lock()
+    schedule = dag.TestScheduler(budgets={"app": 2}, default_budget=3)
+    for i in range(6):
+        schedule.add(f"app-{i}", _tracked(active, peak, lock, "app"), "app")
+        schedule.add(f"agent-{i}", _tracked(active, peak, lock, "agent"), "agent")
+    schedule.run()
+    assert peak == {"app": 2, "agent": 3}
+
+
+def test_scheduler_gives_exclusive_tests_the_whole_target():
+    active, peak, lock = {}, {}, threading.Lock()
+    overlapped = []
+    load = _tracked(active, peak, lock, "app", delay_s=0.1)
+
+    def exclusive():
+        overlapped.append(active.get("app", 0))
+        load()
+
+    schedule = dag.TestScheduler(default_budget=4)
+    schedule.add("check-1", _tracked(active, peak, lock, "app"), "app")
+    schedule.add("load", exclusive, "app", exclusive=True)
+    schedule.add("check-2", _tracked(active, peak, lock, "app"), "app")
+    schedule.run()
+    assert overlapped == [0]  # Nothing else was running against the host
+
+
+def test_scheduler_reraises_test_errors():
+    def boom():
+        raise RuntimeError("boom")
+
+    schedule = dag.TestScheduler()
+    schedule.add("ok", lambda: 1, "host")
+    schedule.add("bad", boom, "host")
+    with pytest.raises(RuntimeError, match="boom"):
+        schedule.run()
+
+
+def test_scheduler_finishes_chains_of_instant_tests():
+    # Tests that finish before add_done_callback() run finish() inline - the scheduler mustn't wait on them
+    schedule = dag.TestScheduler()
+    for i in range(200):
+        schedule.add(i, lambda i=i: i, "host", after=[i - 1] if i else [])
+    assert schedule.run() == {i: i for i in range(200)}
@@ -0,0 +1,70 @@
+"""
+StreamTimer bounded reads, SSE token counting and timing fields
+"""
+
+import pytest
+
+from stream_metrics import StreamTimer, drains, is_event_stream
+
+
+def test_keeps_only_the_first_bytes_but_counts_them_all():
+    timer = StreamTimer(0.0, keep_bytes=10)
+    timer.feed(b"0123456", now=0.1)
+    assert not timer.satisfied
+    timer.feed(b"789abcdef", now=0.2)
+    timer.feed(b"", now=0.3)  # Empty reads aren't chunks
+    assert timer.satisfied
+    assert timer.text() == "0123456789"
+    assert (timer.bytes, timer.chunks) == (16, 2)
+    assert set(timer.fields()) == {"ttfb_ms", "bytes"}  # Untimed plain body
+
+
+def test_sse_tokens_are_counted_across_chunk_boundaries():
+    timer = StreamTimer(0.0, sse=True)
+    timer.headers(now=0.050)
+    for at, chunk in [
+        (0.100, b"data: {\"t\": \"Hel"),  # First event still incomplete
+        (0.120, b"lo\"}\n\nda"),  # ... completes here; the next "data:" is split
+        (0.150, b"ta: {\"t\": \" world\"}\n\n: keep-alive comment\n\n"),
+        (0.200, b"event: done\ndata: [DONE]\n\n")
+    ]:
+        timer.feed(chunk, now=at)
+
+    fields = timer.fields()
+    assert fields["tokens"] == 2  # [DONE] and comments aren't tokens
+    assert fields["ttfb_ms"] == pytest.approx(50)
+    assert fields["ttft_ms"] == pytest.approx(120)  # When the first event was complete, not its first byte
+    assert fields["chunks"] == 4
+    assert fields["chunk_gaps_ms"] == pytest.approx([20, 30, 50])
+    assert fields["max_gap_ms"] == pytest.approx(50)
+    assert fields["tokens_per_sec"] == pytest.approx(1 / 0.080)  # One more token 80ms after the first
+    assert fields["bytes_per_sec"] == pytest.approx(timer.bytes / 0.150)
+
+
+def test_timed_chunked_body_uses_the_first_chunk_as_first_token():
+    timer = StreamTimer(0.0, timed=True)
+    timer.headers(now=0.01)
+    timer.feed(b"{\"trace\": [", now=0.02)
+    timer.feed(b"\"x\"]}", now=0.05)
+    fields = timer.fields()
+    assert fields["ttft_ms"] == pytest.approx(20)
+    assert "tokens" not in fields
+
+
+@pytest.mark.parametrize("test, sse, expected", [
+    ({"name": "Dashboard"}, False, False),
+    ({"name": "Dashboard"}, True, True),
+    ({"name": "TTFT", "stream": True}, False, True),
+    ({"name": "Spike", "stages": []}, False, True),
+    ({"name": "Burst", "rate_per_sec": 100, "duration_s": 1}, False, True),
+    ({"name": "Burst", "rate_per_sec": 100, "duration_s": 1, "drain": False}, False, False),
+    ({"name": "Big export", "drain": True}, False, True),
+])
+def test_drains(test, sse, expected):
+    assert drains(test, sse) is expected
+
+
+def test_is_event_stream():
+    assert is_event_stream("text/event-stream; charset=utf-8")
+    assert not is_event_stream("application/json")
+    assert not is_event_stream(None)
@@ -0,0 +1,122 @@
+"""
+Test deadlines from planned schedules, request timeouts and the per-host circuit breaker
+"""
+
+import time
+
+import pytest
+
+import target_health
+from load_engine import AsyncLoadEngine
+from target_health import CircuitBreaker, deadline_for, planned_s
+
+HOST = "http://127.0.0.1:3000"
+DOWN = {"success": False, "status_code": None, "error": "Connection refused"}
+UP = {"success": False, "status_code": 503}
+
+
+@pytest.mark.parametrize("test, planned", [
+    ({"name": "Dashboard"}, 0),
+    ({"stages": [{"duration_s": 60, "rate_per_sec": 5}, {"duration_s": 3600, "rate_per_sec": 5}]}, 3660),
+    ({"rate_per_sec": 50, "duration_s": 20}, 20),
+    ({"rapid_fire": 200}, 2.0),  # 100/sec unless a rate is given
+    ({"rapid_fire": 200, "rate_per_sec": 20}, 10.0),
+    ({"replay": "capture.jsonl", "speed": 2}, None),
+])
+def test_planned_schedule(test, planned):
+    assert planned_s(test) == planned
+
+
+def test_deadline_is_the_default_on_top_of_the_schedule():
+    soak = {"stages": [{"duration_s": 3600, "rate_per_sec": 50}]}
+    assert deadline_for(soak, default=300) == 3900
+    assert deadline_for({"name": "Dashboard"}, default=300) == 300
+    assert deadline_for({**soak, "deadline_s": 10}, default=300) == 10  # Explicit always wins
+    assert deadline_for(soak, default=0) == 0  # No limit stays no limit
+    assert deadline_for({"replay": "capture.jsonl"}, default=300) == 0  # Only the run deadline applies
+
+
+def _profile(urls, **extra):
+    return {
+        "name": "Soak",
+        "endpoint": f"{urls['app']}/api/estimate",
+        "method": "POST",
+        "payload": {"industry": "education", "size": 50000},
+        "stages": [{"duration_s": 1.5, "rate_per_sec": 20, "ramp": "step"}],
+        **extra
+    }
+
+
+def _run_with_deadline(test):
+    results, halts = [], []
+    test = {**test, "deadline_at": target_health.deadline_after(deadline_for(test))}
+    AsyncLoadEngine().run_profile(test, test["stages"], on_result=results.append, on_halt=halts.append)
+    return results, halts
+
+
+def test_profile_longer_than_the_test_deadline_runs_to_completion(mock_urls, monkeypatch):
+    monkeypatch.setattr(target_health, "TEST_DEADLINE_S", 0.5)
+    results, halts = _run_with_deadline(_profile(mock_urls))
+    assert halts == []
+    assert len(results) == 30 and all(r["success"] for r in results)
+
+
+def test_explicit_deadline_still_stops_a_profile(mock_urls):
+    results, halts = _run_with_deadline(_profile(mock_urls, deadline_s=0.5))
+    assert [halt["reason"] for halt in halts] == [target_health.DEADLINE_EXCEEDED]
+    assert 0 < len(results) < 30
+
+
+def test_request_timeout_is_cut_short_by_the_deadline():
+    assert target_health.request_timeout({}, default=30) == (target_health.CONNECT_TIMEOUT_S, 30)
+    connect, total = target_health.request_timeout({"deadline_at": time.time() + 2}, default=30)
+    assert connect <= 2 and 1.5 < total <= 2
+    assert target_health.request_timeout({"deadline_at": time.time() - 1}) is None
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_fails_fast_and_closes_after_a_good_trial(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(target_health.time, "monotonic", clock)
+    breaker = CircuitBreaker(failures=3, cooldown_s=30)
+
+    for _ in range(2):
+        breaker.record(HOST, DOWN)
+    breaker.record(HOST, UP)  # Any HTTP response, even a 503, means the host is up
+    breaker.record(HOST, target_health.skipped(target_health.UNAVAILABLE))  # Never sent - doesn't count
+    for _ in range(2):
+        breaker.record(HOST, DOWN)
+    assert breaker.allow(HOST)
+    breaker.record(HOST, DOWN)
+
+    assert not breaker.available(HOST)
+    assert not breaker.allow(HOST) and not breaker.allow(HOST)
+    clock.now += 30
+    assert breaker.available(HOST)
+    assert breaker.allow(HOST)  # The trial
+    assert not breaker.allow(HOST)  # Only one at a time
+    breaker.record(HOST, UP)
+    assert breaker.allow(HOST)
+    assert breaker.stats() == {HOST: {"state": "closed", "trips": 1, "rejected": 3, "reason": "Connection refused"}}
+
+
+def test_failed_trial_reopens_and_trip_opens_at_once(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(target_health.time, "monotonic", clock)
+    breaker = CircuitBreaker(failures=5, cooldown_s=10)
+    breaker.trip(HOST, "preflight: no response")
+    assert not breaker.allow(HOST)
+    clock.now += 10
+    assert breaker.allow(HOST)
+    breaker.record(HOST, DOWN)
+    clock.now += 5
+    assert not breaker.available(HOST)  # Cooldown restarted from the failed trial
+    assert target_health.halt_reason({"endpoint": f"{HOST}/api"}, breaker) == target_health.UNAVAILABLE
+    assert breaker.stats()[HOST]["trips"] == 1
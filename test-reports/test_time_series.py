@@ -0,0 +1,59 @@
+"""
+Per-second time series: bucketing, packing, windowed rows and merging
+"""
+
+import json
+
+from time_series import OPEN_SECONDS, TimeSeries
+
+
+def _fill(series, origin, seconds, per_second=10, error_every=5):
+    for second in range(seconds):
+        for i in range(per_second):
+            result = {"success": i % error_every != 0, "latency_ms": 10 + second}
+            series.add(result, now=origin + second + i / per_second)
+
+
+def test_rows_per_second():
+    series = TimeSeries(origin=1000.0)
+    _fill(series, 1000.0, seconds=3)
+    rows = series.rows()
+    assert [row["t"] for row in rows] == [0, 1, 2]
+    assert [row["requests"] for row in rows] == [10, 10, 10]
+    assert rows[0]["errors"] == 2 and rows[0]["error_rate"] == 0.2
+    assert round(rows[2]["p50_ms"]) == 12
+
+
+def test_old_seconds_are_packed_and_late_completions_still_land():
+    series = TimeSeries(origin=0.0)
+    _fill(series, 0.0, seconds=OPEN_SECONDS + 5)
+    assert 0 not in series._open and 0 in series._packed
+    series.add({"success": True, "latency_ms": 500}, now=0.5)  # Very late completion for second 0
+    first = series.rows()[0]
+    assert first["requests"] == 11
+    assert first["max_ms"] >= 499
+
+
+def test_rows_merge_into_windows():
+    series = TimeSeries(origin=0.0)
+    _fill(series, 0.0, seconds=10)
+    rows = series.rows(max_rows=3)
+    assert [(row["t"], row["seconds"]) for row in rows] == [(0, 4), (4, 4), (8, 2)]
+    assert [row["requests"] for row in rows] == [40, 40, 20]
+    assert rows[0]["rps"] == 10
+    assert TimeSeries().rows() == []
+
+
+def test_merge_lines_up_series_with_different_origins():
+    whole = TimeSeries(origin=100.0)
+    first, second = TimeSeries(origin=100.0), TimeSeries(origin=102.0)
+    _fill(whole, 100.0, seconds=6)
+    _fill(first, 100.0, seconds=6)
+    _fill(second, 102.0, seconds=4)
+    _fill(whole, 102.0, seconds=4)
+
+    merged = TimeSeries()
+    merged.merge(json.loads(json.dumps(first.to_dict())))
+    merged.merge(json.loads(json.dumps(second.to_dict())))
+    assert merged.origin == 100.0
+    assert merged.rows() == whole.rows()
@@ -0,0 +1,54 @@
+"""
+Capture log parsing, timing and time-scaled replay offsets
+"""
+
+import gzip
+import json
+
+import pytest
+
+from traffic_replay import ReplayLog
+
+
+def test_replay_log_reorders_and_skips_bad_lines(tmp_path):
+    log = tmp_path / "capture.jsonl"
+    log.write_text("\n".join([
+        "# captured at the edge",
+        json.dumps({"ts": 100.0, "method": "get", "path": "/health"}),
+        json.dumps({"ts": 102.0, "path": "api/estimate", "payload": {"size": 1}, "headers": {"Host": "x", "X-Trace": "1"}}),
+        json.dumps({"ts": 101.0, "url": "http://other:9500/health"}),  # Merged log - earlier than the line before
+        "not json",
+        json.dumps({"path": "/no-timestamp"}),
+        "",
+        json.dumps({"ts": "1970-01-01T00:01:46Z", "service": "super_agent", "path": "/orchestrate"})
+    ]))
+    replay = ReplayLog(log, {"app": "http://app", "super_agent": "http://agent"}, speed=2, base={"deadline_at": 9})
+
+    entries = list(replay)
+    assert [offset for offset, _ in entries] == [0.0, 1.0, 1.0, 3.0]  # Scaled by 1/speed, never backwards
+    assert [test["endpoint"] for _, test in entries] == [
+        "http://app/health", "http://app/api/estimate", "http://other:9500/health", "http://agent/orchestrate"
+    ]
+    assert entries[0][1]["method"] == "GET"
+    assert entries[1][1]["headers"] == {"X-Trace": "1"}
+    assert all(test["deadline_at"] == 9 and test["drain"] for _, test in entries)
+    assert replay.summary() == {
+        "log": str(log), "speed": 2, "requests": 4, "invalid": 2, "reordered": 1, "captured_s": 6.0, "replay_s": 3.0
+    }
+
+
+def test_replay_speed_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        ReplayLog(tmp_path / "capture.jsonl", {}, speed=0)
+
+
+def test_gzipped_capture_with_offsets(tmp_path):
+    log = tmp_path / "capture.jsonl.gz"
+    with gzip.open(log, "wt", encoding="utf-8") as f:
+        for offset in (5.0, 5.5, 7.0):
+            f.write(json.dumps({"offset_s": offset, "method": "POST", "path": "/api/estimate"}) + "\n")
+    replay = ReplayLog(log, {"app": "http://app"}, base={"name": "Morning peak"})
+    entries = list(replay)
+    assert [offset for offset, _ in entries] == [0.0, 0.5, 2.0]
+    assert entries[0][1]["name"] == "Morning peak / POST /api/estimate"
+    assert replay.summary()["replay_s"] == 2.0
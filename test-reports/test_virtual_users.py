@@ -0,0 +1,76 @@
+"""
+Workflow templating, response extraction and virtual user journeys
+"""
+
+import json
+
+import pytest
+
+from virtual_users import MissingState, VirtualUser, WorkflowStats, drive, extract, render
+
+
+def test_render_fills_placeholders_and_keeps_types():
+    state = {"user": 7, "token": "abc"}
+    assert render("{user}", state) == 7
+    assert render("/users/{user}/items?t={token}", state) == "/users/7/items?t=abc"
+    assert render({"ids": ["{user}", 1], "auth": {"t": "{token}"}}, state) == {"ids": [7, 1], "auth": {"t": "abc"}}
+    with pytest.raises(MissingState):
+        render("{missing}", state)
+
+
+def test_extract_dotted_paths():
+    body = {"data": {"items": [{"id": "a1"}, {"id": "b2"}], "count": 0}}
+    assert extract(body, "data.items.1.id") == "b2"
+    assert extract(body, "data.count") == 0
+    assert extract(body, "data.items.5.id") is None
+    assert extract(body, "data.items.x") is None
+    assert extract(body, "data.missing.id") is None
+
+
+WORKFLOW = {
+    "name": "Assessment",
+    "think_s": 0,
+    "iterations": 2,
+    "steps": [
+        {"action": "Start", "endpoint": "http://h/start", "extract": {"assessment_id": "data.id"}},
+        {"action": "Answer", "endpoint": "http://h/answer/{assessment_id}", "repeat": 3,
+         "payload": {"user": "{user}", "iteration": "{iteration}"}}
+    ]
+}
+
+
+def _journeys(users, send):
+    stats = WorkflowStats(WORKFLOW["steps"])
+    for index in range(users):
+        drive(VirtualUser(index, WORKFLOW, stats, seed=1).journey(), send, sleep=lambda s: None)
+    return stats
+
+
+def test_journey_threads_extracted_state_into_later_steps():
+    sent = []
+
+    def send(request):
+        sent.append(request)
+        body = {"data": {"id": f"a{len(sent)}"}} if request["endpoint"].endswith("/start") else {}
+        return {"success": True, "status_code": 200, "latency_ms": 5, "data": json.dumps(body)}
+
+    stats = _journeys(1, send)
+    assert [r["endpoint"] for r in sent[:4]] == ["http://h/start"] + ["http://h/answer/a1"] * 3
+    assert sent[5]["endpoint"] == "http://h/answer/a5"  # Second iteration starts over
+    assert sent[1]["payload"] == {"user": 0, "iteration": 0} and sent[5]["payload"]["iteration"] == 1
+    assert sent[0]["name"] == "Assessment / Start"
+    summary = stats.summary()
+    assert (summary["journeys"], summary["completed"], summary["completion_rate"]) == (2, 2, 1.0)
+    assert [step["requests"] for step in summary["steps"]] == [2, 6]
+
+
+def test_failed_extraction_ends_the_iteration_in_the_funnel():
+    def send(request):
+        return {"success": True, "status_code": 200, "latency_ms": 5, "data": json.dumps({"data": {}})}
+
+    summary = _journeys(3, send).summary()
+    start, answer = summary["steps"]
+    assert (start["reached"], start["completed"], start["failures"]) == (6, 0, 6)
+    assert start["failure_sample"]["status_code"] == 200
+    assert answer["reached"] == 0
+    assert summary["completion_rate"] == 0.0
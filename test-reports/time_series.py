@@ -0,0 +1,162 @@
+"""
+Time Series - per-second throughput, error rate and latency percentiles
+Buckets results by the second (since `origin`, the profile start) they
+completed in. The last few seconds stay live histograms (late completions
+still land); older seconds are packed into sparse (index, count) arrays, so
+an hour-long soak costs a few hundred bytes per second. Distributed workers
+share the coordinator's origin, so their series merge bucket by bucket.
+"""
+
+import time
+from array import array
+
+from latency_histogram import LatencyHistogram
+
+SERIES_SIGNIFICANT_FIGURES = 2
+OPEN_SECONDS = 3  # Seconds kept as live histograms before packing
+
+
+def _new_histogram():
+    return LatencyHistogram(significant_figures=SERIES_SIGNIFICANT_FIGURES)
+
+
+def _pack(histogram):
+    """Sparse, compact copy of a histogram: (index/count pairs, total_us, min_us, max_us)"""
+    pairs = array("Q")
+    for index, count in enumerate(histogram.counts):
+        if count:
+            pairs.append(index)
+            pairs.append(count)
+    return pairs, histogram.total_us, histogram.min_us, histogram.max_us
+
+
+def _unpack_into(histogram, packed):
+    """Add a packed histogram's counts into `histogram`"""
+    pairs, total_us, min_us, max_us = packed
+    for i in range(0, len(pairs), 2):
+        histogram.counts[pairs[i]] += pairs[i + 1]
+        histogram.total_count += pairs[i + 1]
+    histogram.total_us += total_us
+    if min_us is not None:
+        histogram.min_us = min_us if histogram.min_us is None else min(histogram.min_us, min_us)
+    histogram.max_us = max(histogram.max_us, max_us)
+
+
+class TimeSeries:
+    """Per-second request/error counts and latency histograms for one test"""
+
+    def __init__(self, origin=None):
+        self.origin = origin  # Epoch time of second 0 (first add() if not set)
+        self._open = {}  # second -> [requests, errors, histogram]
+        self._packed = {}  # second -> [requests, errors, packed histogram]
+        self._newest = None
+
+    def add(self, result, now=None):
+        """Count one completed request in the second it finished"""
+        now = now if now is not None else time.time()
+        if self.origin is None:
+            self.origin = now
+        second = max(0, int(now - self.origin))
+        bucket = self._open.get(second)
+        if bucket is None:
+            packed = self._packed.pop(second, None)  # Very late completion - reopen the second
+            bucket = self._open[second] = [0, 0, _new_histogram()]
+            if packed is not None:
+                bucket[0], bucket[1] = packed[0], packed[1]
+                _unpack_into(bucket[2], packed[2])
+        bucket[0] += 1
+        if not result.get("success", False):
+            bucket[1] += 1
+        if result.get("latency_ms") is not None:
+            bucket[2].record(result["latency_ms"])
+
+        if self._newest is None or second > self._newest:
+            self._newest = second
+            self._pack_before(second - OPEN_SECONDS + 1)
+
+    def _pack_before(self, second):
+        for key in [k for k in self._open if k < second]:
+            requests, errors, histogram = self._open.pop(key)
+            self._packed[key] = [requests, errors, _pack(histogram)]
+
+    def _buckets(self):
+        """second -> (requests, errors, packed histogram), every second"""
+        buckets = {key: tuple(value) for key, value in self._packed.items()}
+        for key, (requests, errors, histogram) in self._open.items():
+            buckets[key] = (requests, errors, _pack(histogram))
+        return buckets
+
+    def merge(self, data):
+        """Fold another series' to_dict() into this one"""
+        if self.origin is None:
+            self.origin = data["origin"]
+        shift = int(round((data["origin"] or self.origin) - self.origin))
+        for key, entry in data["seconds"].items():
+            packed = (array("Q", entry["counts"]), entry["total_us"], entry["min_us"], entry["max_us"])
+            second = max(0, int(key) + shift)
+            bucket = self._open.get(second)
+            if bucket is None:
+                bucket = self._packed.setdefault(second, [0, 0, (array("Q"), 0, None, 0)])
+                histogram = _new_histogram()
+                _unpack_into(histogram, bucket[2])
+                _unpack_into(histogram, packed)
+                bucket[2] = _pack(histogram)
+            else:
+                _unpack_into(bucket[2], packed)
+            bucket[0] += entry["requests"]
+            bucket[1] += entry["errors"]
+
+    def to_dict(self):
+        """JSON-safe sparse encoding"""
+        return {
+            "origin": self.origin,
+            "seconds": {
+                str(key): {
+                    "requests": requests,
+                    "errors": errors,
+                    "counts": list(packed[0]),
+                    "total_us": packed[1],
+                    "min_us": packed[2],
+                    "max_us": packed[3]
+                }
+                for key, (requests, errors, packed) in self._buckets().items()
+            }
+        }
+
+    def rows(self, max_rows=None):
+        """Rows of {t, seconds, requests, rps, errors, error_rate, p50_ms, p90_ms, p99_ms, max_ms}
+
+        t is seconds since the origin. With `max_rows`, consecutive seconds are
+        merged into equal windows (histograms merge exactly).
+        """
+        buckets = self._buckets()
+        if not buckets:
+            return []
+
+        last = max(buckets)
+        width = max(1, -(-(last + 1) // max_rows)) if max_rows else 1
+        rows = []
+        for window_start in range(0, last + 1, width):
+            requests = errors = 0
+            histogram = _new_histogram()
+            for second in range(window_start, min(window_start + width, last + 1)):
+                if second in buckets:
+                    r, e, packed = buckets[second]
+                    requests += r
+                    errors += e
+                    _unpack_into(histogram, packed)
+            seconds = min(width, last + 1 - window_start)
+            p50, p90, p99 = histogram.percentiles([50, 90, 99])
+            rows.append({
+                "t": window_start,
+                "seconds": seconds,
+                "requests": requests,
+                "rps": requests / seconds,
+                "errors": errors,
+                "error_rate": errors / requests if requests else 0.0,
+                "p50_ms": p50,
+                "p90_ms": p90,
+                "p99_ms": p99,
+                "max_ms": histogram.max_us / 1000
+            })
+        return rows
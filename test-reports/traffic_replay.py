@@ -0,0 +1,153 @@
+"""
+Traffic Replay - captured production traffic as a stress-test source
+A capture is a JSONL log (optionally gzipped), one request per line. It is
+read one line at a time while the replay runs, so a multi-GB capture never
+sits in memory, and every request is fired at its original offset from the
+first one - divided by `speed`, so 2 replays the day twice as fast.
+
+    {"ts": 1760700000.125, "method": "POST", "service": "app", "path": "/api/estimate",
+     "payload": {"industry": "education", "size": 50000}}
+    {"ts": "2026-10-17T09:00:00.250Z", "method": "GET", "url": "http://localhost:9500/health"}
+
+"ts" is epoch seconds or ISO 8601 ("offset_s" - seconds into the capture -
+works too). "service" picks the host ("app" -> BASE_URL, "super_agent" ->
+SUPER_AGENT_URL); a full "url" is replayed as-is. Blank lines and "#"
+comments are ignored, unreadable lines are counted and skipped.
+
+    python traffic_replay.py capture.jsonl    # endpoint mix and rate, without sending anything
+"""
+
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+from urllib.parse import urlsplit
+
+REPLAY_LOG = os.getenv("TEST_AGENT_REPLAY_LOG")  # Unset = no Traffic Replay stress test
+REPLAY_SPEED = float(os.getenv("TEST_AGENT_REPLAY_SPEED", "1"))
+DEFAULT_SERVICE = "app"
+
+# Set by the client library / connection, not by the captured request
+DROP_HEADERS = {"host", "content-length", "connection", "keep-alive", "transfer-encoding", "accept-encoding"}
+
+# Test keys every replayed request inherits from the Traffic Replay test itself
+INHERITED = ("deadline_at", "max_in_flight", "cold_connections", "body_bytes", "drain")
+
+
+def open_log(path):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _timestamp(entry):
+    """Seconds of a log entry - absolute for "ts", relative for "offset_s"."""
+    if "offset_s" in entry:
+        return float(entry["offset_s"])
+    ts = entry["ts"]
+    if isinstance(ts, str):
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+    return float(ts)
+
+
+def _endpoint(entry, services):
+    if entry.get("url"):
+        return entry["url"]
+    path = entry["path"]
+    return services[entry.get("service", DEFAULT_SERVICE)] + (path if path.startswith("/") else "/" + path)
+
+
+class ReplayLog:
+    """Lazily yields (offset_s, request test dict) from a capture, offsets scaled by 1/speed
+
+    Counters (requests, invalid, reordered, span_s) fill in as the log is read.
+    """
+
+    def __init__(self, path, services, speed=1.0, base=None):
+        if speed <= 0:
+            raise ValueError(f"Replay speed must be positive, got {speed}")
+        self.path = path
+        self.services = services
+        self.speed = speed
+        self.base = base or {}
+        self.name = self.base.get("name", "Traffic Replay")
+        self.requests = 0
+        self.invalid = 0
+        self.reordered = 0  # Entries stamped earlier than the one before (merged logs) - sent right away
+        self.span_s = 0.0  # Captured time covered so far, unscaled
+
+    def __iter__(self):
+        first = None
+        latest = 0.0
+        with open_log(self.path) as log:
+            for line in log:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    entry = json.loads(line)
+                    offset = _timestamp(entry)
+                    test = self._request(entry)
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    self.invalid += 1
+                    continue
+
+                if first is None:
+                    first = offset
+                offset -= first
+                if offset < latest:
+                    self.reordered += 1
+                    offset = latest  # The timetable never runs backwards
+                latest = offset
+                self.requests += 1
+                self.span_s = offset
+                yield offset / self.speed, test
+
+    def _request(self, entry):
+        method = entry.get("method", "GET").upper()
+        test = {key: self.base[key] for key in INHERITED if key in self.base}
+        test.setdefault("drain", True)  # Replayed traffic is load - read whole bodies
+        test["endpoint"] = _endpoint(entry, self.services)
+        test["method"] = method
+        test["name"] = f"{self.name} / {method} {urlsplit(test['endpoint']).path}"
+        headers = {key: value for key, value in (entry.get("headers") or {}).items() if key.lower() not in DROP_HEADERS}
+        if headers:
+            test["headers"] = headers
+        if "payload" in entry:
+            test["payload"] = entry["payload"]
+        return test
+
+    def summary(self):
+        return {
+            "log": str(self.path),
+            "speed": self.speed,
+            "requests": self.requests,
+            "invalid": self.invalid,
+            "reordered": self.reordered,
+            "captured_s": self.span_s,
+            "replay_s": self.span_s / self.speed
+        }
+
+
+def main(argv):
+    if len(argv) != 1:
+        print("usage: python traffic_replay.py capture.jsonl[.gz]")
+        return 2
+    services = {"app": "{app}", "super_agent": "{super_agent}"}
+    log = ReplayLog(argv[0], services)
+    mix = {}
+    for _, test in log:
+        key = f"{test['method']} {test['endpoint']}"
+        mix[key] = mix.get(key, 0) + 1
+    summary = log.summary()
+    rate = summary["requests"] / summary["captured_s"] if summary["captured_s"] else 0.0
+    print(f"{summary['requests']} requests over {summary['captured_s']:.1f}s ({rate:.1f}/s), "
+          f"{summary['invalid']} invalid lines, {summary['reordered']} out of order")
+    for key, count in sorted(mix.items(), key=lambda item: -item[1]):
+        print(f"  {count:>8}  {count / summary['requests']:6.1%}  {key}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
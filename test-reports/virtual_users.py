@@ -0,0 +1,264 @@
+"""
+Virtual Users - simulated users walking a multi-step workflow
+Each user keeps its own state between steps (values pulled out of earlier
+responses, e.g. an assessment ID, plus its own cookie jar in the engine),
+waits a randomized think time between requests, and reports every step into
+a shared funnel: who reached each step, who got through it, and how long it took.
+
+    {
+        "name": "AI Assessment Workflow",
+        "virtual_users": 25, "ramp_s": 5, "think_s": [0.5, 2.0], "iterations": 1,
+        "steps": [
+            {"action": "Start", "endpoint": ".../start", "extract": {"assessment_id": "assessmentId"}},
+            {"action": "Answer", "endpoint": ".../answer", "repeat": 5,
+             "payload": {"assessmentId": "{assessment_id}"}},
+            {"action": "Sign in", "endpoint": ".../signin", "extract": {"token": "data.accessToken"}},
+            {"action": "Dashboard", "endpoint": ".../dashboard", "method": "GET",
+             "headers": {"Authorization": "Bearer {token}"}}
+        ]
+    }
+
+"{name}" placeholders in endpoint, payload and headers come from the user's
+state; "{user}" and "{iteration}" are always set.
+"""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from latency_histogram import LatencyHistogram
+from phase_timing import PhaseStats
+
+DEFAULT_THINK_S = 0.0  # Seconds, or [min, max] for a uniform random pause
+EXTRACT_BODY_BYTES = 65536  # Keep whole JSON bodies for steps that extract from them
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+class MissingState(KeyError):
+    pass
+
+
+def render(value, state):
+    """Fill "{name}" placeholders from `state` in strings, dicts and lists
+
+    A string that is exactly one placeholder takes the state value as-is
+    (numbers stay numbers).
+    """
+    if isinstance(value, str):
+        whole = _PLACEHOLDER.fullmatch(value)
+        if whole:
+            return _lookup(state, whole.group(1))
+        return _PLACEHOLDER.sub(lambda m: str(_lookup(state, m.group(1))), value)
+    if isinstance(value, dict):
+        return {key: render(item, state) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render(item, state) for item in value]
+    return value
+
+
+def _lookup(state, name):
+    if name not in state:
+        raise MissingState(name)
+    return state[name]
+
+
+def extract(data, path):
+    """Value at a dotted path ("data.items.0.id") in a JSON body, None if absent"""
+    for part in path.split("."):
+        if isinstance(data, dict):
+            data = data.get(part)
+        elif isinstance(data, list) and part.isdigit() and int(part) < len(data):
+            data = data[int(part)]
+        else:
+            return None
+        if data is None:
+            return None
+    return data
+
+
+def step_label(step):
+    return step.get("action") or f"{step.get('method', 'POST')} {urlsplit(step['endpoint']).path}"
+
+
+class WorkflowStats:
+    """Funnel counts, per-step latency histograms and phases for one workflow (thread-safe)"""
+
+    def __init__(self, steps):
+        self.labels = [step_label(step) for step in steps]
+        self.histograms = [LatencyHistogram() for _ in steps]
+        self.phases = [PhaseStats() for _ in steps]
+        self.reached = [0] * len(steps)
+        self.completed = [0] * len(steps)
+        self.requests = [0] * len(steps)
+        self.failures = [0] * len(steps)
+        self.failure_samples = [None] * len(steps)  # First failure per step
+        self.journeys = 0
+        self._lock = threading.Lock()
+
+    def record(self, position, result):
+        with self._lock:
+            self.requests[position] += 1
+            if result.get("latency_ms") is not None:
+                self.histograms[position].record(result["latency_ms"])
+                if result.get("phases"):
+                    self.phases[position].record(result["latency_ms"], result["phases"])
+            if not result.get("success", False):
+                self.failures[position] += 1
+                if self.failure_samples[position] is None:
+                    self.failure_samples[position] = {
+                        key: result.get(key) for key in ("status_code", "error", "data") if result.get(key) is not None
+                    }
+
+    def count(self, field, position=None):
+        """Bump a funnel counter: journeys, or reached / completed for a step"""
+        with self._lock:
+            if position is None:
+                setattr(self, field, getattr(self, field) + 1)
+            else:
+                getattr(self, field)[position] += 1
+
+    @property
+    def finished(self):
+        return self.completed[-1] if self.completed else 0
+
+    def histogram(self):
+        """Every step's latencies in one histogram"""
+        overall = LatencyHistogram()
+        for histogram in self.histograms:
+            overall.merge(histogram)
+        return overall
+
+    def summary(self):
+        """Funnel rows: reached / completed per step, conversion, latency"""
+        return {
+            "journeys": self.journeys,
+            "completed": self.finished,
+            "completion_rate": self.finished / self.journeys if self.journeys else 0.0,
+            "steps": [
+                {
+                    "step": label,
+                    "reached": self.reached[i],
+                    "completed": self.completed[i],
+                    "conversion": self.completed[i] / self.reached[i] if self.reached[i] else 0.0,
+                    "funnel": self.completed[i] / self.journeys if self.journeys else 0.0,
+                    "requests": self.requests[i],
+                    "failures": self.failures[i],
+                    "latency": self.histograms[i].summary(),
+                    "failure_sample": self.failure_samples[i]
+                }
+                for i, label in enumerate(self.labels)
+            ]
+        }
+
+
+class VirtualUser:
+    """One simulated user; journey() yields what to do next, the engine does it"""
+
+    def __init__(self, index, workflow, stats, seed=None):
+        self.workflow = workflow
+        self.stats = stats
+        self.state = {"user": index}
+        self._random = random.Random(None if seed is None else f"{seed}:{index}")
+
+    def think_s(self, step):
+        spec = step.get("think_s", self.workflow.get("think_s", DEFAULT_THINK_S))
+        if isinstance(spec, (int, float)):
+            return float(spec)
+        return self._random.uniform(*spec)
+
+    def request_for(self, step):
+        """Concrete request test dict for a step, rendered from this user's state"""
+        request = {key: value for key, value in step.items() if key not in ("action", "extract", "repeat", "think_s")}
+        request["name"] = f"{self.workflow['name']} / {step_label(step)}"
+        for key in ("endpoint", "payload", "headers"):
+            if key in request:
+                request[key] = render(request[key], self.state)
+        if "deadline_at" in self.workflow:
+            request.setdefault("deadline_at", self.workflow["deadline_at"])  # The test's deadline covers every step
+        if "virtual_users" in self.workflow:
+            request.setdefault("drain", self.workflow.get("drain", True))  # Concurrent journeys are load
+        if step.get("extract"):
+            request["body_bytes"] = max(request.get("body_bytes", 0), EXTRACT_BODY_BYTES)
+        return request
+
+    def absorb(self, step, result):
+        """Pull "extract" values out of a successful response; False (and marks it failed) if any are missing"""
+        if not result.get("success", False) or not step.get("extract"):
+            return result.get("success", False)
+        try:
+            body = json.loads(result.get("data") or "null")
+        except ValueError:
+            body = None
+        for name, path in step["extract"].items():
+            value = extract(body, path)
+            if value is None:
+                result["success"] = False
+                result["error"] = f"Could not extract '{path}' from the response"
+                return False
+            self.state[name] = value
+        return True
+
+    def journey(self):
+        """Generator of ("send", request) / ("think", seconds) actions
+
+        The engine sends each result back in; a failed step ends the iteration.
+        """
+        steps = self.workflow["steps"]
+        last = len(steps) - 1
+        for iteration in range(self.workflow.get("iterations", 1)):
+            self.state["iteration"] = iteration
+            if iteration:
+                yield "think", self.think_s({})
+            self.stats.count("journeys")
+            for position, step in enumerate(steps):
+                self.stats.count("reached", position)
+                passed = True
+                for attempt in range(step.get("repeat", 1)):
+                    try:
+                        request = self.request_for(step)
+                    except MissingState as e:
+                        result = {"success": False, "error": f"No value for '{e.args[0]}' from an earlier step"}
+                    else:
+                        result = yield "send", request
+                    passed = self.absorb(step, result)
+                    self.stats.record(position, result)
+                    if not passed:
+                        break
+                    if position < last or attempt < step.get("repeat", 1) - 1:
+                        yield "think", self.think_s(step)
+                if not passed:
+                    break
+                self.stats.count("completed", position)
+
+
+def drive(journey, send, sleep=time.sleep):
+    """Run a journey with blocking send/sleep (thread engine)"""
+    try:
+        action, value = next(journey)
+        while True:
+            if action == "think":
+                sleep(value)
+                action, value = journey.send(None)
+            else:
+                action, value = journey.send(send(value))
+    except StopIteration:
+        pass
+
+
+async def drive_async(journey, send):
+    """Run a journey with an awaitable send (async engine)"""
+    try:
+        action, value = next(journey)
+        while True:
+            if action == "think":
+                await asyncio.sleep(value)
+                action, value = journey.send(None)
+            else:
+                action, value = journey.send(await send(value))
+    except StopIteration:
+        pass